@@ -0,0 +1,92 @@
+"""
+Command-line entry points.
+
+    python -m app.cli batch jobs.jsonl --output results.jsonl
+
+Each line of jobs.jsonl is an ApiRequest object, e.g.
+{"documentation_url": "https://docs.example.com", "use_case": "...", "preferred_language": "python"}.
+Results are appended to the output file as they complete; re-running the same command
+skips jobs that already succeeded.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+
+from dotenv import load_dotenv
+
+# Loaded before the argument defaults read GEMINI_RPM/GEMINI_TPM
+load_dotenv()
+
+
+async def run_batch(args) -> int:
+    from app.services.analysis_store import AnalysisStore
+    from app.services.batch import BatchRunner, load_jobs
+    from app.services.cache import LayeredCache
+    from app.services.extractor import ApiExtractor
+    from app.services.gemini_service import GeminiService
+    from app.services.generator import WrapperGenerator
+    from app.services.rate_limit import RateLimiter
+
+    defaults = {}
+    if args.language:
+        defaults["preferred_language"] = args.language
+    if args.codegen_mode:
+        defaults["codegen_mode"] = args.codegen_mode
+    jobs = load_jobs(args.jobs, defaults)
+
+    cache = LayeredCache.from_env()
+    cache.start()
+    extractor = ApiExtractor(cache)
+    rate_limiter = RateLimiter(requests_per_minute=args.rpm, tokens_per_minute=args.tpm)
+    gemini_service = GeminiService(cache, rate_limiter=rate_limiter)
+    analysis_store = AnalysisStore(cache)
+    generator = WrapperGenerator(gemini_service, analysis_store)
+    runner = BatchRunner(
+        extractor,
+        generator,
+        max_concurrency=args.concurrency,
+        per_host_concurrency=args.per_host
+    )
+
+    try:
+        counts = await runner.run_to_file(jobs, args.output)
+    finally:
+        await extractor.aclose()
+        await gemini_service.aclose()
+        analysis_store.close()
+        cache.close()
+
+    print(f"ok={counts['ok']} error={counts['error']} skipped={counts['skipped']} -> {args.output}")
+    return 1 if counts["error"] else 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="Smart API DevTool command line")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+
+    batch = subcommands.add_parser("batch", help="analyze many documentation URLs from a JSONL file")
+    batch.add_argument("jobs", help="JSONL file with one ApiRequest per line")
+    batch.add_argument("-o", "--output", default="results.jsonl", help="JSONL file results are appended to")
+    batch.add_argument("-c", "--concurrency", type=int, default=4, help="analyses running at once")
+    batch.add_argument("--per-host", type=int, default=2, help="analyses running at once per documentation host")
+    batch.add_argument("--language", help="default preferred_language for jobs that omit it")
+    batch.add_argument("--codegen-mode", choices=("llm", "template", "hybrid"),
+                       help="default codegen_mode for jobs that omit it")
+    batch.add_argument("--rpm", type=float, default=float(os.getenv("GEMINI_RPM", "0")),
+                       help="Gemini requests per minute, 0 for no limit (default: GEMINI_RPM or 0)")
+    batch.add_argument("--tpm", type=float, default=float(os.getenv("GEMINI_TPM", "0")),
+                       help="Gemini tokens per minute, 0 for no limit (default: GEMINI_TPM or 0)")
+    batch.add_argument("-v", "--verbose", action="store_true")
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    if args.command == "batch":
+        return asyncio.run(run_batch(args))
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
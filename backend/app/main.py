@@ -1,19 +1,41 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-import uvicorn
+from fastapi.responses import PlainTextResponse
 from dotenv import load_dotenv
 import os
 from pathlib import Path
+from contextlib import asynccontextmanager
 
 # Load environment variables
 load_dotenv()
 
+from app.services.metrics import REGISTRY, MetricsMiddleware, SlowRequestProfiler
+
+# Samples the event loop during requests slower than PROFILE_SLOW_REQUEST_SECONDS (off by default)
+profiler = SlowRequestProfiler.from_env()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Create the services and start the job workers; close the pooled HTTP clients and
+    executors when the server shuts down
+    """
+    from app.services.container import Services
+    services = Services.from_env()
+    app.state.services = services
+    await services.start()
+    yield
+    await services.aclose()
+    if profiler is not None:
+        profiler.stop()
+
 # Create FastAPI app
 app = FastAPI(
     title="Smart API DevTool",
     description="A tool that streamlines API integration by analyzing documentation and generating wrapper code",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Configure CORS
@@ -25,10 +47,36 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request latency per route; send "X-Trace: 1" to get stage timings in a Server-Timing header
+app.add_middleware(MetricsMiddleware, profiler=profiler)
+
 # Import and include API routes
 from app.routes.api import router as api_router
 app.include_router(api_router)
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics(request: Request):
+    """
+    Prometheus metrics: request and stage latency histograms, Gemini calls and tokens,
+    bytes fetched and cache hit counters
+    """
+    lines = [REGISTRY.render().rstrip("\n")]
+    stats = request.app.state.services.cache.stats()
+    lines.append("# HELP integreat_cache_lookups_total Cache lookups by namespace and result")
+    lines.append("# TYPE integreat_cache_lookups_total counter")
+    for namespace, counters in sorted(stats["namespaces"].items()):
+        for result in ("hits", "misses"):
+            lines.append(f'integreat_cache_lookups_total{{namespace="{namespace}",result="{result}"}} {counters.get(result, 0)}')
+    lines.append("# HELP integreat_cache_memory_bytes Bytes held by the in-memory cache")
+    lines.append("# TYPE integreat_cache_memory_bytes gauge")
+    lines.append(f"integreat_cache_memory_bytes {stats['memory_bytes']}")
+    lines.append("# HELP integreat_gemini_circuit_open Whether calls to a Gemini model are being refused (1 open, 0.5 half open)")
+    lines.append("# TYPE integreat_gemini_circuit_open gauge")
+    for model, state in sorted(request.app.state.services.gemini_service.circuit_states().items()):
+        value = {"closed": 0, "half_open": 0.5, "open": 1}[state]
+        lines.append(f'integreat_gemini_circuit_open{{model="{model}"}} {value}')
+    return PlainTextResponse("\n".join(lines) + "\n", media_type="text/plain; version=0.0.4")
+
 # Determine the static directory path
 static_dir = Path(__file__).parent.parent / "static"
 
@@ -36,4 +84,9 @@ static_dir = Path(__file__).parent.parent / "static"
 app.mount("/", StaticFiles(directory=static_dir, html=True), name="static")
 
 if __name__ == "__main__":
-    uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
+    import uvicorn
+    # WEB_CONCURRENCY > 1 runs that many worker processes (without auto-reload). Point
+    # CACHE_SQLITE_PATH, RATE_LIMIT_SQLITE_PATH and JOB_STORE_PATH at local files so the
+    # workers share caches, Gemini rate limits and jobs
+    workers = int(os.getenv("WEB_CONCURRENCY", "1"))
+    uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=workers == 1, workers=workers)
\ No newline at end of file
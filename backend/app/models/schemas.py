@@ -1,10 +1,19 @@
 from pydantic import BaseModel, Field, HttpUrl
-from typing import List, Optional, Dict, Any
+from typing import List, Literal, Optional, Dict, Any
+
+# "template" renders wrappers locally, "hybrid" also has the model write the docstrings
+CodegenMode = Literal["llm", "template", "hybrid"]
 
 class ApiRequest(BaseModel):
     documentation_url: HttpUrl = Field(..., description="URL of the API documentation")
     use_case: str = Field(..., description="Brief description of the intended use case")
     preferred_language: str = Field(..., description="Preferred programming language for wrapper class")
+    use_cache: bool = Field(True, description="Set to false to bypass cached extraction and Gemini results")
+    crawl: bool = Field(False, description="Follow same-origin documentation links instead of reading a single page")
+    crawl_max_depth: int = Field(2, ge=0, le=5, description="Maximum link depth to follow when crawling")
+    crawl_max_pages: int = Field(30, ge=1, le=200, description="Maximum number of pages to fetch when crawling")
+    additional_languages: List[str] = Field([], max_length=5, description="Other languages to generate wrappers for from the same analysis")
+    codegen_mode: Optional[CodegenMode] = Field(None, description="How to generate wrapper code; defaults to WRAPPER_CODEGEN_MODE")
 
 class Endpoint(BaseModel):
     path: str
@@ -17,10 +26,132 @@ class AuthMethod(BaseModel):
     type: str
     description: str
 
+# Structured output cannot express free-form dicts, so the model reports parameters as a
+# list (folded into Endpoint.parameters by name) and the response example as a JSON string
+class AnalysisParameter(BaseModel):
+    name: str
+    location: Optional[Literal["path", "query", "header", "body"]] = None
+    type: Optional[str] = None
+    required: Optional[bool] = None
+    description: Optional[str] = None
+
+class AnalysisEndpoint(BaseModel):
+    path: str
+    method: Literal["GET", "POST", "PUT", "PATCH", "DELETE", "HEAD", "OPTIONS"]
+    description: str
+    parameters: List[AnalysisParameter] = []
+    response_example: Optional[str] = Field(None, description="Example response body as a JSON string")
+
+class AnalysisResult(BaseModel):
+    endpoints: List[AnalysisEndpoint]
+    auth_methods: List[AuthMethod]
+
 class ApiResponse(BaseModel):
     endpoints: List[Endpoint]
     auth_methods: List[AuthMethod]
     suggested_integration: str
     wrapper_code: str
 
-    env_template: Optional[str] = None
\ No newline at end of file
+    env_template: Optional[str] = None
+    stage_timings: Optional[Dict[str, float]] = None
+    prompt_tokens: Optional[Dict[str, Dict[str, int]]] = Field(None, description="Estimated prompt tokens per stage, and tokens saved by prompt compaction")
+    analysis_id: Optional[str] = None
+    additional_wrappers: Optional[Dict[str, str]] = None
+
+class EndpointChange(BaseModel):
+    method: str
+    path: str
+    fields: List[str] = Field(..., description="Endpoint fields whose value changed")
+    before: Endpoint
+    after: Endpoint
+
+class EndpointDiff(BaseModel):
+    added: List[Endpoint] = []
+    removed: List[Endpoint] = []
+    changed: List[EndpointChange] = []
+
+class ReanalysisResponse(ApiResponse):
+    mode: Literal["full", "incremental", "unchanged", "spec"] = Field(
+        ..., description="full: no usable snapshot or too much changed; incremental: only changed sections were "
+                         "analysed; unchanged: no section changed; spec: endpoints came from an API spec"
+    )
+    diff: EndpointDiff = Field(..., description="Endpoints added, removed and changed since the last snapshot")
+    sections: Dict[str, int] = Field(..., description="Documentation sections in total, changed and removed since the last snapshot")
+    wrappers_regenerated: bool = Field(..., description="False when the endpoints and auth methods are unchanged and the stored wrapper code was reused")
+
+class BatchRequest(BaseModel):
+    jobs: List[ApiRequest] = Field(..., min_length=1, max_length=100, description="Analyses to run")
+    max_concurrency: int = Field(4, ge=1, le=16, description="Maximum analyses running at once")
+    per_host_concurrency: int = Field(2, ge=1, le=8, description="Maximum analyses per documentation host")
+
+
+class AnalysisIR(BaseModel):
+    """Language-independent result of analysing one API's documentation"""
+    analysis_id: str
+    version: int
+    documentation_url: str
+    use_case: str
+    source: str = Field(..., description="'gemini' or 'spec:<format>'")
+    base_url: Optional[str] = None
+    endpoints: List[Endpoint]
+    auth_methods: List[AuthMethod]
+    created_at: float
+
+class WrapperRequest(BaseModel):
+    languages: List[str] = Field(..., min_length=1, max_length=5, description="Languages to generate wrappers for")
+    codegen_mode: Optional[CodegenMode] = Field(None, description="How to generate wrapper code; defaults to WRAPPER_CODEGEN_MODE")
+    use_cache: bool = Field(True, description="Set to false to bypass cached Gemini results")
+
+class WrapperResponse(BaseModel):
+    analysis_id: str
+    wrappers: Dict[str, str]
+    env_template: str
+    stage_timings: Optional[Dict[str, float]] = None
+    prompt_tokens: Optional[Dict[str, Dict[str, int]]] = None
+
+JobStatus = Literal["queued", "running", "succeeded", "failed"]
+
+class JobInfo(BaseModel):
+    job_id: str
+    status: JobStatus
+    request: ApiRequest
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    result: Optional[ApiResponse] = None
+    error: Optional[str] = None
+
+class JobAccepted(BaseModel):
+    job_id: str
+    status: JobStatus
+    coalesced: bool = Field(False, description="True when an identical job was already queued or running and was reused")
+
+class LoadTestRequest(BaseModel):
+    url: str = Field(..., description="Endpoint to load test")
+    method: str = Field("GET", description="HTTP method")
+    headers: Dict[str, str] = {}
+    params: Dict[str, str] = {}
+    body: Dict[str, Any] = {}
+    requests: int = Field(100, ge=1, description="Requests to send; capped by LOAD_TEST_MAX_REQUESTS")
+    concurrency: int = Field(10, ge=1, description="Maximum requests in flight; capped by LOAD_TEST_MAX_CONCURRENCY")
+    rps: Optional[float] = Field(None, gt=0, description="Send at this steady rate instead of as fast as the concurrency allows; capped by LOAD_TEST_MAX_RPS")
+    analysis_id: Optional[str] = Field(None, description="Store the result with this analysis")
+
+class LoadTestResult(BaseModel):
+    load_test_id: str
+    url: str
+    method: str
+    requests: int = Field(..., description="Requests planned after the server limits were applied")
+    completed: int
+    concurrency: int
+    rps: Optional[float] = None
+    started_at: float
+    elapsed_s: float
+    throughput_rps: float
+    latency_ms: Dict[str, Optional[float]] = Field(..., description="min, mean, p50, p90, p95, p99 and max")
+    statuses: Dict[str, int] = Field(..., description="Responses per HTTP status")
+    errors: Dict[str, int] = Field(..., description="Requests that got no response, per error type")
+    bytes_received: int
+    stopped_reason: Optional[str] = Field(None, description="Why the test ended early: max_seconds or error_rate")
+    limits_applied: List[str] = Field([], description="Requested settings lowered to the server limits")
+    analysis_id: Optional[str] = None
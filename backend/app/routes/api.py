@@ -1,49 +1,212 @@
-from fastapi import APIRouter, HTTPException, Depends, Body
-from app.models.schemas import ApiRequest, ApiResponse
-from app.services.extractor import ApiExtractor
-from app.services.gemini_service import GeminiService
-from app.services.generator import WrapperGenerator
+from fastapi import APIRouter, HTTPException, Depends, Body, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.background import BackgroundTask
+from app.models.schemas import (
+    ApiRequest, ApiResponse, Endpoint, AuthMethod, BatchRequest, AnalysisIR, WrapperRequest, WrapperResponse,
+    JobAccepted, JobInfo, LoadTestRequest, LoadTestResult, ReanalysisResponse
+)
+from app.services.container import Services
+from app.services.proxy import ResponseTooLarge
+from app.services.batch import BatchRunner
+from app.services.jobs import QueueFull
+from app.services.load_test import LoadTestBusy
+from app.services.parse_pool import PoolBusy
+from app.services.resilience import CircuitOpen
+from app.services.scheduler import StageError
+import json
 import logging
-import httpx
-from typing import Dict, Any
+from typing import AsyncIterator, Dict, Any, List, Optional
 
 router = APIRouter(prefix="/api", tags=["api"])
 logger = logging.getLogger(__name__)
 
-# Create service instances
-extractor = ApiExtractor()
-gemini_service = GeminiService()
-generator = WrapperGenerator(gemini_service)
+class _ClosingStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse that runs its background task even when sending fails, e.g. the
+    client disconnected before the body iterator started
+    """
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        except BaseException:
+            if self.background is not None:
+                await self.background()
+            raise
+
+def get_services(request: Request) -> Services:
+    """
+    The service instances created by the app's lifespan handler
+    """
+    return request.app.state.services
 
 @router.post("/analyze", response_model=ApiResponse)
-async def analyze_api(request: ApiRequest):
+async def analyze_api(request: ApiRequest, services: Services = Depends(get_services)):
     """
     Analyze an API from its documentation and generate a wrapper class
     """
     try:
-        # Step 1: Extract information from the API documentation URL
-        extracted_data = await extractor.extract_from_url(str(request.documentation_url))
-        
-        # Step 2: Process the documentation and generate wrapper code
-        result = await generator.process_api_documentation(
-            extracted_data,
-            request.use_case,
-            request.preferred_language
-        )
-        
-        # Return the response
-        return ApiResponse(
-            endpoints=result["endpoints"],
-            auth_methods=result["auth_methods"],
-            suggested_integration=result["suggested_integration"],
-            wrapper_code=result["wrapper_code"],
-            env_template=result.get("env_template", "")
-        )
-        
+        return await services.analyze(request)
     except Exception as e:
+        overloaded = _overloaded(e)
+        if overloaded is not None:
+            return overloaded
         logger.error(f"Error processing API request: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to process API: {str(e)}")
 
+@router.post("/reanalyze", response_model=ReanalysisResponse)
+async def reanalyze_api(request: ApiRequest, services: Services = Depends(get_services)):
+    """
+    Analyze documentation again, e.g. on a schedule, sending only the sections that
+    changed since the last re-analysis of the URL to the model. Wrapper code is
+    regenerated only when the endpoints changed; the response lists the endpoints added,
+    removed and changed. The first re-analysis of a URL is a full analysis
+    """
+    try:
+        return await services.reanalyze(request)
+    except Exception as e:
+        overloaded = _overloaded(e)
+        if overloaded is not None:
+            return overloaded
+        logger.error(f"Error re-analysing API: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to re-analyze API: {str(e)}")
+
+def _overloaded(error: Exception) -> Optional[JSONResponse]:
+    """
+    Overload (parser processes full, Gemini circuit open) as a 503 the client can retry
+    """
+    cause = error.error if isinstance(error, StageError) else error
+    if isinstance(cause, (PoolBusy, CircuitOpen)):
+        return JSONResponse(status_code=503, content={"detail": str(cause)},
+                            headers={"Retry-After": str(cause.retry_after)})
+    return None
+
+@router.post("/analyze/stream")
+async def analyze_api_stream(request: ApiRequest, services: Services = Depends(get_services)):
+    """
+    Analyze an API and stream the results as newline-delimited JSON events
+    """
+    async def events() -> AsyncIterator[str]:
+        try:
+            extracted_data = await services.extract(request)
+            yield json.dumps({
+                "event": "extracted",
+                "potential_endpoints": len(extracted_data["potential_endpoints"]),
+                "potential_auth": len(extracted_data["potential_auth"]),
+                "spec_format": (extracted_data.get("spec") or {}).get("format"),
+                "crawl_stats": extracted_data.get("crawl_stats")
+            }) + "\n"
+
+            async for event in services.generator.stream_api_documentation(
+                extracted_data,
+                request.use_case,
+                request.preferred_language,
+                use_cache=request.use_cache,
+                codegen_mode=request.codegen_mode
+            ):
+                if event["event"] == "endpoint":
+                    event["endpoint"] = Endpoint(**event["endpoint"]).model_dump()
+                elif event["event"] == "analysis":
+                    # Validate against the same models as the non-streaming response
+                    event["endpoints"] = [Endpoint(**e).model_dump() for e in event["endpoints"]]
+                    event["auth_methods"] = [AuthMethod(**a).model_dump() for a in event["auth_methods"]]
+                yield json.dumps(event) + "\n"
+
+        except Exception as e:
+            logger.error(f"Error streaming API analysis: {str(e)}")
+            yield json.dumps({"event": "error", "detail": f"Failed to process API: {str(e)}"}) + "\n"
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+@router.post("/jobs", response_model=JobAccepted, status_code=202)
+async def submit_job(request: ApiRequest, services: Services = Depends(get_services)):
+    """
+    Queue an analysis and return its job ID right away. Poll /api/jobs/{job_id} or
+    follow /api/jobs/{job_id}/events for the result
+    """
+    try:
+        job, coalesced = await services.job_queue.submit(request)
+    except QueueFull as e:
+        return JSONResponse(status_code=429, content={"detail": str(e)},
+                            headers={"Retry-After": str(e.retry_after)})
+    return JobAccepted(job_id=job["job_id"], status=job["status"], coalesced=coalesced)
+
+@router.get("/jobs/{job_id}", response_model=JobInfo)
+async def get_job(job_id: str, services: Services = Depends(get_services)):
+    """
+    Return the status of a job, with its result once it has finished
+    """
+    job = await services.job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    return job
+
+@router.get("/jobs/{job_id}/events")
+async def job_events(job_id: str, services: Services = Depends(get_services)):
+    """
+    Stream the job as newline-delimited JSON, one line per status change, until it finishes
+    """
+    if await services.job_queue.get(job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+
+    async def events() -> AsyncIterator[str]:
+        async for job in services.job_queue.events(job_id):
+            yield JobInfo(**job).model_dump_json() + "\n"
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+@router.get("/analyses/{analysis_id}", response_model=AnalysisIR)
+async def get_analysis(analysis_id: str, services: Services = Depends(get_services)):
+    """
+    Return a stored analysis
+    """
+    ir = await services.analysis_store.get(analysis_id)
+    if ir is None:
+        raise HTTPException(status_code=404, detail="Analysis not found or expired")
+    return ir
+
+@router.get("/analyses/{analysis_id}/load-tests", response_model=List[LoadTestResult])
+async def get_load_tests(analysis_id: str, services: Services = Depends(get_services)):
+    """
+    Return the load test results kept with an analysis, newest first
+    """
+    return await services.analysis_store.load_tests(analysis_id)
+
+@router.post("/analyses/{analysis_id}/wrappers", response_model=WrapperResponse)
+async def generate_wrappers(analysis_id: str, request: WrapperRequest, services: Services = Depends(get_services)):
+    """
+    Generate wrappers in other languages from a stored analysis, without fetching or
+    analysing the documentation again
+    """
+    ir = await services.analysis_store.get(analysis_id)
+    if ir is None:
+        raise HTTPException(status_code=404, detail="Analysis not found or expired")
+    try:
+        return WrapperResponse(**await services.generator.generate_wrappers(
+            ir, request.languages, use_cache=request.use_cache, codegen_mode=request.codegen_mode
+        ))
+    except Exception as e:
+        logger.error(f"Error generating wrappers for analysis {analysis_id}: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to generate wrappers: {str(e)}")
+
+@router.post("/batch")
+async def analyze_batch(request: BatchRequest, services: Services = Depends(get_services)):
+    """
+    Analyze many APIs and stream one JSON line per job as each finishes
+    """
+    runner = BatchRunner(
+        services.extractor,
+        services.generator,
+        max_concurrency=request.max_concurrency,
+        per_host_concurrency=request.per_host_concurrency
+    )
+
+    async def results() -> AsyncIterator[str]:
+        async for record in runner.run(request.jobs):
+            yield json.dumps(record) + "\n"
+
+    return StreamingResponse(results(), media_type="application/x-ndjson")
+
 @router.get("/health")
 async def health_check():
     """
@@ -51,43 +214,94 @@ async def health_check():
     """
     return {"status": "ok"}
 
+@router.get("/cache/stats")
+async def cache_stats(services: Services = Depends(get_services)):
+    """
+    Hit/miss counters for the extraction and Gemini caches
+    """
+    return services.cache.stats()
+
 @router.post("/test-endpoint")
 async def test_endpoint(
     url: str = Body(...),
     method: str = Body(...),
     headers: Dict[str, str] = Body({}),
     params: Dict[str, str] = Body({}),
-    body: Dict[str, Any] = Body({})
+    body: Dict[str, Any] = Body({}),
+    max_response_bytes: Optional[int] = Body(None, gt=0),
+    truncate: bool = Body(True),
+    stream: bool = Body(False),
+    services: Services = Depends(get_services)
 ):
     """
-    Proxy API calls for the test playground
+    Proxy API calls for the test playground.
+
+    By default the body is returned inside a JSON envelope with a timing breakdown. With
+    stream=true the upstream bytes are streamed back unchanged, with the upstream status
+    and content headers and the connection timings in X-Proxy-* headers.
     """
     try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            # Convert method to lowercase
-            method = method.lower()
-            
-            # Make the request based on the method
-            if method == "get":
-                response = await client.get(url, headers=headers, params=params)
-            elif method == "post":
-                response = await client.post(url, headers=headers, params=params, json=body)
-            elif method == "put":
-                response = await client.put(url, headers=headers, params=params, json=body)
-            elif method == "delete":
-                response = await client.delete(url, headers=headers, params=params)
-            elif method == "patch":
-                response = await client.patch(url, headers=headers, params=params, json=body)
-            else:
-                raise HTTPException(status_code=400, detail=f"Unsupported method: {method}")
-            
-            # Return the response
-            return {
-                "status_code": response.status_code,
-                "headers": dict(response.headers),
-                "response": response.text,
-                "time_ms": response.elapsed.total_seconds() * 1000
-            }
+        if stream:
+            upstream, timer, chunks, close = await services.proxy_client.open_stream(
+                method, url, headers, params, body, max_bytes=max_response_bytes
+            )
+            try:
+                timing = timer.breakdown()
+                passthrough = {
+                    name: value for name, value in upstream.headers.items()
+                    if name.lower() in ("content-type", "content-encoding", "etag", "last-modified", "cache-control")
+                }
+                passthrough["X-Proxy-Status"] = str(upstream.status_code)
+                passthrough["X-Proxy-Http-Version"] = upstream.http_version
+                for key in ("connect_ms", "tls_ms", "ttfb_ms"):
+                    if timing[key] is not None:
+                        passthrough[f"X-Proxy-{key.replace('_ms', '').upper()}-Ms"] = str(timing[key])
+            except BaseException:
+                await close()
+                raise
+            return _ClosingStreamingResponse(chunks, status_code=upstream.status_code, headers=passthrough,
+                                             background=BackgroundTask(close))
+
+        return await services.proxy_client.fetch(
+            method, url, headers, params, body,
+            max_bytes=max_response_bytes,
+            truncate=truncate
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ResponseTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
     except Exception as e:
         logger.error(f"Error testing endpoint: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Failed to test endpoint: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Failed to test endpoint: {str(e)}")
+
+@router.post("/test-endpoint/load")
+async def load_test_endpoint(request: LoadTestRequest, services: Services = Depends(get_services)):
+    """
+    Send many copies of a playground request and stream the progress as newline-delimited
+    JSON: a "started" event with the plan after the server limits, periodic "progress"
+    events and a "done" event with latency percentiles, status and error counts and
+    throughput. With analysis_id the result is also kept with that analysis
+    """
+    if request.analysis_id and await services.analysis_store.get(request.analysis_id) is None:
+        raise HTTPException(status_code=404, detail="Analysis not found or expired")
+    try:
+        plan = services.load_tester.plan(request)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except LoadTestBusy as e:
+        return JSONResponse(status_code=429, content={"detail": str(e)},
+                            headers={"Retry-After": str(e.retry_after)})
+
+    async def events() -> AsyncIterator[str]:
+        try:
+            async for event in services.load_tester.run(request, plan):
+                yield json.dumps(event) + "\n"
+        except Exception as e:
+            logger.error(f"Error load testing endpoint: {str(e)}")
+            yield json.dumps({"event": "error", "detail": f"Load test failed: {str(e)}"}) + "\n"
+
+    # The slot is held from plan() on; the background task frees it when the client
+    # goes away before the stream starts (run() frees it otherwise)
+    return _ClosingStreamingResponse(events(), media_type="application/x-ndjson",
+                                     background=BackgroundTask(services.load_tester.release, plan))
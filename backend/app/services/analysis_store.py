@@ -0,0 +1,211 @@
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from app.models.schemas import AnalysisIR, LoadTestResult
+from app.services.cache import LayeredCache, connect_sqlite, make_key
+
+logger = logging.getLogger(__name__)
+
+# Bump when the shape or meaning of stored analyses changes; older entries are ignored
+IR_VERSION = 1
+# Bump when the shape of documentation snapshots changes; older snapshots are ignored
+SNAPSHOT_VERSION = 1
+# Load test results kept per analysis, newest first
+MAX_LOAD_TESTS = 10
+# In the backend directory, whatever directory the server is started from
+DEFAULT_RECORDS_PATH = str(Path(__file__).resolve().parents[2] / "analysis_records.db")
+
+
+class RecordStore:
+    """
+    SQLite tables for records that must not be evicted like cache entries or lost on
+    restart: documentation snapshots, one per URL and replaced on save, and load test
+    results, which are only ever inserted so server processes sharing the file cannot
+    overwrite each other's results
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = connect_sqlite(path)
+        with self._lock:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS load_tests ("
+                "load_test_id TEXT PRIMARY KEY, analysis_id TEXT NOT NULL, created_at REAL NOT NULL, "
+                "payload TEXT NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS load_tests_analysis ON load_tests (analysis_id, created_at)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS snapshots ("
+                "documentation_url TEXT PRIMARY KEY, saved_at REAL NOT NULL, payload TEXT NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS snapshots_saved_at ON snapshots (saved_at)")
+            self._conn.commit()
+
+    @classmethod
+    def from_env(cls) -> "RecordStore":
+        """ANALYSIS_RECORDS_PATH selects the database file; ':memory:' keeps records only for the process"""
+        return cls(os.getenv("ANALYSIS_RECORDS_PATH", DEFAULT_RECORDS_PATH))
+
+    def save_snapshot(self, documentation_url: str, snapshot: Dict[str, Any]):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO snapshots (documentation_url, saved_at, payload) VALUES (?, ?, ?)",
+                (documentation_url, time.time(), json.dumps(snapshot))
+            )
+            self._conn.commit()
+
+    def get_snapshot(self, documentation_url: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload FROM snapshots WHERE documentation_url = ?", (documentation_url,)
+            ).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    def purge_snapshots(self, before: float, max_rows: Optional[int] = None) -> int:
+        """
+        Delete snapshots saved before the given time, then the oldest ones beyond max_rows;
+        return the number deleted
+        """
+        with self._lock:
+            removed = self._conn.execute("DELETE FROM snapshots WHERE saved_at < ?", (before,)).rowcount
+            if max_rows:
+                removed += self._conn.execute(
+                    "DELETE FROM snapshots WHERE documentation_url IN ("
+                    "SELECT documentation_url FROM snapshots ORDER BY saved_at DESC LIMIT -1 OFFSET ?)",
+                    (max_rows,)
+                ).rowcount
+            self._conn.commit()
+        return removed
+
+    def add_load_test(self, analysis_id: str, result: Dict[str, Any]):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO load_tests (load_test_id, analysis_id, created_at, payload) VALUES (?, ?, ?, ?)",
+                (result["load_test_id"], analysis_id, result["started_at"], json.dumps(result))
+            )
+            self._conn.commit()
+
+    def load_tests(self, analysis_id: str, limit: int) -> List[Dict[str, Any]]:
+        """The analysis's most recent load test results, newest first"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT payload FROM load_tests WHERE analysis_id = ? ORDER BY created_at DESC LIMIT ?",
+                (analysis_id, limit)
+            ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def purge_load_tests(self, before: float):
+        """Delete load test results started before the given time"""
+        with self._lock:
+            self._conn.execute("DELETE FROM load_tests WHERE created_at < ?", (before,))
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class AnalysisStore:
+    """
+    Keeps analyses as versioned, language-independent records so wrappers for other
+    languages can be generated later without re-extracting or re-analysing.
+    Documentation snapshots and load test results are kept in a RecordStore instead of the cache
+    """
+
+    def __init__(self,
+                 cache: LayeredCache,
+                 ttl: Optional[float] = None,
+                 records: Optional[RecordStore] = None,
+                 snapshot_ttl: Optional[float] = None,
+                 max_snapshots: Optional[int] = None):
+        self.cache = cache
+        self.ttl = ttl if ttl is not None else float(os.getenv("ANALYSIS_TTL_SECONDS", str(7 * 86400)))
+        # A URL not re-analysed for this long starts again from a full analysis
+        self.snapshot_ttl = (snapshot_ttl if snapshot_ttl is not None
+                             else float(os.getenv("ANALYSIS_SNAPSHOT_TTL_SECONDS", str(90 * 86400))))
+        self.max_snapshots = (max_snapshots if max_snapshots is not None
+                              else int(os.getenv("ANALYSIS_MAX_SNAPSHOTS", "10000")))
+        self.records = records or RecordStore.from_env()
+        now = time.time()
+        # Results of expired analyses can no longer be looked up
+        try:
+            self.records.purge_load_tests(now - self.ttl)
+        except sqlite3.Error as e:
+            logger.error(f"Could not purge old load test results: {str(e)}")
+        try:
+            removed = self.records.purge_snapshots(now - self.snapshot_ttl, self.max_snapshots)
+            if removed:
+                logger.info(f"Purged {removed} documentation snapshots")
+        except sqlite3.Error as e:
+            logger.error(f"Could not purge old documentation snapshots: {str(e)}")
+
+    async def save(self,
+                   documentation_url: str,
+                   use_case: str,
+                   endpoints: List[Dict[str, Any]],
+                   auth_methods: List[Dict[str, Any]],
+                   source: str,
+                   base_url: Optional[str] = None) -> AnalysisIR:
+        """
+        Store an analysis under an ID derived from its content
+        """
+        analysis_id = make_key(IR_VERSION, documentation_url, use_case, endpoints, auth_methods, base_url)[:20]
+        ir = AnalysisIR(
+            analysis_id=analysis_id,
+            version=IR_VERSION,
+            documentation_url=documentation_url,
+            use_case=use_case,
+            source=source,
+            base_url=base_url,
+            endpoints=endpoints,
+            auth_methods=auth_methods,
+            created_at=time.time()
+        )
+        await self.cache.set("analysis", analysis_id, ir.model_dump(), ttl=self.ttl)
+        return ir
+
+    async def get(self, analysis_id: str) -> Optional[AnalysisIR]:
+        data = await self.cache.get("analysis", analysis_id)
+        if data is None or data.get("version") != IR_VERSION:
+            return None
+        return AnalysisIR(**data)
+
+    async def add_load_test(self, analysis_id: str, result: LoadTestResult):
+        """
+        Keep a load test result next to the analysis of the API it exercised; results are
+        deleted with the same expiry as analyses, at startup
+        """
+        await asyncio.to_thread(self.records.add_load_test, analysis_id, result.model_dump())
+
+    async def load_tests(self, analysis_id: str) -> List[LoadTestResult]:
+        """The most recent MAX_LOAD_TESTS results for the analysis, newest first"""
+        results = await asyncio.to_thread(self.records.load_tests, analysis_id, MAX_LOAD_TESTS)
+        return [LoadTestResult(**data) for data in results]
+
+    async def save_snapshot(self, snapshot: Dict[str, Any]):
+        """
+        Keep the latest analysis of a documentation URL with its section hashes, as the
+        baseline for the next re-analysis of that URL. At startup, snapshots older than
+        snapshot_ttl are deleted, and the oldest ones beyond max_snapshots
+        """
+        await asyncio.to_thread(self.records.save_snapshot, snapshot["documentation_url"],
+                                dict(snapshot, version=SNAPSHOT_VERSION))
+
+    async def get_snapshot(self, documentation_url: str) -> Optional[Dict[str, Any]]:
+        data = await asyncio.to_thread(self.records.get_snapshot, documentation_url)
+        if data is None or data.get("version") != SNAPSHOT_VERSION:
+            return None
+        return data
+
+    def close(self):
+        self.records.close()
@@ -0,0 +1,144 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Set
+from urllib.parse import urlparse
+
+from app.models.schemas import ApiRequest, ApiResponse
+from app.services.cache import make_key
+
+logger = logging.getLogger(__name__)
+
+
+def job_key(job: ApiRequest) -> str:
+    """Stable identifier of a job, used to skip already finished jobs on resume"""
+    return make_key(str(job.documentation_url), job.use_case, job.preferred_language)[:16]
+
+
+class BatchRunner:
+    """
+    Run many analyses through the extractor and WrapperGenerator.
+
+    A global semaphore bounds the number of analyses in flight and a per-host semaphore
+    keeps us from hammering one documentation site; model calls are additionally paced
+    by the GeminiService rate limiter.
+    """
+
+    def __init__(self, extractor, generator, max_concurrency: int = 4, per_host_concurrency: int = 2):
+        self.extractor = extractor
+        self.generator = generator
+        self.max_concurrency = max_concurrency
+        self.per_host_concurrency = per_host_concurrency
+
+    async def run(self, jobs: List[ApiRequest], skip: Iterable[str] = ()) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Yield one result record per job, in completion order, skipping job keys in skip
+        """
+        skip = set(skip)
+        slots = asyncio.Semaphore(self.max_concurrency)
+        host_slots: Dict[str, asyncio.Semaphore] = {}
+        results: asyncio.Queue = asyncio.Queue()
+
+        async def run_job(index: int, job: ApiRequest):
+            host = urlparse(str(job.documentation_url)).netloc
+            host_slot = host_slots.setdefault(host, asyncio.Semaphore(self.per_host_concurrency))
+            async with host_slot, slots:
+                await results.put(await self._run_one(index, job))
+
+        pending = [
+            asyncio.ensure_future(run_job(index, job))
+            for index, job in enumerate(jobs)
+            if job_key(job) not in skip
+        ]
+        try:
+            for _ in range(len(pending)):
+                yield await results.get()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def _run_one(self, index: int, job: ApiRequest) -> Dict[str, Any]:
+        start = time.perf_counter()
+        record = {
+            "key": job_key(job),
+            "index": index,
+            "documentation_url": str(job.documentation_url),
+            "use_case": job.use_case,
+            "preferred_language": job.preferred_language
+        }
+        try:
+            extracted_data = await self.extractor.extract(
+                str(job.documentation_url),
+                use_cache=job.use_cache,
+                crawl=job.crawl,
+                max_depth=job.crawl_max_depth,
+                max_pages=job.crawl_max_pages
+            )
+            result = await self.generator.process_api_documentation(
+                extracted_data,
+                job.use_case,
+                job.preferred_language,
+                use_cache=job.use_cache,
+                additional_languages=job.additional_languages,
+                codegen_mode=job.codegen_mode
+            )
+            record["status"] = "ok"
+            record["result"] = ApiResponse(**result).model_dump()
+        except Exception as e:
+            logger.error(f"Batch job {index} ({job.documentation_url}) failed: {str(e)}")
+            record["status"] = "error"
+            record["error"] = str(e)
+        record["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        return record
+
+    async def run_to_file(self, jobs: List[ApiRequest], output_path: str) -> Dict[str, int]:
+        """
+        Append results to a JSONL file as they complete.
+
+        Jobs that already have a successful line in the file are skipped, so an
+        interrupted run can simply be started again with the same arguments.
+        """
+        done = completed_keys(output_path)
+        counts = {"skipped": sum(1 for job in jobs if job_key(job) in done), "ok": 0, "error": 0}
+
+        with open(output_path, "a", encoding="utf-8") as output:
+            async for record in self.run(jobs, skip=done):
+                output.write(json.dumps(record) + "\n")
+                output.flush()
+                counts[record["status"]] += 1
+                logger.info(f"[{counts['ok'] + counts['error']}/{len(jobs) - counts['skipped']}] "
+                            f"{record['status']} {record['documentation_url']} ({record['elapsed_ms']} ms)")
+        return counts
+
+
+def completed_keys(output_path: str) -> Set[str]:
+    """Keys of jobs with a successful result in an existing JSONL output file"""
+    keys = set()
+    if not os.path.exists(output_path):
+        return keys
+    with open(output_path, encoding="utf-8") as output:
+        for line in output:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # A line cut short by a crash; the job will simply run again
+                continue
+            if record.get("status") == "ok":
+                keys.add(record["key"])
+    return keys
+
+
+def load_jobs(path: str, defaults: Optional[Dict[str, Any]] = None) -> List[ApiRequest]:
+    """Read jobs from a JSONL file with one ApiRequest object per line"""
+    jobs = []
+    with open(path, encoding="utf-8") as source:
+        for number, line in enumerate(source, 1):
+            if not line.strip():
+                continue
+            try:
+                jobs.append(ApiRequest(**{**(defaults or {}), **json.loads(line)}))
+            except Exception as e:
+                raise ValueError(f"{path}:{number}: invalid job: {e}") from e
+    return jobs
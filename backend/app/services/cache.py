@@ -0,0 +1,293 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def make_key(*parts: Any) -> str:
+    """
+    Build a content-addressed cache key from JSON-serialisable parts
+    """
+    payload = json.dumps(parts, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def connect_sqlite(path: str, timeout: float = 5.0) -> sqlite3.Connection:
+    """
+    Open a SQLite database that several server processes (e.g. uvicorn workers) can share.
+
+    WAL lets reads proceed while another process writes, synchronous=NORMAL skips the
+    fsync on every commit (a power loss can drop the last writes, but not corrupt the
+    file), and timeout waits for another process's write lock instead of failing
+    """
+    conn = sqlite3.connect(path, timeout=timeout, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+class MemoryCache:
+    """
+    In-process LRU cache with per-entry TTL, bounded by entry count and total bytes.
+
+    Values are stored serialised so callers can never mutate a cached entry.
+    """
+
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, payload = entry
+            if expires_at < time.time():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return payload
+
+    def set(self, key: str, payload: str, ttl: float):
+        size = len(payload)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.time() + ttl, payload)
+            self.total_bytes += size
+            while len(self._entries) > self.max_entries or self.total_bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+
+    def delete(self, key: str):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def _remove(self, key: str):
+        _, payload = self._entries.pop(key)
+        self.total_bytes -= len(payload)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteCache:
+    """
+    On-disk cache backend so cached results survive restarts and are shared by the
+    server processes that point at the same file.
+
+    Expired rows are only deleted by purge_expired, which also trims the table to
+    max_rows entries and max_bytes of payload, dropping the entries closest to expiry first
+    """
+
+    def __init__(self, path: str, max_rows: Optional[int] = None, max_bytes: Optional[int] = None):
+        self.path = path
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = connect_sqlite(path)
+        with self._lock:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "key TEXT PRIMARY KEY, payload TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS cache_expires_at ON cache (expires_at)")
+            self._conn.commit()
+
+    def get(self, key: str) -> Optional[str]:
+        entry = self.get_entry(key)
+        return entry[0] if entry is not None else None
+
+    def get_entry(self, key: str) -> Optional[Tuple[str, float]]:
+        """The payload and its expiry time, or None when missing or expired"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload, expires_at FROM cache WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        payload, expires_at = row
+        if expires_at < time.time():
+            self.delete(key)
+            return None
+        return payload, expires_at
+
+    def set(self, key: str, payload: str, ttl: float):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, payload, expires_at) VALUES (?, ?, ?)",
+                (key, payload, time.time() + ttl)
+            )
+            self._conn.commit()
+
+    def delete(self, key: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def purge_expired(self) -> int:
+        """Delete expired entries, then the ones over the row and byte limits; return the number deleted"""
+        with self._lock:
+            removed = self._conn.execute("DELETE FROM cache WHERE expires_at < ?", (time.time(),)).rowcount
+            if self.max_rows:
+                removed += self._conn.execute(
+                    "DELETE FROM cache WHERE key IN ("
+                    "SELECT key FROM cache ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_rows,)
+                ).rowcount
+            if self.max_bytes:
+                removed += self._conn.execute(
+                    "DELETE FROM cache WHERE key IN ("
+                    "SELECT key FROM (SELECT key, SUM(LENGTH(CAST(payload AS BLOB))) "
+                    "OVER (ORDER BY expires_at DESC, key) AS kept FROM cache) WHERE kept > ?)",
+                    (self.max_bytes,)
+                ).rowcount
+            self._conn.commit()
+        return removed
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class LayeredCache:
+    """
+    Namespaced cache that checks memory first and falls back to the optional SQLite layer.
+
+    Other server processes sharing the SQLite file can overwrite an entry, so with a disk
+    layer the memory copies live at most memory_ttl seconds.
+
+    Hits and misses are counted per namespace (e.g. "extraction", "gemini").
+    """
+
+    def __init__(self,
+                 memory: Optional[MemoryCache] = None,
+                 disk: Optional[SQLiteCache] = None,
+                 default_ttl: float = 86400,
+                 memory_ttl: float = 30,
+                 purge_seconds: float = 600):
+        self.memory = memory or MemoryCache()
+        self.disk = disk
+        self.default_ttl = default_ttl
+        self.memory_ttl = memory_ttl
+        self.purge_seconds = purge_seconds
+        self._purger: Optional[asyncio.Task] = None
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    @classmethod
+    def from_env(cls) -> "LayeredCache":
+        """
+        Build the cache from CACHE_* environment variables
+        """
+        memory = MemoryCache(
+            max_entries=int(os.getenv("CACHE_MAX_ENTRIES", "1024")),
+            max_bytes=int(os.getenv("CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+        )
+        disk = None
+        sqlite_path = os.getenv("CACHE_SQLITE_PATH")
+        if sqlite_path:
+            try:
+                disk = SQLiteCache(
+                    sqlite_path,
+                    max_rows=int(os.getenv("CACHE_SQLITE_MAX_ROWS", "100000")),
+                    max_bytes=int(os.getenv("CACHE_SQLITE_MAX_BYTES", str(1024 * 1024 * 1024)))
+                )
+            except sqlite3.Error as e:
+                logger.error(f"Could not open cache database {sqlite_path}: {str(e)}")
+        return cls(
+            memory, disk,
+            default_ttl=float(os.getenv("CACHE_TTL_SECONDS", "86400")),
+            memory_ttl=float(os.getenv("CACHE_MEMORY_TTL_SECONDS", "30")),
+            purge_seconds=float(os.getenv("CACHE_PURGE_INTERVAL_SECONDS", "600"))
+        )
+
+    def start(self):
+        """Purge the disk layer now and then every purge_seconds; call from a running event loop"""
+        if self.disk is not None and self._purger is None:
+            self._purger = asyncio.create_task(self._purge_periodically())
+
+    async def _purge_periodically(self):
+        while True:
+            try:
+                removed = await asyncio.to_thread(self.disk.purge_expired)
+                if removed:
+                    logger.info(f"Purged {removed} entries from the cache database")
+            except sqlite3.Error as e:
+                logger.error(f"Could not purge the cache database: {str(e)}")
+            await asyncio.sleep(self.purge_seconds)
+
+    async def get(self, namespace: str, key: str) -> Optional[Any]:
+        full_key = f"{namespace}:{key}"
+        counters = self._counters(namespace)
+
+        payload = self.memory.get(full_key)
+        if payload is not None:
+            counters["memory_hits"] += 1
+        elif self.disk is not None:
+            entry = None
+            try:
+                entry = await asyncio.to_thread(self.disk.get_entry, full_key)
+            except sqlite3.Error as e:
+                logger.error(f"Cache read failed for {full_key}: {str(e)}")
+            if entry is not None:
+                payload, expires_at = entry
+                counters["disk_hits"] += 1
+                self.memory.set(full_key, payload, min(expires_at - time.time(), self.memory_ttl))
+
+        if payload is None:
+            counters["misses"] += 1
+            return None
+        counters["hits"] += 1
+        return json.loads(payload)
+
+    async def set(self, namespace: str, key: str, value: Any, ttl: Optional[float] = None):
+        full_key = f"{namespace}:{key}"
+        ttl = ttl if ttl is not None else self.default_ttl
+        payload = json.dumps(value, default=str)
+        self.memory.set(full_key, payload, ttl if self.disk is None else min(ttl, self.memory_ttl))
+        if self.disk is not None:
+            try:
+                await asyncio.to_thread(self.disk.set, full_key, payload, ttl)
+            except sqlite3.Error as e:
+                logger.error(f"Cache write failed for {full_key}: {str(e)}")
+
+    async def delete(self, namespace: str, key: str):
+        full_key = f"{namespace}:{key}"
+        self.memory.delete(full_key)
+        if self.disk is not None:
+            await asyncio.to_thread(self.disk.delete, full_key)
+
+    def _counters(self, namespace: str) -> Dict[str, int]:
+        if namespace not in self._stats:
+            self._stats[namespace] = {"hits": 0, "misses": 0, "memory_hits": 0, "disk_hits": 0}
+        return self._stats[namespace]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "namespaces": {name: dict(counters) for name, counters in self._stats.items()},
+            "memory_entries": len(self.memory),
+            "memory_bytes": self.memory.total_bytes,
+            "disk_enabled": self.disk is not None
+        }
+
+    def close(self):
+        if self._purger is not None:
+            self._purger.cancel()
+            self._purger = None
+        if self.disk is not None:
+            self.disk.close()
@@ -0,0 +1,550 @@
+import json
+import keyword
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+# Languages the template generator can render, keyed by the names the frontend sends
+TEMPLATE_LANGUAGES = {
+    "python": "python",
+    "py": "python",
+    "typescript": "typescript",
+    "ts": "typescript",
+}
+
+DEFAULT_BASE_URL = "https://api.example.com"
+
+_PATH_PARAM_RE = re.compile(r"{([^}]+)}")
+_WORD_RE = re.compile(r"[A-Za-z0-9]+")
+_VERSION_RE = re.compile(r"^v\d+(\.\d+)?$", re.IGNORECASE)
+_API_KEY_LOCATION_RE = re.compile(r"\b(header|query)\b[^'\"]*['\"]([\w-]+)['\"]", re.IGNORECASE)
+_HEADER_NAME_RE = re.compile(r"\b(X-[\w-]+|Authorization)\b", re.IGNORECASE)
+_BODY_METHODS = ("POST", "PUT", "PATCH")
+
+_PYTHON_TYPES = {"string": "str", "integer": "int", "number": "float", "boolean": "bool", "object": "Dict[str, Any]"}
+_TS_TYPES = {"string": "string", "integer": "number", "number": "number", "boolean": "boolean", "object": "Record<string, unknown>"}
+
+
+def template_language(language: str) -> Optional[str]:
+    """The template language for a requested language, or None when only the LLM can generate it"""
+    return TEMPLATE_LANGUAGES.get(language.strip().lower())
+
+
+def render_wrapper(language: str,
+                   endpoints: List[Dict[str, Any]],
+                   auth_methods: List[Dict[str, Any]],
+                   use_case: str,
+                   base_url: Optional[str] = None,
+                   docstrings: Optional[Dict[str, str]] = None) -> str:
+    """
+    Render a wrapper class from the analysed endpoints and auth methods.
+
+    Output is deterministic for the same input. docstrings optionally replaces the
+    generated description of a method, keyed by the method name from client_methods().
+    """
+    target = template_language(language)
+    if target is None:
+        raise ValueError(f"No template for language: {language}")
+    methods = client_methods(endpoints)
+    auth = _auth_scheme(auth_methods)
+    render = _render_python if target == "python" else _render_typescript
+    return render(methods, auth, use_case, base_url or DEFAULT_BASE_URL, docstrings or {})
+
+
+def client_methods(endpoints: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Normalize endpoints into methods with a unique snake_case name and parameters
+    sorted into path, query, header and body
+    """
+    methods = []
+    used = set()
+    for endpoint in endpoints:
+        http_method = str(endpoint.get("method", "GET")).upper()
+        path = str(endpoint.get("path", "/"))
+        name = _method_name(http_method, path)
+        unique = name
+        counter = 2
+        while unique in used:
+            unique = f"{name}_{counter}"
+            counter += 1
+        used.add(unique)
+
+        params = []
+        seen = set()
+        path_names = _PATH_PARAM_RE.findall(path)
+        for original in path_names:
+            params.append(_param(original, {"in": "path", "required": True, "type": "string"}, http_method, path))
+            seen.add(original)
+        raw_params = endpoint.get("parameters") or {}
+        if isinstance(raw_params, dict):
+            for original, info in raw_params.items():
+                if original in seen:
+                    # Keep the documented type of a path parameter
+                    for param in params:
+                        if param["name"] == original and isinstance(info, dict) and info.get("type"):
+                            param["type"] = str(info["type"])
+                    continue
+                seen.add(original)
+                params.append(_param(original, info if isinstance(info, dict) else {}, http_method, path))
+
+        # Python identifiers for parameters must be unique too
+        identifiers = set()
+        for param in params:
+            ident = param["ident"]
+            while ident in identifiers:
+                ident += "_"
+            param["ident"] = ident
+            identifiers.add(ident)
+
+        methods.append({
+            "name": unique,
+            "http_method": http_method,
+            "path": path,
+            "description": str(endpoint.get("description") or f"{http_method} {path}").strip(),
+            "params": params,
+            "accepts_body": http_method in _BODY_METHODS,
+        })
+    return methods
+
+
+def _method_name(http_method: str, path: str) -> str:
+    words = []
+    for segment in path.strip("/").split("/"):
+        if not segment or _VERSION_RE.match(segment):
+            continue
+        match = _PATH_PARAM_RE.fullmatch(segment)
+        if match:
+            words.extend(["by"] + _words(match.group(1)))
+        else:
+            words.extend(_words(segment))
+    verb = {"GET": "get", "POST": "create", "PUT": "replace", "PATCH": "update", "DELETE": "delete"}.get(http_method, http_method.lower())
+    return "_".join([verb] + words) or verb
+
+
+def _words(text: str) -> List[str]:
+    # Split camelCase as well as separators so both styles give the same snake_case
+    text = re.sub(r"([a-z0-9])([A-Z])", r"\1_\2", text)
+    return [w.lower() for w in _WORD_RE.findall(text)]
+
+
+def _param(original: str, info: Dict[str, Any], http_method: str, path: str) -> Dict[str, Any]:
+    location = str(info.get("in") or "").lower()
+    if location not in ("path", "query", "header", "body"):
+        if "{" + original + "}" in path:
+            location = "path"
+        elif http_method in _BODY_METHODS:
+            location = "body"
+        else:
+            location = "query"
+    ident = "_".join(_words(original)) or "value"
+    if ident[0].isdigit():
+        ident = f"p_{ident}"
+    if keyword.iskeyword(ident) or ident in ("self", "body", "headers", "params"):
+        ident += "_"
+    return {
+        "name": original,
+        "ident": ident,
+        "in": location,
+        "required": location == "path" or bool(info.get("required", False)),
+        "type": str(info.get("type") or "string"),
+        "description": str(info.get("description") or "").strip(),
+    }
+
+
+def _auth_scheme(auth_methods: List[Dict[str, Any]]) -> Dict[str, str]:
+    """
+    Pick the first auth method the templates know how to handle. The environment
+    variable names match the generated .env template.
+    """
+    for auth in auth_methods:
+        auth_type = str(auth.get("type", "")).lower()
+        description = str(auth.get("description", ""))
+        if "api key" in auth_type or "apikey" in auth_type:
+            location, name = "header", "X-API-Key"
+            match = _API_KEY_LOCATION_RE.search(description)
+            if match:
+                location, name = match.group(1).lower(), match.group(2)
+            else:
+                header = _HEADER_NAME_RE.search(description)
+                if header:
+                    name = header.group(1)
+            return {"kind": "api_key", "in": location, "name": name}
+        if "basic" in auth_type:
+            return {"kind": "basic"}
+        if "bearer" in auth_type or "token" in auth_type or "oauth" in auth_type or "openid" in auth_type:
+            return {"kind": "bearer", "oauth": "oauth" in auth_type or "openid" in auth_type}
+    return {"kind": "none"}
+
+
+def _split_type(type_name: str) -> Tuple[Optional[str], str]:
+    match = re.fullmatch(r"array\[(.*)\]", type_name)
+    return ("array", match.group(1)) if match else (None, type_name)
+
+
+def _python_type(type_name: str) -> str:
+    container, inner = _split_type(type_name)
+    if container:
+        return f"List[{_python_type(inner)}]"
+    return _PYTHON_TYPES.get(inner.lower(), "Any")
+
+
+def _ts_type(type_name: str) -> str:
+    container, inner = _split_type(type_name)
+    if container:
+        item = _ts_type(inner)
+        return f"Array<{item}>"
+    return _TS_TYPES.get(inner.lower(), "unknown")
+
+
+def _py_str(value: str) -> str:
+    return json.dumps(value)
+
+
+def _ts_str(value: str) -> str:
+    return '"' + value.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def _comment_text(text: str) -> str:
+    # Keep descriptions from closing the surrounding docstring or comment block
+    return text.replace('"""', "'''").replace("*/", "* /").replace("\\", "\\\\")
+
+
+def _render_python(methods: List[Dict[str, Any]],
+                   auth: Dict[str, str],
+                   use_case: str,
+                   base_url: str,
+                   docstrings: Dict[str, str]) -> str:
+    kind = auth["kind"]
+    init_args = ["self", "base_url: Optional[str] = None"]
+    init_body = ['        self.base_url = (base_url or os.getenv("API_BASE_URL", %s)).rstrip("/")' % _py_str(base_url)]
+    client_kwargs = []
+    if kind == "api_key":
+        init_args.append("api_key: Optional[str] = None")
+        init_body.append('        self.api_key = api_key or os.getenv("API_KEY")')
+        init_body.append('        if not self.api_key:')
+        init_body.append('            raise ValueError("An API key is required (pass api_key or set API_KEY)")')
+        if auth["in"] == "query":
+            client_kwargs.append("params={%s: self.api_key}" % _py_str(auth["name"]))
+        else:
+            client_kwargs.append("headers={%s: self.api_key}" % _py_str(auth["name"]))
+    elif kind == "bearer":
+        init_args.append("access_token: Optional[str] = None")
+        init_body.append('        self.access_token = access_token or os.getenv("ACCESS_TOKEN")')
+        init_body.append('        if not self.access_token:')
+        init_body.append('            raise ValueError("An access token is required (pass access_token or set ACCESS_TOKEN)")')
+        client_kwargs.append('headers={"Authorization": f"Bearer {self.access_token}"}')
+    elif kind == "basic":
+        init_args.extend(["username: Optional[str] = None", "password: Optional[str] = None"])
+        init_body.append('        self.username = username or os.getenv("API_USERNAME")')
+        init_body.append('        self.password = password or os.getenv("API_PASSWORD")')
+        client_kwargs.append("auth=(self.username or \"\", self.password or \"\")")
+    init_args.append("timeout: float = 30.0")
+    client_kwargs = ["base_url=self.base_url", "timeout=timeout"] + client_kwargs
+
+    lines = [
+        '"""',
+        f"API client generated for: {_comment_text(use_case)}",
+        '"""',
+        "import os",
+        "from typing import Any, Dict, List, Optional",
+        "from urllib.parse import quote",
+        "",
+        "import httpx",
+        "",
+        "",
+        "class ApiError(Exception):",
+        '    """Raised when the API responds with an error status"""',
+        "",
+        "    def __init__(self, status_code: int, body: str):",
+        '        super().__init__(f"API request failed with status {status_code}: {body[:200]}")',
+        "        self.status_code = status_code",
+        "        self.body = body",
+        "",
+        "",
+        "class ApiClient:",
+        '    """',
+        "    Client for the API's endpoints.",
+    ]
+    if kind == "bearer" and auth.get("oauth"):
+        lines.append("")
+        lines.append("    Obtaining the OAuth access token is left to the caller; pass it in or set ACCESS_TOKEN.")
+    lines += [
+        '    """',
+        "",
+        f"    def __init__({', '.join(init_args)}):",
+        *init_body,
+        "        self._client = httpx.Client(",
+        *[f"            {kwarg}," for kwarg in client_kwargs[:-1]],
+        f"            {client_kwargs[-1]}",
+        "        )",
+        "",
+        "    def close(self):",
+        "        self._client.close()",
+        "",
+        '    def __enter__(self) -> "ApiClient":',
+        "        return self",
+        "",
+        "    def __exit__(self, *exc_info):",
+        "        self.close()",
+        "",
+        "    def _request(self,",
+        "                 method: str,",
+        "                 path: str,",
+        "                 params: Optional[Dict[str, Any]] = None,",
+        "                 headers: Optional[Dict[str, Any]] = None,",
+        "                 json: Any = None) -> Any:",
+        "        params = {k: v for k, v in (params or {}).items() if v is not None}",
+        "        headers = {k: str(v) for k, v in (headers or {}).items() if v is not None}",
+        "        response = self._client.request(method, path, params=params, headers=headers, json=json)",
+        "        if response.is_error:",
+        "            raise ApiError(response.status_code, response.text)",
+        "        if not response.content:",
+        "            return None",
+        "        try:",
+        "            return response.json()",
+        "        except ValueError:",
+        "            return response.text",
+    ]
+
+    for method in methods:
+        lines.append("")
+        lines.extend(_python_method(method, docstrings.get(method["name"])))
+
+    return "\n".join(lines) + "\n"
+
+
+def _python_method(method: Dict[str, Any], docstring: Optional[str]) -> List[str]:
+    params = method["params"]
+    ordered = [p for p in params if p["required"]] + [p for p in params if not p["required"]]
+    args = ["self"]
+    for param in ordered:
+        annotation = _python_type(param["type"])
+        if param["required"]:
+            args.append(f"{param['ident']}: {annotation}")
+        else:
+            args.append(f"{param['ident']}: Optional[{annotation}] = None")
+    body_params = [p for p in params if p["in"] == "body"]
+    if method["accepts_body"] and not body_params:
+        args.append("body: Optional[Dict[str, Any]] = None")
+
+    path_expr = method["path"]
+    for param in params:
+        if param["in"] == "path":
+            path_expr = path_expr.replace("{" + param["name"] + "}", "{quote(str(" + param["ident"] + "), safe='')}")
+    path_literal = ("f" if path_expr != method["path"] else "") + _py_str(path_expr)
+
+    signature = f"    def {method['name']}({', '.join(args)}) -> Any:"
+    doc = [f"        {line}".rstrip() for line in _comment_text(docstring or method["description"]).splitlines()] or ["        "]
+    described = [p for p in ordered if p["description"]]
+    lines = [signature, '        """', *doc]
+    if described:
+        lines.append("")
+        lines.append("        Args:")
+        for param in described:
+            lines.append(f"            {param['ident']}: {_comment_text(param['description'])}")
+    lines.append('        """')
+
+    call_args = [_py_str(method["http_method"]), path_literal]
+    for location, keyword_name in (("query", "params"), ("header", "headers")):
+        selected = [p for p in params if p["in"] == location]
+        if selected:
+            mapping = ", ".join(f"{_py_str(p['name'])}: {p['ident']}" for p in selected)
+            call_args.append(f"{keyword_name}={{{mapping}}}")
+    if body_params:
+        mapping = ", ".join(f"{_py_str(p['name'])}: {p['ident']}" for p in body_params)
+        lines.append(f"        body = {{k: v for k, v in {{{mapping}}}.items() if v is not None}}")
+        call_args.append("json=body")
+    elif method["accepts_body"]:
+        call_args.append("json=body")
+    lines.append(f"        return self._request({', '.join(call_args)})")
+    return lines
+
+
+def _ts_key(name: str) -> str:
+    return name if re.fullmatch(r"[A-Za-z_$][\w$]*", name) else _ts_str(name)
+
+
+def _ts_access(name: str) -> str:
+    return f"params.{name}" if re.fullmatch(r"[A-Za-z_$][\w$]*", name) else f"params[{_ts_str(name)}]"
+
+
+def _camel(snake: str) -> str:
+    head, *rest = snake.split("_")
+    return head + "".join(word.capitalize() for word in rest if word)
+
+
+def _render_typescript(methods: List[Dict[str, Any]],
+                       auth: Dict[str, str],
+                       use_case: str,
+                       base_url: str,
+                       docstrings: Dict[str, str]) -> str:
+    kind = auth["kind"]
+    options = ["  baseUrl?: string;"]
+    fields = ["  private readonly baseUrl: string;"]
+    ctor = [f'    this.baseUrl = (options.baseUrl ?? env("API_BASE_URL") ?? {_ts_str(base_url)}).replace(/\\/+$/, "");']
+    auth_headers = []
+    auth_query = []
+    if kind == "api_key":
+        options.append("  apiKey?: string;")
+        fields.append("  private readonly apiKey: string;")
+        ctor += [
+            '    const apiKey = options.apiKey ?? env("API_KEY");',
+            "    if (!apiKey) {",
+            '      throw new Error("An API key is required (pass apiKey or set API_KEY)");',
+            "    }",
+            "    this.apiKey = apiKey;",
+        ]
+        target = auth_query if auth["in"] == "query" else auth_headers
+        target.append(f"{_ts_str(auth['name'])}: this.apiKey")
+    elif kind == "bearer":
+        options.append("  accessToken?: string;")
+        fields.append("  private readonly accessToken: string;")
+        ctor += [
+            '    const accessToken = options.accessToken ?? env("ACCESS_TOKEN");',
+            "    if (!accessToken) {",
+            '      throw new Error("An access token is required (pass accessToken or set ACCESS_TOKEN)");',
+            "    }",
+            "    this.accessToken = accessToken;",
+        ]
+        auth_headers.append("Authorization: `Bearer ${this.accessToken}`")
+    elif kind == "basic":
+        options += ["  username?: string;", "  password?: string;"]
+        fields.append("  private readonly basicAuth: string;")
+        ctor += [
+            '    const username = options.username ?? env("API_USERNAME") ?? "";',
+            '    const password = options.password ?? env("API_PASSWORD") ?? "";',
+            "    this.basicAuth = btoa(`${username}:${password}`);",
+        ]
+        auth_headers.append("Authorization: `Basic ${this.basicAuth}`")
+
+    lines = [
+        "/**",
+        f" * API client generated for: {_comment_text(use_case)}",
+        " */",
+        "",
+        "type QueryValue = string | number | boolean | undefined | null;",
+        "",
+        "function env(name: string): string | undefined {",
+        '  return typeof process !== "undefined" ? process.env[name] : undefined;',
+        "}",
+        "",
+        "export class ApiError extends Error {",
+        "  constructor(public readonly status: number, public readonly body: string) {",
+        "    super(`API request failed with status ${status}: ${body.slice(0, 200)}`);",
+        '    this.name = "ApiError";',
+        "  }",
+        "}",
+        "",
+        "export interface ApiClientOptions {",
+        *options,
+        "}",
+        "",
+    ]
+    if kind == "bearer" and auth.get("oauth"):
+        lines.append("/** Obtaining the OAuth access token is left to the caller; pass it in or set ACCESS_TOKEN. */")
+    lines += [
+        "export class ApiClient {",
+        *fields,
+        "",
+        "  constructor(options: ApiClientOptions = {}) {",
+        *ctor,
+        "  }",
+        "",
+        "  private async request<T>(",
+        "    method: string,",
+        "    path: string,",
+        "    query: Record<string, QueryValue> = {},",
+        "    headers: Record<string, QueryValue> = {},",
+        "    body?: unknown",
+        "  ): Promise<T> {",
+        "    const url = new URL(this.baseUrl + path);",
+        f"    const allQuery: Record<string, QueryValue> = {{ {', '.join(auth_query + ['...query'])} }};",
+        "    for (const [key, value] of Object.entries(allQuery)) {",
+        "      if (value !== undefined && value !== null) {",
+        "        url.searchParams.set(key, String(value));",
+        "      }",
+        "    }",
+        "    const requestHeaders: Record<string, string> = {",
+        *[f"      {header}," for header in auth_headers],
+        '      Accept: "application/json",',
+        "    };",
+        "    for (const [key, value] of Object.entries(headers)) {",
+        "      if (value !== undefined && value !== null) {",
+        "        requestHeaders[key] = String(value);",
+        "      }",
+        "    }",
+        "    if (body !== undefined) {",
+        '      requestHeaders["Content-Type"] = "application/json";',
+        "    }",
+        "    const response = await fetch(url, {",
+        "      method,",
+        "      headers: requestHeaders,",
+        "      body: body !== undefined ? JSON.stringify(body) : undefined,",
+        "    });",
+        "    const text = await response.text();",
+        "    if (!response.ok) {",
+        "      throw new ApiError(response.status, text);",
+        "    }",
+        "    if (!text) {",
+        "      return undefined as T;",
+        "    }",
+        "    try {",
+        "      return JSON.parse(text) as T;",
+        "    } catch {",
+        "      return text as unknown as T;",
+        "    }",
+        "  }",
+    ]
+
+    for method in methods:
+        lines.append("")
+        lines.extend(_typescript_method(method, docstrings.get(method["name"])))
+
+    lines.append("}")
+    return "\n".join(lines) + "\n"
+
+
+def _typescript_method(method: Dict[str, Any], docstring: Optional[str]) -> List[str]:
+    params = method["params"]
+    fields = [f"{_ts_key(p['name'])}{'' if p['required'] else '?'}: {_ts_type(p['type'])}" for p in params]
+    body_params = [p for p in params if p["in"] == "body"]
+    if method["accepts_body"] and not body_params:
+        fields.append("body?: Record<string, unknown>")
+    any_required = any(p["required"] for p in params)
+
+    doc = _comment_text(docstring or method["description"]).splitlines() or [""]
+    lines = ["  /**", *[f"   * {line}".rstrip() for line in doc]]
+    for param in params:
+        if param["description"]:
+            lines.append(f"   * @param params.{param['name']} {_comment_text(param['description'])}")
+    lines.append("   */")
+
+    name = _camel(method["name"])
+    if fields:
+        default = "" if any_required else " = {}"
+        lines.append(f"  async {name}(params: {{ {'; '.join(fields)} }}{default}): Promise<unknown> {{")
+    else:
+        lines.append(f"  async {name}(): Promise<unknown> {{")
+
+    path_expr = method["path"].replace("`", "\\`").replace("${", "\\${")
+    for param in params:
+        if param["in"] == "path":
+            path_expr = path_expr.replace(
+                "{" + param["name"] + "}", "${encodeURIComponent(String(" + _ts_access(param["name"]) + "))}"
+            )
+
+    def mapping(location):
+        selected = [p for p in params if p["in"] == location]
+        return "{ " + ", ".join(f"{_ts_key(p['name'])}: {_ts_access(p['name'])}" for p in selected) + " }" if selected else "{}"
+
+    if body_params:
+        body = mapping("body")
+    elif method["accepts_body"]:
+        body = "params.body"
+    else:
+        body = None
+    call = [_ts_str(method["http_method"]), f"`{path_expr}`", mapping("query"), mapping("header")]
+    if body is not None:
+        call.append(body)
+    lines.append(f"    return this.request({', '.join(call)});")
+    lines.append("  }")
+    return lines
@@ -0,0 +1,114 @@
+import logging
+import os
+from typing import Any, Dict
+
+from app.models.schemas import ApiRequest, ApiResponse, ReanalysisResponse
+from app.services.analysis_store import AnalysisStore
+from app.services.cache import LayeredCache
+from app.services.extractor import ApiExtractor
+from app.services.gemini_service import GeminiService
+from app.services.generator import WrapperGenerator
+from app.services.jobs import JobQueue
+from app.services.load_test import LoadTester
+from app.services.proxy import ProxyClient
+
+logger = logging.getLogger(__name__)
+
+# Settings that must point at shared files when the server runs several worker processes
+SHARED_STATE_SETTINGS = ("CACHE_SQLITE_PATH", "RATE_LIMIT_SQLITE_PATH", "JOB_STORE_PATH")
+
+class Services:
+    """
+    The service instances shared by the routes. Built by the app's lifespan handler
+    and stored on app.state, rather than at import time
+    """
+
+    def __init__(self, cache: LayeredCache):
+        self.cache = cache
+        self.extractor = ApiExtractor(cache)
+        self.gemini_service = GeminiService(cache)
+        self.analysis_store = AnalysisStore(cache)
+        self.generator = WrapperGenerator(self.gemini_service, self.analysis_store)
+        self.proxy_client = ProxyClient()
+        self.load_tester = LoadTester(self.proxy_client, self.analysis_store)
+        # Background workers for /api/jobs; identical in-flight requests share one execution
+        self.job_queue = JobQueue.from_env(self.analyze)
+
+    @classmethod
+    def from_env(cls) -> "Services":
+        return cls(LayeredCache.from_env())
+
+    async def extract(self, request: ApiRequest) -> Dict[str, Any]:
+        """
+        Extract from a single page, or crawl the documentation site when requested
+        """
+        return await self.extractor.extract(
+            str(request.documentation_url),
+            use_cache=request.use_cache,
+            crawl=request.crawl,
+            max_depth=request.crawl_max_depth,
+            max_pages=request.crawl_max_pages
+        )
+
+    async def analyze(self, request: ApiRequest) -> ApiResponse:
+        """
+        Run the whole pipeline for one request
+        """
+        # Step 1: Extract information from the API documentation URL
+        extracted_data = await self.extract(request)
+
+        # Step 2: Process the documentation and generate wrapper code
+        result = await self.generator.process_api_documentation(
+            extracted_data,
+            request.use_case,
+            request.preferred_language,
+            use_cache=request.use_cache,
+            additional_languages=request.additional_languages,
+            codegen_mode=request.codegen_mode
+        )
+
+        return ApiResponse(
+            endpoints=result["endpoints"],
+            auth_methods=result["auth_methods"],
+            suggested_integration=result["suggested_integration"],
+            wrapper_code=result["wrapper_code"],
+            env_template=result.get("env_template", ""),
+            stage_timings=result.get("stage_timings"),
+            prompt_tokens=result.get("prompt_tokens"),
+            analysis_id=result.get("analysis_id"),
+            additional_wrappers=result.get("additional_wrappers")
+        )
+
+    async def reanalyze(self, request: ApiRequest) -> ReanalysisResponse:
+        """
+        Run the pipeline again for documentation analysed before, sending only the
+        sections changed since the last run to the model
+        """
+        extracted_data = await self.extract(request)
+        result = await self.generator.reanalyze_documentation(
+            extracted_data,
+            request.use_case,
+            request.preferred_language,
+            use_cache=request.use_cache,
+            additional_languages=request.additional_languages,
+            codegen_mode=request.codegen_mode
+        )
+        return ReanalysisResponse(**result)
+
+    async def start(self):
+        if int(os.getenv("WEB_CONCURRENCY", "1")) > 1:
+            unshared = [name for name in SHARED_STATE_SETTINGS if not os.getenv(name)]
+            if unshared:
+                logger.warning(f"Running several workers without {', '.join(unshared)}; "
+                               f"each worker keeps its own copy of that state")
+        self.cache.start()
+        await self.job_queue.start()
+
+    async def aclose(self):
+        """Stop the job workers and close the pooled HTTP clients, executors and cache"""
+        await self.job_queue.aclose()
+        await self.extractor.aclose()
+        await self.proxy_client.aclose()
+        await self.gemini_service.aclose()
+        self.analysis_store.close()
+        self.cache.close()
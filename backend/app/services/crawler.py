@@ -0,0 +1,258 @@
+import asyncio
+import hashlib
+import logging
+import re
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+from urllib.parse import urldefrag, urljoin, urlparse
+from urllib.robotparser import RobotFileParser
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# Links to these are never documentation pages
+_SKIP_EXTENSIONS = (
+    ".png", ".jpg", ".jpeg", ".gif", ".svg", ".ico", ".webp", ".css", ".js", ".map",
+    ".pdf", ".zip", ".gz", ".tar", ".mp4", ".woff", ".woff2", ".ttf", ".xml"
+)
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def simhash(text: str, shingle_size: int = 3) -> int:
+    """
+    64-bit SimHash over word shingles; near-identical pages differ in only a few bits
+    """
+    words = _WORD_RE.findall(text.lower())
+    if len(words) < shingle_size:
+        shingles = [" ".join(words)]
+    else:
+        shingles = [" ".join(words[i:i + shingle_size]) for i in range(len(words) - shingle_size + 1)]
+
+    weights = [0] * 64
+    for shingle in shingles:
+        h = int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big")
+        for bit in range(64):
+            weights[bit] += 1 if h >> bit & 1 else -1
+
+    fingerprint = 0
+    for bit in range(64):
+        if weights[bit] > 0:
+            fingerprint |= 1 << bit
+    return fingerprint
+
+
+class CrawlStats:
+    def __init__(self):
+        self.pages_fetched = 0
+        self.pages_skipped_duplicate = 0
+        self.pages_skipped_robots = 0
+        self.pages_skipped_offsite = 0
+        self.pages_failed = 0
+        self.bytes_fetched = 0
+        self.started_at = time.perf_counter()
+        self.elapsed = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "pages_fetched": self.pages_fetched,
+            "pages_skipped_duplicate": self.pages_skipped_duplicate,
+            "pages_skipped_robots": self.pages_skipped_robots,
+            "pages_skipped_offsite": self.pages_skipped_offsite,
+            "pages_failed": self.pages_failed,
+            "bytes_fetched": self.bytes_fetched,
+            "elapsed_seconds": round(self.elapsed, 3),
+            "pages_per_second": round(self.pages_fetched / self.elapsed, 2) if self.elapsed else 0.0
+        }
+
+
+class DocCrawler:
+    """
+    Breadth-first crawler for multi-page documentation sites.
+
+    It stays on the start page's origin (after redirects, and a link that redirects to
+    another origin is dropped), limits concurrent requests and spaces them out per host,
+    honours robots.txt and drops pages whose text is a near-duplicate of one already seen.
+    Pages are streamed and cut off at max_bytes.
+    Each fetched page is handed to the coroutine ``parse_page(html, url)``, which returns
+    ``(page_result, text, links)``; the links feed the next crawl level. The pages of one
+    level are parsed concurrently, so a parser running in worker processes can take them in parallel.
+    """
+
+    def __init__(self,
+                 session: httpx.AsyncClient,
+                 max_depth: int = 2,
+                 max_pages: int = 30,
+                 per_host_concurrency: int = 4,
+                 delay: float = 0.25,
+                 respect_robots: bool = True,
+                 user_agent: str = "InteGreatBot",
+                 duplicate_distance: int = 3,
+                 max_bytes: int = 20 * 1024 * 1024):
+        self.session = session
+        self.max_depth = max_depth
+        self.max_pages = max_pages
+        self.per_host_concurrency = per_host_concurrency
+        self.delay = delay
+        self.respect_robots = respect_robots
+        self.user_agent = user_agent
+        self.duplicate_distance = duplicate_distance
+        self.max_bytes = max_bytes
+
+        self._host_slots: Dict[str, asyncio.Semaphore] = {}
+        self._host_next_request: Dict[str, float] = {}
+        self._host_locks: Dict[str, asyncio.Lock] = {}
+        self._robots: Dict[str, Optional[RobotFileParser]] = {}
+
+    async def crawl(self,
+                    start_url: str,
+                    parse_page: Callable[[str, str], Awaitable[Tuple[Any, str, List[str]]]]
+                    ) -> Tuple[List[Tuple[str, Any]], CrawlStats]:
+        """
+        Crawl from start_url and return the parsed pages in crawl order with the crawl stats
+        """
+        stats = CrawlStats()
+        # Set from the start page's final URL, so a docs site that redirects its entry
+        # point to another host is crawled on that host
+        origin: Optional[str] = None
+        start_url = urldefrag(start_url)[0]
+
+        seen_urls: Set[str] = {start_url}
+        seen_hashes: Set[str] = set()
+        fingerprints: List[int] = []
+        pages: List[Tuple[str, Any]] = []
+
+        frontier = [start_url]
+        for depth in range(self.max_depth + 1):
+            if not frontier or len(pages) >= self.max_pages:
+                break
+
+            budget = self.max_pages - len(pages)
+            fetched = await asyncio.gather(*(self._fetch(url, origin, stats) for url in frontier[:budget]))
+            fetched = [page for page in fetched if page is not None]
+            if origin is None:
+                if not fetched:
+                    break
+                origin = _origin(fetched[0][0])
+            # Redirect targets count as seen, so they are not fetched a second time
+            seen_urls.update(url for url, _ in fetched)
+            parsed = await asyncio.gather(*(parse_page(html, url) for url, html in fetched))
+            # SimHash is pure Python and takes tens of milliseconds on a long page
+            texts = [text for _, text, _ in parsed]
+            level_fingerprints = await asyncio.to_thread(lambda: [simhash(text) for text in texts])
+
+            next_frontier = []
+            for (url, _), (page_result, text, links), fingerprint in zip(fetched, parsed, level_fingerprints):
+                if len(pages) >= self.max_pages:
+                    continue
+
+                content_hash = hashlib.sha1(text.encode("utf-8")).hexdigest()
+                if content_hash in seen_hashes or any(
+                    bin(fingerprint ^ other).count("1") <= self.duplicate_distance for other in fingerprints
+                ):
+                    stats.pages_skipped_duplicate += 1
+                    continue
+                seen_hashes.add(content_hash)
+                fingerprints.append(fingerprint)
+                pages.append((url, page_result))
+
+                if depth == self.max_depth:
+                    continue
+                for link in links:
+                    link = urldefrag(urljoin(url, link))[0]
+                    if link in seen_urls or _origin(link) != origin:
+                        continue
+                    if urlparse(link).path.lower().endswith(_SKIP_EXTENSIONS):
+                        continue
+                    seen_urls.add(link)
+                    next_frontier.append(link)
+
+            frontier = next_frontier
+
+        stats.elapsed = time.perf_counter() - stats.started_at
+        logger.info(f"Crawled {start_url}: {stats.to_dict()}")
+        return pages, stats
+
+    async def _fetch(self, url: str, origin: Optional[str], stats: CrawlStats) -> Optional[Tuple[str, str]]:
+        """
+        Fetch an HTML page, reading at most max_bytes; return (final URL, html), or None
+        for pages that fail, are not HTML or were redirected off origin
+        """
+        host = urlparse(url).netloc
+        if not await self._allowed(url):
+            stats.pages_skipped_robots += 1
+            return None
+
+        slots = self._host_slots.setdefault(host, asyncio.Semaphore(self.per_host_concurrency))
+        async with slots:
+            await self._wait_politely(host)
+            try:
+                async with self.session.stream("GET", url, headers={"User-Agent": self.user_agent}) as response:
+                    response.raise_for_status()
+                    final_url = urldefrag(str(response.url))[0]
+                    if origin is not None and _origin(final_url) != origin:
+                        logger.info(f"Crawler skipped {url}: redirected to {final_url}")
+                        stats.pages_skipped_offsite += 1
+                        return None
+                    if "html" not in response.headers.get("content-type", "text/html"):
+                        return None
+                    body = bytearray()
+                    async for chunk in response.aiter_bytes():
+                        body.extend(chunk[:self.max_bytes - len(body)])
+                        if len(body) >= self.max_bytes:
+                            logger.info(f"Crawler stopped reading {url} at {self.max_bytes} bytes")
+                            break
+                    encoding = response.encoding or "utf-8"
+            except Exception as e:
+                logger.warning(f"Crawler could not fetch {url}: {str(e)}")
+                stats.pages_failed += 1
+                return None
+
+        stats.bytes_fetched += len(body)
+        stats.pages_fetched += 1
+        return final_url, body.decode(encoding, errors="replace")
+
+    async def _wait_politely(self, host: str):
+        """Space out request starts to the same host by at least the politeness delay"""
+        lock = self._host_locks.setdefault(host, asyncio.Lock())
+        async with lock:
+            delay = self.delay
+            robots = self._robots.get(host)
+            if robots is not None and robots.crawl_delay(self.user_agent):
+                delay = max(delay, float(robots.crawl_delay(self.user_agent)))
+            now = time.monotonic()
+            wait = self._host_next_request.get(host, now) - now
+            if wait > 0:
+                await asyncio.sleep(wait)
+            self._host_next_request[host] = max(now, now + wait) + delay
+
+    async def _allowed(self, url: str) -> bool:
+        if not self.respect_robots:
+            return True
+        parsed = urlparse(url)
+        host = parsed.netloc
+        lock = self._host_locks.setdefault(host, asyncio.Lock())
+        async with lock:
+            if host not in self._robots:
+                self._robots[host] = await self._load_robots(f"{parsed.scheme}://{host}/robots.txt")
+        robots = self._robots[host]
+        return robots is None or robots.can_fetch(self.user_agent, url)
+
+    async def _load_robots(self, robots_url: str) -> Optional[RobotFileParser]:
+        try:
+            response = await self.session.get(robots_url, headers={"User-Agent": self.user_agent}, timeout=10.0)
+        except Exception as e:
+            logger.debug(f"No robots.txt at {robots_url}: {str(e)}")
+            return None
+        if response.status_code >= 400:
+            # Missing robots.txt means everything is allowed
+            return None
+        parser = RobotFileParser()
+        parser.parse(response.text.splitlines())
+        return parser
+
+
+def _origin(url: str) -> str:
+    parsed = urlparse(url)
+    return f"{parsed.scheme}://{parsed.netloc}"
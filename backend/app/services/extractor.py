@@ -1,103 +1,396 @@
 import httpx
-from bs4 import BeautifulSoup
-import re
+import os
+import time
 import logging
-from typing import Dict, List, Any, Tuple
+import asyncio
+from typing import Dict, List, Any, Optional, Tuple
+from urllib.parse import urljoin, urlparse
+from app.services.cache import LayeredCache
+from app.services.spec_parser import SpecParser, WELL_KNOWN_SPEC_PATHS
+from app.services.crawler import DocCrawler
+from app.services.html_scanner import IncrementalScanner, scan_bytes, scan_html, DEFAULT_TEXT_BUDGET, MAX_SECTIONS, MAX_TEXT_CHARS
+from app.services.metrics import BYTES_FETCHED, observe_stage, timed
+from app.services.parse_pool import ParsePool
 
 logger = logging.getLogger(__name__)
 
 class ApiExtractor:
-    def __init__(self):
-        self.session = httpx.Client(follow_redirects=True)
+    def __init__(self, cache: Optional[LayeredCache] = None):
+        # One pooled client for the life of the app, created on first use (loading the
+        # CA bundle is a noticeable part of startup) and closed by aclose() on shutdown
+        self._session: Optional[httpx.AsyncClient] = None
+        self.cache = cache
+        # Cached pages younger than this are served without revalidating upstream
+        self.fresh_seconds = float(os.getenv("EXTRACTION_CACHE_FRESH_SECONDS", "300"))
+        # Pages are parsed as they download; reading stops at max_bytes or once
+        # text_budget characters of text have been collected
+        self.max_bytes = int(os.getenv("EXTRACTION_MAX_BYTES", str(20 * 1024 * 1024)))
+        self.text_budget = int(os.getenv("EXTRACTION_TEXT_BUDGET", str(DEFAULT_TEXT_BUDGET)))
+        self.chunk_bytes = int(os.getenv("EXTRACTION_CHUNK_BYTES", str(64 * 1024)))
+        # With EXTRACTION_WORKERS set, HTML is parsed in worker processes instead of the event loop
+        self.parse_pool = ParsePool.from_env()
+        self.spec_parser = SpecParser()
+        self.probe_well_known_specs = os.getenv("SPEC_PROBE_WELL_KNOWN", "true").lower() == "true"
+        # Well-known spec paths probed at once on a documentation site
+        self.spec_probe_concurrency = int(os.getenv("SPEC_PROBE_CONCURRENCY", "2"))
+
+    @property
+    def session(self) -> httpx.AsyncClient:
+        if self._session is None:
+            self._session = httpx.AsyncClient(
+                follow_redirects=True,
+                timeout=30.0,
+                limits=httpx.Limits(
+                    max_connections=int(os.getenv("EXTRACTOR_MAX_CONNECTIONS", "100")),
+                    max_keepalive_connections=int(os.getenv("EXTRACTOR_MAX_KEEPALIVE", "20"))
+                )
+            )
+        return self._session
+
+    async def aclose(self):
+        """Close the pooled HTTP client and stop the parser processes"""
+        if self._session is not None:
+            await self._session.aclose()
+        if self.parse_pool is not None:
+            await asyncio.to_thread(self.parse_pool.close)
     
-    async def extract_from_url(self, url: str) -> Dict[str, Any]:
+    async def extract(self,
+                      url: str,
+                      use_cache: bool = True,
+                      crawl: bool = False,
+                      max_depth: int = 2,
+                      max_pages: int = 30) -> Dict[str, Any]:
         """
-        Extract API information from documentation URL
+        Extract from a single page, or crawl the documentation site when requested
+        """
+        if crawl:
+            return await self.extract_from_site(url, max_depth=max_depth, max_pages=max_pages, use_cache=use_cache)
+        return await self.extract_from_url(url, use_cache=use_cache)
+
+    async def extract_from_url(self, url: str, use_cache: bool = True) -> Dict[str, Any]:
+        """
+        Extract API information from documentation URL.
+
+        Results are cached per URL and revalidated with a conditional GET using the
+        page's ETag/Last-Modified. With use_cache=False the cache is not read, but the
+        fresh result still replaces the cached one.
         """
         try:
-            # Fetch the documentation page
-            response = self.session.get(url, timeout=30.0)
-            response.raise_for_status()
-            
-            # Parse content
-            soup = BeautifulSoup(response.text, 'lxml')
-            
-            # Extract text content for analysis by Gemini
-            main_content = soup.find('main') or soup.find('body')
-            text_content = main_content.get_text() if main_content else soup.get_text()
-            
-            # Clean and format text
-            text_content = re.sub(r'\s+', ' ', text_content).strip()
-            
-            # Get potential endpoints by looking for common patterns
-            potential_endpoints = self._extract_potential_endpoints(soup, text_content)
-            
-            # Get potential auth methods
-            potential_auth = self._extract_auth_methods(soup, text_content)
-            
-            return {
-                "raw_text": text_content[:50000],  # Limit text size
-                "potential_endpoints": potential_endpoints,
-                "potential_auth": potential_auth,
-                "url": url
-            }
+            cached = None
+            if self.cache is not None and use_cache:
+                cached = await self.cache.get("extraction", url)
+                if cached and time.time() - cached["fetched_at"] < self.fresh_seconds:
+                    return cached["result"]
+
+            headers = {}
+            if cached:
+                if cached.get("etag"):
+                    headers["If-None-Match"] = cached["etag"]
+                if cached.get("last_modified"):
+                    headers["If-Modified-Since"] = cached["last_modified"]
+
+            # Fetch the documentation page, parsing HTML while it downloads
+            with timed("fetch"):
+                async with self.session.stream("GET", url, headers=headers) as response:
+                    if cached and response.status_code == 304:
+                        cached["fetched_at"] = time.time()
+                        await self.cache.set("extraction", url, cached)
+                        return cached["result"]
+
+                    response.raise_for_status()
+                    result = await self._read_document(response, url)
+
+            if "spec_urls" in result:
+                result.pop("links")
+                spec_urls = result.pop("spec_urls")
+                with timed("spec_discovery"):
+                    result["spec"] = await self._discover_spec(spec_urls, url)
+
+            if self.cache is not None:
+                await self.cache.set("extraction", url, {
+                    "etag": response.headers.get("etag"),
+                    "last_modified": response.headers.get("last-modified"),
+                    "fetched_at": time.time(),
+                    "result": result
+                })
+
+            return result
         
         except Exception as e:
             logger.error(f"Error extracting from URL {url}: {str(e)}")
             raise
-    
-    def _extract_potential_endpoints(self, soup, text_content) -> List[Dict]:
-        """Extract potential API endpoints from the documentation"""
-        # Look for code blocks, endpoint patterns, etc.
-        endpoints = []
-        
-        # Look for common REST API endpoint patterns in text
-        endpoint_patterns = re.finditer(r'(GET|POST|PUT|DELETE|PATCH)\s+(/[\w/{}]+)', text_content)
-        for match in endpoint_patterns:
-            method, path = match.groups()
-            endpoints.append({
-                "method": method,
-                "path": path,
-                "raw_context": text_content[max(0, match.start()-100):min(len(text_content), match.end()+100)]
-            })
-        
-        # Look for endpoint tables or lists in HTML
-        for table in soup.find_all('table'):
-            for row in table.find_all('tr'):
-                cells = row.find_all(['td', 'th'])
-                if len(cells) >= 2:
-                    # Check if this looks like an API endpoint table
-                    text = ' '.join(cell.get_text().strip() for cell in cells)
-                    if re.search(r'(GET|POST|PUT|DELETE|PATCH)\s+(/[\w/{}]+)', text):
-                        endpoints.append({
-                            "context_type": "table",
-                            "raw_context": str(table)[:1000]  # Limit size
-                        })
+
+    async def _read_document(self, response: httpx.Response, url: str) -> Dict[str, Any]:
+        """
+        Read a streamed documentation response into the extraction result.
+
+        HTML is fed to an incremental parser chunk by chunk and reading stops at the byte
+        cap or when the scanner's text budget is full, so memory does not grow with the
+        page. With a parse pool the page is downloaded (up to the byte cap) and parsed in
+        a worker process instead. A response that is an OpenAPI/Swagger/Postman document
+        is read whole (up to the byte cap) and parsed as a spec.
+        """
+        chunks = response.aiter_bytes(self.chunk_bytes)
+        first = b""
+        async for first in chunks:
+            if first:
+                break
+        received = len(first)
+        head = first[:200].decode(response.encoding or "utf-8", errors="replace")
+
+        try:
+            if self._looks_like_spec(response, url, head):
+                body = bytearray(first)
+                async for chunk in chunks:
+                    body.extend(chunk)
+                    if len(body) > self.max_bytes:
+                        raise ValueError(f"Document at {url} is larger than {self.max_bytes} bytes")
+                received = len(body)
+                text = body.decode(response.encoding or "utf-8", errors="replace")
+                spec = await asyncio.to_thread(self._load_spec, text, url)
+                if spec is not None:
+                    return {
+                        "raw_text": text[:MAX_TEXT_CHARS],
+                        "potential_endpoints": [],
+                        "potential_auth": [],
+                        "url": url,
+                        "spec": spec
+                    }
+                return await self._parse_document(text, url)
+
+            if self.parse_pool is not None:
+                body = bytearray(first)
+                while len(body) < self.max_bytes:
+                    chunk = await anext(chunks, None)
+                    if chunk is None:
                         break
-        
-        return endpoints
-    
-    def _extract_auth_methods(self, soup, text_content) -> List[Dict]:
-        """Extract authentication methods from the documentation"""
+                    body.extend(chunk)
+                received = len(body)
+                with timed("parse"):
+                    result = await self.parse_pool.run(
+                        scan_bytes, bytes(body[:self.max_bytes]), response.charset_encoding, self.text_budget
+                    )
+                result["url"] = url
+                result["spec_urls"] = self._resolve_spec_urls(result["spec_urls"], url)
+                return result
+
+            scanner = IncrementalScanner(encoding=response.charset_encoding, text_budget=self.text_budget)
+            parse_seconds = 0.0
+            chunk = first
+            while True:
+                start = time.perf_counter()
+                scanner.feed(chunk[:self.max_bytes - scanner.bytes_fed])
+                parse_seconds += time.perf_counter() - start
+                if scanner.full or scanner.bytes_fed >= self.max_bytes:
+                    logger.info(f"Stopped reading {url} after {scanner.bytes_fed} bytes "
+                                f"({'text budget full' if scanner.full else 'byte cap'})")
+                    break
+                chunk = await anext(chunks, None)
+                if chunk is None:
+                    break
+                received += len(chunk)
+            start = time.perf_counter()
+            result = scanner.close()
+            observe_stage("parse", parse_seconds + time.perf_counter() - start)
+        finally:
+            BYTES_FETCHED.inc(received, source="documentation")
+
+        result["url"] = url
+        result["spec_urls"] = self._resolve_spec_urls(result["spec_urls"], url)
+        return result
+
+    async def _parse_document(self, html: str, url: str) -> Dict[str, Any]:
+        """
+        Parse a documentation page into the extraction result in a single lxml pass,
+        in a worker process when there is a parse pool
+        """
+        if self.parse_pool is not None:
+            result = await self.parse_pool.run(scan_html, html)
+        else:
+            result = scan_html(html)
+        result["url"] = url
+        result["spec_urls"] = self._resolve_spec_urls(result["spec_urls"], url)
+        return result
+
+    async def extract_from_site(self,
+                                url: str,
+                                max_depth: int = 2,
+                                max_pages: int = 30,
+                                use_cache: bool = True) -> Dict[str, Any]:
+        """
+        Crawl same-origin documentation pages starting at url and merge what they contain
+        """
+        cache_key = f"{url}|depth={max_depth}|pages={max_pages}"
+        try:
+            if self.cache is not None and use_cache:
+                cached = await self.cache.get("crawl", cache_key)
+                if cached is not None:
+                    return cached
+
+            crawler = DocCrawler(
+                self.session,
+                max_depth=max_depth,
+                max_pages=max_pages,
+                per_host_concurrency=int(os.getenv("CRAWL_PER_HOST_CONCURRENCY", "4")),
+                delay=float(os.getenv("CRAWL_DELAY_SECONDS", "0.25")),
+                respect_robots=os.getenv("CRAWL_RESPECT_ROBOTS", "true").lower() == "true",
+                max_bytes=self.max_bytes
+            )
+
+            async def parse_page(html: str, page_url: str):
+                page = await self._parse_document(html, page_url)
+                return page, page["raw_text"], page.pop("links")
+
+            with timed("crawl"):
+                pages, stats = await crawler.crawl(url, parse_page)
+            BYTES_FETCHED.inc(stats.bytes_fetched, source="crawl")
+            if not pages:
+                raise ValueError(f"No documentation pages could be fetched from {url}")
+
+            result = self._merge_pages(pages)
+            result["url"] = url
+            result["crawl_stats"] = stats.to_dict()
+            with timed("spec_discovery"):
+                result["spec"] = await self._discover_spec(result.pop("spec_urls"), url)
+
+            if self.cache is not None:
+                await self.cache.set("crawl", cache_key, result)
+            return result
+
+        except Exception as e:
+            logger.error(f"Error crawling documentation at {url}: {str(e)}")
+            raise
+
+    def _merge_pages(self, pages: List[Tuple[str, Dict[str, Any]]]) -> Dict[str, Any]:
+        """Merge per-page extraction results, dropping repeated endpoint and auth hits"""
+        text_parts = []
+        text_length = 0
+        sections = []
+        endpoints = []
+        seen_endpoints = set()
         auth_methods = []
-        
-        # Look for common auth-related terms
-        auth_terms = [
-            "authentication", "authorization", "api key", "bearer token", 
-            "oauth", "basic auth", "jwt", "access token"
-        ]
-        
-        for term in auth_terms:
-            # Simple search for mentions of auth methods
-            matches = re.finditer(rf'\b{term}\b', text_content, re.IGNORECASE)
-            for match in matches:
-                start = max(0, match.start() - 100)
-                end = min(len(text_content), match.end() + 200)
-                context = text_content[start:end]
-                
-                auth_methods.append({
-                    "term": term,
-                    "context": context
-                })
-        
-        return auth_methods
\ No newline at end of file
+        seen_auth = set()
+        spec_urls = []
+
+        for page_url, page in pages:
+            if text_length < MAX_TEXT_CHARS:
+                text_parts.append(page["raw_text"])
+                text_length += len(page["raw_text"]) + 1
+            sections.extend(page["sections"][:MAX_SECTIONS - len(sections)])
+
+            for endpoint in page["potential_endpoints"]:
+                if "method" in endpoint:
+                    key = (endpoint["method"], endpoint["path"])
+                else:
+                    key = (endpoint.get("context_type"), endpoint["raw_context"])
+                if key not in seen_endpoints:
+                    seen_endpoints.add(key)
+                    endpoints.append(dict(endpoint, source_url=page_url))
+
+            for auth in page["potential_auth"]:
+                key = (auth["term"], auth["context"])
+                if key not in seen_auth:
+                    seen_auth.add(key)
+                    auth_methods.append(auth)
+
+            spec_urls.extend(u for u in page["spec_urls"] if u not in spec_urls)
+
+        return {
+            "raw_text": " ".join(text_parts)[:MAX_TEXT_CHARS],
+            "sections": sections,
+            "potential_endpoints": endpoints,
+            "potential_auth": auth_methods,
+            "pages": [page_url for page_url, _ in pages],
+            "spec_urls": spec_urls
+        }
+
+    def _looks_like_spec(self, response: httpx.Response, url: str, head: str) -> bool:
+        """Cheap check on the headers and the first bytes before loading a response as a JSON/YAML spec"""
+        content_type = response.headers.get("content-type", "")
+        if "json" in content_type or "yaml" in content_type:
+            return True
+        path = urlparse(url).path.lower()
+        if path.endswith((".json", ".yaml", ".yml")):
+            return True
+        head = head.lstrip()
+        return head.startswith("{") or head.startswith(("openapi:", "swagger:"))
+
+    def _resolve_spec_urls(self, candidates: List[str], url: str) -> List[str]:
+        """Make spec references found in the page absolute and drop duplicates"""
+        seen = set()
+        urls = []
+        for candidate in candidates:
+            absolute = urljoin(url, candidate.strip())
+            if absolute.startswith(("http://", "https://")) and absolute not in seen:
+                seen.add(absolute)
+                urls.append(absolute)
+        return urls
+
+    async def _discover_spec(self, spec_urls: List[str], url: str) -> Optional[Dict[str, Any]]:
+        """
+        Try spec URLs referenced by the page, then well-known paths on the same origin,
+        spec_probe_concurrency at a time; probes not started yet are skipped once one finds
+        a spec (the first path in WELL_KNOWN_SPEC_PATHS order still wins)
+        """
+        for spec_url in spec_urls[:5]:
+            spec = await self._fetch_spec(spec_url)
+            if spec is not None:
+                return spec
+
+        if not self.probe_well_known_specs:
+            return None
+
+        origin = "{0.scheme}://{0.netloc}".format(urlparse(url))
+        probes = [origin + path for path in WELL_KNOWN_SPEC_PATHS if origin + path not in spec_urls]
+        slots = asyncio.Semaphore(max(1, self.spec_probe_concurrency))
+        found = False
+
+        async def probe(probe_url: str) -> Optional[Dict[str, Any]]:
+            nonlocal found
+            async with slots:
+                if found:
+                    return None
+                spec = await self._fetch_spec(probe_url, timeout=5.0)
+                found = found or spec is not None
+            return spec
+
+        results = await asyncio.gather(*(probe(probe_url) for probe_url in probes))
+        return next((spec for spec in results if spec is not None), None)
+
+    async def _fetch_spec(self, spec_url: str, timeout: float = 10.0) -> Optional[Dict[str, Any]]:
+        """
+        Stream a candidate spec, giving up once it is larger than max_bytes, and load and
+        parse it in a worker thread; None when there is no usable spec at spec_url
+        """
+        received = 0
+        try:
+            async with self.session.stream("GET", spec_url, timeout=timeout) as response:
+                if response.status_code != 200:
+                    return None
+                body = bytearray()
+                async for chunk in response.aiter_bytes(self.chunk_bytes):
+                    received += len(chunk)
+                    if received > self.max_bytes:
+                        logger.info(f"Skipped spec at {spec_url}: larger than {self.max_bytes} bytes")
+                        return None
+                    body.extend(chunk)
+                text = body.decode(response.encoding or "utf-8", errors="replace")
+            return await asyncio.to_thread(self._load_spec, text, spec_url)
+        except Exception as e:
+            logger.debug(f"No spec at {spec_url}: {str(e)}")
+            return None
+        finally:
+            BYTES_FETCHED.inc(received, source="spec")
+
+    def _load_spec(self, text: str, spec_url: str) -> Optional[Dict[str, Any]]:
+        """Load and parse a JSON/YAML spec; CPU-bound on large specs, so run in a thread"""
+        document = self.spec_parser.load(text)
+        if document is None:
+            return None
+        return self._parse_spec(document, spec_url)
+
+    def _parse_spec(self, document: Dict[str, Any], spec_url: str) -> Dict[str, Any]:
+        spec = self.spec_parser.parse(document)
+        spec["source_url"] = spec_url
+        logger.info(f"Parsed {spec['format']} spec from {spec_url}: {len(spec['endpoints'])} endpoints")
+        return spec
@@ -1,84 +1,538 @@
 import os
-import google.generativeai as genai
+import asyncio
+import json
+import random
+import re
+import time
 import logging
-from typing import Dict, List, Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Any, Optional, Tuple
+from pydantic import ValidationError
+from app.models.schemas import AnalysisEndpoint, AnalysisResult, AuthMethod
+from app.services.cache import LayeredCache, make_key
+from app.services.metrics import GEMINI_CALL_SECONDS, GEMINI_CALLS, GEMINI_RESILIENCE, GEMINI_TOKENS
+from app.services.prompts import Prompt, PromptBuilder, auth_hints, compact_json, endpoint_hints, squash
+from app.services.ranking import select_relevant_text, estimate_tokens
+from app.services.rate_limit import RateLimiter
+from app.services.resilience import (
+    CircuitBreaker, CircuitOpen, LatencyTracker, RetryBudget, backoff_delay, hedged, is_retryable
+)
+from app.services.structured import IncrementalJsonParser, response_schema
 
 logger = logging.getLogger(__name__)
 
-class GeminiService:
-    def __init__(self):
-        api_key = os.getenv("GEMINI_API_KEY")
-        if not api_key:
-            raise ValueError("GEMINI_API_KEY environment variable not set")
+# Item models and event names for the arrays in the analysis response
+_ANALYSIS_ITEMS = {"endpoints": AnalysisEndpoint, "auth_methods": AuthMethod}
+_ITEM_EVENTS = {"endpoints": "endpoint", "auth_methods": "auth_method"}
 
-        # Configure the API
-        genai.configure(api_key=api_key)
 
-        # Choose a model
+def _validation_summary(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in detail['loc']) or 'item'}: {detail['msg']}"
+        for detail in error.errors()
+    )
+
+
+class GeminiService:
+    def __init__(self, cache: Optional[LayeredCache] = None, rate_limiter: Optional[RateLimiter] = None):
+        # Choose a model; it is created on first use, since importing the SDK pulls in
+        # gRPC and protobuf and a missing API key should only fail the calls that need it
         self.model_name = 'gemini-1.5-flash'
-        self.model = genai.GenerativeModel(self.model_name)
+        self._model = None
+        # Used when the primary model keeps failing or its circuit is open, e.g. gemini-1.5-flash-8b
+        self.fallback_model_name = os.getenv("GEMINI_FALLBACK_MODEL") or None
+        self._fallback_model = None
+        self._executor = None
         self.generation_config = {
             "temperature": 0.2,
             "top_p": 0.8,
             "top_k": 40,
             "max_output_tokens": 8192,
         }
+        # The analysis asks for JSON matching AnalysisResult instead of free text
+        self.structured_output = os.getenv("GEMINI_STRUCTURED_OUTPUT", "1") != "0"
+        self.analysis_config = self.generation_config
+        if self.structured_output:
+            self.analysis_config = {
+                **self.generation_config,
+                "response_mime_type": "application/json",
+                "response_schema": response_schema(AnalysisResult)
+            }
         self.safety_settings = []
+        self.cache = cache
+        # Shared by every model call so batch runs stay within the RPM/TPM quota
+        self.rate_limiter = rate_limiter or RateLimiter.from_env()
+        # Token budget for the documentation excerpt sent with the analysis prompt; the
+        # endpoint and auth hints get up to hint_tokens of the stage budget on top
+        self.analysis_doc_tokens = int(os.getenv("ANALYSIS_DOC_TOKEN_BUDGET", "3000"))
+        self.analysis_hint_tokens = int(os.getenv("ANALYSIS_HINT_TOKEN_BUDGET", "1200"))
+
+        # Each attempt gets timeout seconds (for a stream: until its first chunk, then
+        # stream_idle_timeout between chunks). Failed attempts are retried up to
+        # max_attempts per model with jittered backoff, while the retry budget allows
+        self.timeout = float(os.getenv("GEMINI_TIMEOUT_SECONDS", "60"))
+        self.stream_idle_timeout = float(os.getenv("GEMINI_STREAM_IDLE_SECONDS", "30"))
+        self.max_attempts = int(os.getenv("GEMINI_MAX_ATTEMPTS", "3"))
+        self.backoff_base = float(os.getenv("GEMINI_BACKOFF_BASE_SECONDS", "0.5"))
+        self.backoff_cap = float(os.getenv("GEMINI_BACKOFF_CAP_SECONDS", "8"))
+        self.retry_budget = RetryBudget(ratio=float(os.getenv("GEMINI_RETRY_BUDGET_RATIO", "0.2")))
+        # A duplicate request is sent when an attempt takes longer than the stage's recent
+        # hedge_percentile latency (and at least hedge_min_delay); hedges spend retry budget
+        self.hedge = os.getenv("GEMINI_HEDGE", "1") != "0"
+        self.hedge_percentile = float(os.getenv("GEMINI_HEDGE_PERCENTILE", "0.95"))
+        self.hedge_min_delay = float(os.getenv("GEMINI_HEDGE_MIN_SECONDS", "1"))
+        self.latency = LatencyTracker()
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._rng = random.Random()
+
+    @property
+    def model(self):
+        if self._model is None:
+            self.model = self._load_model()
+        return self._model
+
+    @model.setter
+    def model(self, model):
+        self._model = model
+        self._check_executor(model)
+
+    @property
+    def fallback_model(self):
+        if self._fallback_model is None and self.fallback_model_name:
+            self.fallback_model = self._load_model(self.fallback_model_name)
+        return self._fallback_model
+
+    @fallback_model.setter
+    def fallback_model(self, model):
+        self._fallback_model = model
+        self._check_executor(model)
+
+    def _check_executor(self, model):
+        # Older SDK releases have no async generation, so blocking calls are
+        # pushed onto a bounded thread pool instead of the event loop
+        if not hasattr(model, "generate_content_async") and self._executor is None:
+            max_workers = int(os.getenv("GEMINI_MAX_WORKERS", "8"))
+            self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="gemini")
+
+    def _load_model(self, model_name: Optional[str] = None):
+        api_key = os.getenv("GEMINI_API_KEY")
+        if not api_key:
+            raise ValueError("GEMINI_API_KEY environment variable not set")
+
+        import google.generativeai as genai
+
+        # Configure the API
+        genai.configure(api_key=api_key)
+        return genai.GenerativeModel(model_name or self.model_name)
 
-    async def analyze_api_documentation(self, extracted_data: Dict[str, Any], use_case: str) -> Dict[str, Any]:
+    def _breaker(self, model_name: str) -> CircuitBreaker:
+        if model_name not in self._breakers:
+            self._breakers[model_name] = CircuitBreaker(
+                model_name,
+                failure_threshold=int(os.getenv("GEMINI_BREAKER_FAILURES", "5")),
+                reset_seconds=float(os.getenv("GEMINI_BREAKER_RESET_SECONDS", "30"))
+            )
+        return self._breakers[model_name]
+
+    def circuit_states(self) -> Dict[str, str]:
+        """closed, open or half_open per model that has been called"""
+        return {name: breaker.state for name, breaker in self._breakers.items()}
+
+    async def _call(self,
+                    stage: str,
+                    prompt: str,
+                    send: Callable[[Any], Awaitable[Any]],
+                    discard: Optional[Callable[[Any], Awaitable[None]]] = None) -> Tuple[Any, str]:
         """
-        Use Gemini to analyze API documentation and extract endpoints and auth methods
+        Run send(model) against the primary model and then the fallback, with per-attempt
+        timeouts, budgeted retries, a hedged duplicate for slow attempts and a circuit
+        breaker per model. Returns (result, name of the model that produced it)
         """
+        self.retry_budget.deposit()
+        models = [self.model_name] + ([self.fallback_model_name] if self.fallback_model_name else [])
+        error: Exception = RuntimeError("No Gemini model configured")
+        for model_name in models:
+            if model_name != self.model_name:
+                GEMINI_RESILIENCE.inc(event="fallback")
+                logger.info(f"Falling back to {model_name} after: {str(error)}")
+            breaker = self._breaker(model_name)
+            model = self.model if model_name == self.model_name else self.fallback_model
+
+            for attempt in range(1, self.max_attempts + 1):
+                if attempt > 1:
+                    if not self.retry_budget.withdraw():
+                        break
+                    GEMINI_RESILIENCE.inc(event="retry")
+                    await asyncio.sleep(backoff_delay(attempt - 1, self.backoff_base, self.backoff_cap, self._rng))
+                if not breaker.allow():
+                    GEMINI_RESILIENCE.inc(event="circuit_open")
+                    error = CircuitOpen(model_name, breaker.retry_after())
+                    break
+                try:
+                    result, leg = await hedged(
+                        lambda: self._attempt(model, breaker, stage, prompt, send),
+                        self._hedge_delay(stage),
+                        self._may_hedge,
+                        discard
+                    )
+                except Exception as e:
+                    if not is_retryable(e):
+                        raise
+                    error = e
+                    logger.warning(f"Gemini call to {model_name} failed (attempt {attempt}): {str(e) or type(e).__name__}")
+                    continue
+                if leg:
+                    GEMINI_RESILIENCE.inc(event="hedge_won")
+                return result, model_name
+        raise error
+
+    async def _attempt(self,
+                       model,
+                       breaker: CircuitBreaker,
+                       stage: str,
+                       prompt: str,
+                       send: Callable[[Any], Awaitable[Any]]) -> Any:
+        """One call to the model, timed out after self.timeout and reported to its breaker"""
+        await self.rate_limiter.acquire(estimate_tokens(prompt))
+        start = time.perf_counter()
         try:
-            # Prepare the prompt for Gemini
-            prompt = f"""
-            I need you to analyze this API documentation and extract important information.
+            result = await asyncio.wait_for(send(model), self.timeout)
+        except asyncio.TimeoutError:
+            GEMINI_RESILIENCE.inc(event="timeout")
+            breaker.record_failure()
+            raise
+        except asyncio.CancelledError:
+            breaker.record_cancelled()
+            raise
+        except Exception as e:
+            # A rejected request still shows the upstream is answering
+            if is_retryable(e):
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+            raise
+        breaker.record_success()
+        self.latency.observe(stage, time.perf_counter() - start)
+        return result
+
+    def _hedge_delay(self, stage: str) -> Optional[float]:
+        if not self.hedge:
+            return None
+        threshold = self.latency.percentile(stage, self.hedge_percentile)
+        return None if threshold is None else max(self.hedge_min_delay, threshold)
 
-            USE CASE: {use_case}
+    def _may_hedge(self) -> bool:
+        if not self.retry_budget.withdraw():
+            return False
+        GEMINI_RESILIENCE.inc(event="hedge")
+        return True
 
-            Based on the following extracted text from the API documentation at {extracted_data['url']}, please:
-            1. Identify the key API endpoints that would be most relevant for the use case
-            2. Determine the authentication method(s) used by this API
-            3. Return your findings in a structured format
+    async def generate_text(self,
+                            prompt: str,
+                            use_cache: bool = True,
+                            generation_config: Optional[Dict[str, Any]] = None,
+                            stage: str = "default") -> str:
+        """
+        Send a prompt to Gemini without blocking the event loop and return the response text.
+
+        Responses are cached by a hash of the prompt, model name and generation config;
+        answers from the fallback model are not cached. stage keys the latency history
+        that decides when to hedge.
+        """
+        generation_config = generation_config or self.generation_config
+        cache_key = None
+        if self.cache is not None:
+            cache_key = make_key(prompt, self.model_name, generation_config)
+            if use_cache:
+                cached = await self.cache.get("gemini", cache_key)
+                if cached is not None:
+                    GEMINI_CALLS.inc(outcome="cached")
+                    return cached
 
-            Here's the extracted documentation:
-            {extracted_data['raw_text'][:10000]}  # Limit size to avoid token limits
+        async def send(model):
+            if hasattr(model, "generate_content_async"):
+                return await model.generate_content_async(
+                    prompt,
+                    generation_config=generation_config,
+                    safety_settings=self.safety_settings
+                )
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self._executor,
+                lambda: model.generate_content(
+                    prompt,
+                    generation_config=generation_config,
+                    safety_settings=self.safety_settings
+                )
+            )
+
+        start = time.perf_counter()
+        try:
+            response, model_name = await self._call(stage, prompt, send)
+            response_text = self._response_text(response)
+        except Exception:
+            GEMINI_CALLS.inc(outcome="error")
+            raise
+        GEMINI_CALL_SECONDS.observe(time.perf_counter() - start, mode="generate")
+        await self._record_usage(response, prompt, response_text)
+        if cache_key is not None and response_text and model_name == self.model_name:
+            await self.cache.set("gemini", cache_key, response_text)
+        return response_text
 
-            Potential endpoints found:
-            {extracted_data['potential_endpoints']}
+    async def stream_text(self,
+                          prompt: str,
+                          use_cache: bool = True,
+                          generation_config: Optional[Dict[str, Any]] = None,
+                          stage: str = "default") -> AsyncIterator[str]:
+        """
+        Yield response text chunks as Gemini generates them.
 
-            Potential authentication methods found:
-            {extracted_data['potential_auth']}
+        A cached response is yielded in one piece; the full streamed text is cached at the end.
+        Retries, hedging and fallback apply until the first chunk arrives; after that a
+        failure or a gap longer than stream_idle_timeout ends the stream with an error.
+        """
+        generation_config = generation_config or self.generation_config
+        cache_key = None
+        if self.cache is not None:
+            cache_key = make_key(prompt, self.model_name, generation_config)
+            if use_cache:
+                cached = await self.cache.get("gemini", cache_key)
+                if cached is not None:
+                    GEMINI_CALLS.inc(outcome="cached")
+                    yield cached
+                    return
 
-            Respond with a JSON structure that includes:
-            - endpoints: list of dictionaries with path, method, description, parameters
-            - auth_methods: list of dictionaries with type and description
-            """
+        if not hasattr(self.model, "generate_content_async"):
+            # No async streaming without generate_content_async, so yield the whole response
+            yield await self.generate_text(prompt, use_cache=use_cache, generation_config=generation_config,
+                                           stage=stage)
+            return
 
-            # Use the current API for generating content - removing await as generate_content is not a coroutine
-            response = self.model.generate_content(
+        async def open_stream(model):
+            # An attempt succeeds once the first chunk is in, so a stalled stream is retried or hedged
+            response = await model.generate_content_async(
                 prompt,
-                generation_config=self.generation_config,
-                safety_settings=self.safety_settings
+                generation_config=generation_config,
+                safety_settings=self.safety_settings,
+                stream=True
             )
+            stream = response.__aiter__()
+            try:
+                return stream, await stream.__anext__()
+            except StopAsyncIteration:
+                return stream, None
 
-            response_text = ""
-            if hasattr(response, 'text'):
-                response_text = response.text
-            else:
-                for candidate in response.candidates:
-                    for part in candidate.content.parts:
-                        if hasattr(part, "text"):
-                            response_text += part.text
-
-            # Parse out the structured information from Gemini's response
-            result = {
-                "analysis": response_text,
-                "parsed_endpoints": [],
-                "parsed_auth_methods": []
+        async def close_stream(opened):
+            if hasattr(opened[0], "aclose"):
+                await opened[0].aclose()
+
+        start = time.perf_counter()
+        chunks = []
+        stream = None
+        try:
+            (stream, chunk), model_name = await self._call(stage, prompt, open_stream, discard=close_stream)
+            while chunk is not None:
+                text = self._response_text(chunk)
+                if text:
+                    chunks.append(text)
+                    yield text
+                try:
+                    chunk = await asyncio.wait_for(stream.__anext__(), self.stream_idle_timeout)
+                except StopAsyncIteration:
+                    break
+        except Exception:
+            GEMINI_CALLS.inc(outcome="error")
+            raise
+        finally:
+            if stream is not None:
+                await close_stream((stream, None))
+        GEMINI_CALL_SECONDS.observe(time.perf_counter() - start, mode="stream")
+        # The last chunk of a stream carries the usage metadata for the whole response
+        await self._record_usage(chunk, prompt, "".join(chunks))
+
+        if cache_key is not None and chunks and model_name == self.model_name:
+            await self.cache.set("gemini", cache_key, "".join(chunks))
+
+    async def _record_usage(self, response, prompt: str, response_text: str):
+        """Count tokens from the response's usage metadata, estimating when it has none"""
+        usage = getattr(response, "usage_metadata", None)
+        prompt_tokens = getattr(usage, "prompt_token_count", 0) or estimate_tokens(prompt)
+        response_tokens = getattr(usage, "candidates_token_count", 0) or estimate_tokens(response_text)
+        GEMINI_CALLS.inc(outcome="ok")
+        GEMINI_TOKENS.inc(prompt_tokens, kind="prompt")
+        GEMINI_TOKENS.inc(response_tokens, kind="response")
+        await self.rate_limiter.record(response_tokens)
+
+    @staticmethod
+    def _response_text(response) -> str:
+        """Collect the text parts of a Gemini response"""
+        response_text = ""
+        if hasattr(response, 'text'):
+            response_text = response.text
+        else:
+            for candidate in response.candidates:
+                for part in candidate.content.parts:
+                    if hasattr(part, "text"):
+                        response_text += part.text
+        return response_text
+
+    async def aclose(self):
+        """Release the fallback executor, if one was created, and the rate limiter's database"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+        self.rate_limiter.close()
+
+    def _analysis_prompt(self, extracted_data: Dict[str, Any], use_case: str) -> Prompt:
+        """Build the documentation analysis prompt"""
+        builder = PromptBuilder("analysis")
+        builder.text(f"""
+        I need you to analyze this API documentation and extract important information.
+
+        USE CASE: {use_case}
+
+        Based on the following extracted text from the API documentation at {extracted_data['url']}, please:
+        1. Identify the key API endpoints that would be most relevant for the use case
+        2. Determine the authentication method(s) used by this API
+        3. Respond with JSON: endpoints (path, method, description, parameters) and
+           auth_methods (type, description)
+        """)
+
+        # Rank the documentation sections instead of truncating, so endpoint reference
+        # material deep in a long page still reaches the model
+        documentation = select_relevant_text(
+            extracted_data, use_case,
+            min(self.analysis_doc_tokens, builder.remaining(reserve=self.analysis_hint_tokens))
+        )
+        builder.block("Here are the most relevant sections of the documentation", documentation)
+
+        # Hints repeat little of the excerpt: contexts it already contains are dropped
+        potential_endpoints = extracted_data["potential_endpoints"]
+        potential_auth = extracted_data["potential_auth"]
+        builder.lines("Potential endpoints found", endpoint_hints(potential_endpoints, documentation),
+                      max_tokens=builder.remaining(reserve=self.analysis_hint_tokens // 4),
+                      baseline=f"Potential endpoints found:\n{potential_endpoints}")
+        builder.lines("Potential authentication methods found", auth_hints(potential_auth, documentation),
+                      baseline=f"Potential authentication methods found:\n{potential_auth}")
+        return builder.build()
+
+    async def stream_analysis(self,
+                              extracted_data: Dict[str, Any],
+                              use_case: str,
+                              use_cache: bool = True) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Analyze API documentation, yielding each endpoint and auth method as soon as the
+        model has finished writing it.
+
+        Events: "endpoint", "auth_method", and finally "analysis" with the full response
+        text and all valid items. Items that fail validation are sent back to the model on
+        their own for correction once the response is complete.
+        """
+        parser = IncrementalJsonParser()
+        parsed = {"endpoints": [], "auth_methods": []}
+        invalid = {"endpoints": [], "auth_methods": []}
+
+        def accept(key, item):
+            model = _ANALYSIS_ITEMS.get(key)
+            if model is None:
+                return None
+            try:
+                value = model.model_validate(item).model_dump()
+            except ValidationError as e:
+                invalid[key].append((item, _validation_summary(e)))
+                return None
+            parsed[key].append(value)
+            return {"event": _ITEM_EVENTS[key], _ITEM_EVENTS[key]: value}
+
+        prompt = self._analysis_prompt(extracted_data, use_case)
+        chunks = self.stream_text(
+            prompt.text,
+            use_cache=use_cache,
+            generation_config=prompt.generation_config(self.analysis_config),
+            stage=prompt.stage
+        )
+        try:
+            async for chunk in chunks:
+                for key, item in parser.feed(chunk):
+                    event = accept(key, item)
+                    if event:
+                        yield event
+        finally:
+            await chunks.aclose()
+
+        if parser.result() is None and (parsed["endpoints"] or parsed["auth_methods"]):
+            # Usually a response cut off at the output token limit; keep what was complete
+            logger.warning("Analysis response is not complete JSON, using the items parsed so far")
+
+        for key, items in invalid.items():
+            if not items:
+                continue
+            try:
+                repaired = await self._repair_items(key, items, use_cache=use_cache)
+            except Exception as e:
+                logger.error(f"Error repairing invalid {key}: {str(e)}")
+                continue
+            for item in repaired:
+                event = accept(key, item)
+                if event:
+                    yield event
+
+        yield {
+            "event": "analysis",
+            "analysis": parser.text,
+            "parsed_endpoints": parsed["endpoints"],
+            "parsed_auth_methods": parsed["auth_methods"]
+        }
+
+    async def _repair_items(self,
+                            key: str,
+                            items: List[Any],
+                            use_cache: bool = True) -> List[Dict[str, Any]]:
+        """
+        Ask the model to correct only the items that failed validation, without resending
+        the documentation
+        """
+        prompt = PromptBuilder("repair").text(f"""
+        These {key.replace('_', ' ')} objects, extracted from API documentation, failed validation.
+        Correct each one so that it has all required fields with allowed values, keeping the
+        information it contains. Return them in the same order under "items".
+        """).lines(
+            "Items", [f"{number}. {compact_json(item)} Errors: {errors}" for number, (item, errors) in enumerate(items, 1)],
+            baseline="\n".join(f"{number}. {json.dumps(item)}\n   Errors: {errors}"
+                               for number, (item, errors) in enumerate(items, 1))
+        ).build()
+        config = {
+            **prompt.generation_config(self.generation_config),
+            "response_mime_type": "application/json",
+            "response_schema": {
+                "type": "object",
+                "properties": {"items": {"type": "array", "items": response_schema(_ANALYSIS_ITEMS[key])}},
+                "required": ["items"]
             }
+        }
+        response_text = await self.generate_text(prompt.text, use_cache=use_cache, generation_config=config,
+                                                 stage=prompt.stage)
+        parser = IncrementalJsonParser()
+        parser.feed(response_text)
+        result = parser.result() or {}
+        logger.info(f"Repaired {len(result.get('items', []))} of {len(items)} invalid {key}")
+        return [item for item in result.get("items", []) if isinstance(item, dict)]
 
-            return result
+    async def analyze_api_documentation(self,
+                                        extracted_data: Dict[str, Any],
+                                        use_case: str,
+                                        use_cache: bool = True) -> Dict[str, Any]:
+        """
+        Use Gemini to analyze API documentation and extract endpoints and auth methods
+        """
+        try:
+            async for event in self.stream_analysis(extracted_data, use_case, use_cache=use_cache):
+                if event["event"] == "analysis":
+                    return {
+                        "analysis": event["analysis"],
+                        "parsed_endpoints": event["parsed_endpoints"],
+                        "parsed_auth_methods": event["parsed_auth_methods"]
+                    }
+            raise RuntimeError("Analysis ended without a result")
 
         except Exception as e:
             logger.error(f"Error using Gemini API: {str(e)}")
@@ -88,51 +542,100 @@ class GeminiService:
                                     endpoints: List[Dict[str, Any]],
                                     auth_methods: List[Dict[str, Any]],
                                     language: str,
-                                    use_case: str) -> str:
+                                    use_case: str,
+                                    use_cache: bool = True) -> str:
         """
         Generate a wrapper class in the specified programming language
         """
         try:
-            # Prepare the prompt for Gemini
-            prompt = f"""
-            Generate a complete, production-ready API wrapper class in {language} based on the following API details:
+            prompt = self._wrapper_prompt(endpoints, auth_methods, language, use_case)
+            response_text = await self.generate_text(
+                prompt.text, use_cache=use_cache, generation_config=prompt.generation_config(self.generation_config),
+                stage=prompt.stage
+            )
 
-            USE CASE: {use_case}
+            return response_text
 
-            ENDPOINTS:
-            {endpoints}
+        except Exception as e:
+            logger.error(f"Error generating wrapper code: {str(e)}")
+            raise
 
-            AUTHENTICATION METHODS:
-            {auth_methods}
+    async def generate_docstrings(self,
+                                  methods: List[Dict[str, Any]],
+                                  language: str,
+                                  use_case: str,
+                                  use_cache: bool = True) -> Dict[str, str]:
+        """
+        Write docstrings for template-generated client methods, keyed by method name
+        """
+        prompt = PromptBuilder("docstrings").text(f"""
+        Write a concise docstring (one to three sentences) for each method of a {language} API client.
+        The client is used for: {use_case}
 
-            Requirements for the wrapper:
-            1. Should handle authentication automatically
-            2. Should have proper error handling
-            3. Should be well-documented with comments
-            4. Should follow best practices for {language}
-            5. Should be designed for the specific use case provided
+        Respond with only a JSON object mapping each method name to its docstring text,
+        without quotes or comment markers around the text.
+        """).lines("METHODS", [
+            f"- {m['name']}: {m['http_method']} {m['path']} ({squash(m['description'], 200)}); "
+            f"parameters: {', '.join(p['name'] for p in m['params']) or 'none'}"
+            for m in methods
+        ]).build()
+        response_text = await self.generate_text(
+            prompt.text, use_cache=use_cache, generation_config=prompt.generation_config(self.generation_config),
+            stage=prompt.stage
+        )
+        match = re.search(r'\{.*\}', response_text, re.DOTALL)
+        if not match:
+            raise ValueError("No JSON object in docstring response")
+        docstrings = json.loads(match.group(0))
+        return {name: str(text) for name, text in docstrings.items() if isinstance(text, str)}
 
-            Please generate only the code, no explanations needed.
-            """
+    async def stream_wrapper_code(self,
+                                  endpoints: List[Dict[str, Any]],
+                                  auth_methods: List[Dict[str, Any]],
+                                  language: str,
+                                  use_case: str,
+                                  use_cache: bool = True) -> AsyncIterator[str]:
+        """
+        Stream the wrapper class in the specified programming language as it is generated
+        """
+        prompt = self._wrapper_prompt(endpoints, auth_methods, language, use_case)
+        try:
+            async for chunk in self.stream_text(prompt.text, use_cache=use_cache,
+                                                generation_config=prompt.generation_config(self.generation_config),
+                                                stage=prompt.stage):
+                yield chunk
+        except Exception as e:
+            logger.error(f"Error streaming wrapper code: {str(e)}")
+            raise
 
-            # Use the current API for generating content - removing await as generate_content is not a coroutine
-            response = self.model.generate_content(
-                prompt,
-                generation_config=self.generation_config,
-                safety_settings=self.safety_settings
-            )
+    def _wrapper_prompt(self,
+                        endpoints: List[Dict[str, Any]],
+                        auth_methods: List[Dict[str, Any]],
+                        language: str,
+                        use_case: str) -> Prompt:
+        """Build the wrapper code generation prompt"""
+        builder = PromptBuilder("wrapper").text(f"""
+        Generate a complete, production-ready API wrapper class in {language} based on the following API details:
 
-            response_text = ""
-            if hasattr(response, 'text'):
-                response_text = response.text
-            else:
-                for candidate in response.candidates:
-                    for part in candidate.content.parts:
-                        if hasattr(part, "text"):
-                            response_text += part.text
+        USE CASE: {use_case}
 
-            return response_text
+        Requirements for the wrapper:
+        1. Should handle authentication automatically
+        2. Should have proper error handling
+        3. Should be well-documented with comments
+        4. Should follow best practices for {language}
+        5. Should be designed for the specific use case provided
 
-        except Exception as e:
-            logger.error(f"Error generating wrapper code: {str(e)}")
-            raise
\ No newline at end of file
+        Please generate only the code, no explanations needed.
+        """)
+        auth_lines = [f"- {a['type']}: {squash(a['description'], 300)}" for a in auth_methods]
+        # Endpoints as compact JSON with long descriptions and examples shortened; the
+        # auth methods are small and always fit
+        builder.lines(
+            "ENDPOINTS (one JSON object per line)",
+            [compact_json(e) for e in endpoints],
+            max_tokens=builder.remaining(reserve=sum(estimate_tokens(line) for line in auth_lines) + 10),
+            baseline=f"ENDPOINTS:\n{endpoints}"
+        )
+        builder.lines("AUTHENTICATION METHODS", auth_lines, baseline=f"AUTHENTICATION METHODS:\n{auth_methods}")
+        return builder.build()
@@ -1,14 +1,43 @@
+import asyncio
 import json
+import os
 import re
-from typing import Dict, Any, List, Tuple
+import time
+from typing import AsyncIterator, Dict, Any, List, Optional, Tuple
 import logging
-import google.generativeai as genai
+from app.services.codegen import client_methods, render_wrapper, template_language
+from app.services.incremental import (
+    diff_endpoints, document_sections, merge_analysis, mentioned, narrow_extraction, section_text
+)
+from app.services.metrics import observe_stage
+from app.services.prompts import PromptBuilder, PromptReport, collect_prompt_stats, squash
+from app.services.scheduler import Stage, StageScheduler
+from app.services.spec_parser import select_relevant_endpoints
 
 logger = logging.getLogger(__name__)
 
+# Suggestions used when the model call fails; they are never kept in a snapshot
+FALLBACK_SUGGESTION = "For this API, a direct REST client approach using standard libraries would be most appropriate."
+SUGGESTION_ERROR = "Unable to generate integration suggestion due to an error."
+
+
+def failed_wrapper(language: str) -> str:
+    """Placeholder code for an optional wrapper whose generation failed"""
+    return f"# Failed to generate {language} wrapper code"
+
 class WrapperGenerator:
-    def __init__(self, gemini_service):
+    def __init__(self, gemini_service, store=None):
         self.gemini_service = gemini_service
+        # Optional AnalysisStore; without one analyses are not kept for reuse
+        self.store = store
+        self.scheduler = StageScheduler()
+        self.stage_timeout = float(os.getenv("GEMINI_STAGE_TIMEOUT", "120"))
+        # Endpoints taken from a parsed spec are narrowed to the most relevant ones for codegen
+        self.spec_endpoint_limit = int(os.getenv("SPEC_MAX_ENDPOINTS", "50"))
+        # llm, template or hybrid; languages without a template always use the LLM
+        self.codegen_mode = os.getenv("WRAPPER_CODEGEN_MODE", "llm")
+        # A re-analysis with more than this share of sections changed analyses everything again
+        self.reanalysis_max_changed = float(os.getenv("REANALYSIS_MAX_CHANGED_RATIO", "0.5"))
 
     async def parse_gemini_analysis(self, analysis: str) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
         """
@@ -63,109 +92,573 @@ class WrapperGenerator:
                                              endpoints: List[Dict[str, Any]],
                                              auth_methods: List[Dict[str, Any]],
                                              use_case: str,
-                                             language: str) -> str:
+                                             language: str,
+                                             use_cache: bool = True) -> str:
         """
         Generate suggestions for integration approaches
         """
         try:
-            # Build prompt for Gemini
-            endpoints_str = "\n".join([f"- {e['method']} {e['path']}: {e['description']}" for e in endpoints[:5]])  # Limit to first 5 endpoints
-            auth_methods_str = "\n".join([f"- {a['type']}: {a['description']}" for a in auth_methods])
-
-            prompt = f"""
+            # Build prompt for Gemini; a handful of endpoints is enough context for a short recommendation
+            prompt = PromptBuilder("suggestion").text(f"""
             Based on the following API details and use case, suggest the best integration approach
             (REST client, SDK, etc.) for a {language} application:
 
             USE CASE: {use_case}
 
-            ENDPOINTS:
-            {endpoints_str}
-
-            AUTHENTICATION:
-            {auth_methods_str}
-
             Provide a brief, practical recommendation that considers:
             1. Ease of implementation
             2. Maintainability
             3. Performance
             4. Error handling
             5. Any existing libraries that might help
-            """
+            """).lines(
+                "ENDPOINTS", [f"- {e['method']} {e['path']}: {squash(e['description'], 120)}" for e in endpoints[:5]],
+                max_tokens=250
+            ).lines(
+                "AUTHENTICATION", [f"- {a['type']}: {squash(a['description'], 150)}" for a in auth_methods]
+            ).build()
 
-            # Generate content without using await
-            response = self.gemini_service.model.generate_content(
-                prompt,
-                generation_config=self.gemini_service.generation_config,
-                safety_settings=self.gemini_service.safety_settings
+            return await self.gemini_service.generate_text(
+                prompt.text,
+                use_cache=use_cache,
+                generation_config=prompt.generation_config(self.gemini_service.generation_config),
+                stage=prompt.stage
             )
 
-            # Extract text from response
-            response_text = ""
-            if hasattr(response, 'text'):
-                response_text = response.text
-            else:
-                for candidate in response.candidates:
-                    for part in candidate.content.parts:
-                        if hasattr(part, "text"):
-                            response_text += part.text
-
-            return response_text
-
         except Exception as e:
             logger.error(f"Error generating integration suggestion: {str(e)}")
-            return "Unable to generate integration suggestion due to an error."
+            return SUGGESTION_ERROR
 
-    async def process_api_documentation(self,
-                                        extracted_data: Dict[str, Any],
-                                        use_case: str,
-                                        language: str) -> Dict[str, Any]:
+    async def analyze_documentation(self,
+                                    extracted_data: Dict[str, Any],
+                                    use_case: str,
+                                    use_cache: bool = True) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
         """
-        Process API documentation and generate wrapper code
+        Run the Gemini analysis and return normalized endpoints and auth methods.
+
+        When the extractor found an OpenAPI/Swagger/Postman spec, its endpoints are used
+        directly and Gemini is skipped.
         """
+        async for event in self.stream_analysis(extracted_data, use_case, use_cache=use_cache):
+            if event["event"] == "analysis":
+                return event["endpoints"], event["auth_methods"]
+        raise RuntimeError("Analysis ended without a result")
+
+    async def stream_analysis(self,
+                              extracted_data: Dict[str, Any],
+                              use_case: str,
+                              use_cache: bool = True) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Yield "endpoint" events as the model reports them, then an "analysis" event with
+        all normalized endpoints and auth methods
+        """
+        spec = extracted_data.get("spec")
+        if spec and spec.get("endpoints"):
+            endpoints = select_relevant_endpoints(spec["endpoints"], use_case, self.spec_endpoint_limit)
+            yield {"event": "analysis", "endpoints": endpoints, "auth_methods": spec.get("auth_methods", [])}
+            return
+
         # Analyze documentation with Gemini
-        analysis_result = await self.gemini_service.analyze_api_documentation(extracted_data, use_case)
+        analysis_result = None
+        events = self.gemini_service.stream_analysis(extracted_data, use_case, use_cache=use_cache)
+        try:
+            async for event in events:
+                if event["event"] == "endpoint":
+                    yield {"event": "endpoint", "endpoint": self.normalize_endpoint(event["endpoint"])}
+                elif event["event"] == "analysis":
+                    analysis_result = event
+        finally:
+            await events.aclose()
+        if analysis_result is None:
+            raise RuntimeError("Analysis ended without a result")
+
+        endpoints = analysis_result["parsed_endpoints"]
+        auth_methods = analysis_result["parsed_auth_methods"]
+        if not endpoints and not auth_methods:
+            # Structured output disabled or unusable: fall back to parsing the text
+            endpoints, auth_methods = await self.parse_gemini_analysis(analysis_result["analysis"])
 
-        # Parse the analysis to get structured endpoints and auth methods
-        endpoints, auth_methods = await self.parse_gemini_analysis(analysis_result['analysis'])
+        endpoints = [self.normalize_endpoint(endpoint) for endpoint in endpoints]
+        yield {"event": "analysis", "endpoints": endpoints, "auth_methods": auth_methods}
 
+    @staticmethod
+    def normalize_endpoint(endpoint: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Bring an endpoint reported by the model into the Endpoint shape
+        """
+        endpoint = dict(endpoint)
         # Ensure parameters are in dictionary format
-        for endpoint in endpoints:
-            # Check if parameters is a list and convert to dictionary
-            if isinstance(endpoint.get('parameters'), list):
-                param_dict = {}
-                for param in endpoint['parameters']:
-                    if 'name' in param and isinstance(param, dict):
-                        param_name = param['name']
-                        param_info = {k: v for k, v in param.items() if k != 'name'}
-                        param_dict[param_name] = param_info
-                endpoint['parameters'] = param_dict
-
-        # Generate integration suggestion - removed await
-        integration_suggestion = "For this API, a direct REST client approach using standard libraries would be most appropriate."
+        if isinstance(endpoint.get('parameters'), list):
+            param_dict = {}
+            for param in endpoint['parameters']:
+                if isinstance(param, dict) and 'name' in param:
+                    param_name = param['name']
+                    param_info = {k: v for k, v in param.items() if k != 'name' and v is not None}
+                    if 'location' in param_info:
+                        param_info['in'] = param_info.pop('location')
+                    param_dict[param_name] = param_info
+            endpoint['parameters'] = param_dict
+
+        # Structured output carries the response example as a JSON string
+        example = endpoint.get('response_example')
+        if isinstance(example, str):
+            try:
+                example = json.loads(example)
+            except ValueError:
+                example = None
+            endpoint['response_example'] = example if isinstance(example, dict) else None
+        return endpoint
+
+    async def save_analysis(self,
+                            extracted_data: Dict[str, Any],
+                            use_case: str,
+                            endpoints: List[Dict[str, Any]],
+                            auth_methods: List[Dict[str, Any]]) -> Optional[str]:
+        """
+        Store the analysis as a language-independent record and return its ID
+        """
+        if self.store is None:
+            return None
+        spec = extracted_data.get("spec")
+        source = f"spec:{spec['format']}" if spec and spec.get("endpoints") else "gemini"
         try:
-            integration_suggestion = await self.generate_integration_suggestion(
-                endpoints, auth_methods, use_case, language
+            ir = await self.store.save(
+                extracted_data.get("url", ""), use_case, endpoints, auth_methods, source,
+                base_url=(spec or {}).get("base_url")
             )
         except Exception as e:
-            logger.error(f"Error in integration suggestion: {e}")
-            # Continue with default suggestion
+            # An analysis the schema rejects can still be used for this request
+            logger.error(f"Error saving analysis: {str(e)}")
+            return None
+        return ir.analysis_id
+
+    def _codegen_mode(self, language: str, mode: Optional[str]) -> str:
+        mode = mode or self.codegen_mode
+        if mode != "llm" and template_language(language) is None:
+            logger.info(f"No wrapper template for {language}, generating it with the LLM")
+            return "llm"
+        return mode
 
-        # Generate wrapper code
-        wrapper_code = await self.gemini_service.generate_wrapper_code(
-            endpoints, auth_methods, language, use_case
+    async def generate_wrapper_code(self,
+                                    endpoints: List[Dict[str, Any]],
+                                    auth_methods: List[Dict[str, Any]],
+                                    language: str,
+                                    use_case: str,
+                                    use_cache: bool = True,
+                                    mode: Optional[str] = None,
+                                    base_url: Optional[str] = None) -> str:
+        """
+        Generate wrapper code with the LLM, the local templates, or the templates with
+        docstrings written by the LLM (hybrid)
+        """
+        mode = self._codegen_mode(language, mode)
+        if mode == "llm":
+            return await self.gemini_service.generate_wrapper_code(
+                endpoints, auth_methods, language, use_case, use_cache=use_cache
+            )
+
+        docstrings = None
+        if mode == "hybrid":
+            try:
+                docstrings = await self.gemini_service.generate_docstrings(
+                    client_methods(endpoints), language, use_case, use_cache=use_cache
+                )
+            except Exception as e:
+                # The template docstrings are still usable
+                logger.error(f"Error generating docstrings: {str(e)}")
+        return render_wrapper(language, endpoints, auth_methods, use_case, base_url, docstrings)
+
+    async def stream_wrapper_code(self,
+                                  endpoints: List[Dict[str, Any]],
+                                  auth_methods: List[Dict[str, Any]],
+                                  language: str,
+                                  use_case: str,
+                                  use_cache: bool = True,
+                                  mode: Optional[str] = None,
+                                  base_url: Optional[str] = None) -> AsyncIterator[str]:
+        """
+        Stream LLM wrapper code as it is generated; template code arrives in one piece
+        """
+        if self._codegen_mode(language, mode) == "llm":
+            chunks = self.gemini_service.stream_wrapper_code(
+                endpoints, auth_methods, language, use_case, use_cache=use_cache
+            )
+            try:
+                async for chunk in chunks:
+                    yield chunk
+            finally:
+                await chunks.aclose()
+            return
+        yield await self.generate_wrapper_code(
+            endpoints, auth_methods, language, use_case, use_cache=use_cache, mode=mode, base_url=base_url
         )
 
-        # Generate .env template
-        env_template = await self.generate_env_template(auth_methods)
+    def _wrapper_stages(self,
+                        languages: List[str],
+                        use_case: str,
+                        use_cache: bool,
+                        mode: Optional[str] = None,
+                        base_url: Optional[str] = None,
+                        required: bool = True) -> List[Stage]:
+        """One wrapper_code:<language> stage per language, all depending only on the analysis"""
+        def make(language):
+            async def wrapper_code(inputs):
+                endpoints, auth_methods = inputs["analysis"]
+                return await self.generate_wrapper_code(
+                    endpoints, auth_methods, language, use_case,
+                    use_cache=use_cache, mode=mode, base_url=base_url
+                )
+            return wrapper_code
+
+        stages = []
+        for language in languages:
+            kwargs = {} if required else {"fallback": failed_wrapper(language)}
+            stages.append(Stage(f"wrapper_code:{language}", make(language), depends_on=["analysis"],
+                                timeout=self.stage_timeout, **kwargs))
+        return stages
+
+    async def process_api_documentation(self,
+                                        extracted_data: Dict[str, Any],
+                                        use_case: str,
+                                        language: str,
+                                        use_cache: bool = True,
+                                        additional_languages: Optional[List[str]] = None,
+                                        codegen_mode: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Process API documentation and generate wrapper code.
+
+        The suggestion, wrapper code and .env template only depend on the analysis,
+        so they run concurrently once it is done. Wrappers for additional languages are
+        generated concurrently from the same analysis.
+        """
+        additional_languages = [l for l in dict.fromkeys(additional_languages or []) if l != language]
+        base_url = (extracted_data.get("spec") or {}).get("base_url")
+
+        async def analysis(_):
+            return await self.analyze_documentation(extracted_data, use_case, use_cache=use_cache)
+
+        async def analysis_ir(inputs):
+            endpoints, auth_methods = inputs["analysis"]
+            return await self.save_analysis(extracted_data, use_case, endpoints, auth_methods)
+
+        async def suggestion(inputs):
+            endpoints, auth_methods = inputs["analysis"]
+            return await self.generate_integration_suggestion(
+                endpoints, auth_methods, use_case, language, use_cache=use_cache
+            )
+
+        async def wrapper_code(inputs):
+            endpoints, auth_methods = inputs["analysis"]
+            return await self.generate_wrapper_code(
+                endpoints, auth_methods, language, use_case,
+                use_cache=use_cache, mode=codegen_mode, base_url=base_url
+            )
+
+        async def env_template(inputs):
+            _, auth_methods = inputs["analysis"]
+            return await self.generate_env_template(auth_methods)
+
+        with collect_prompt_stats() as prompt_stats:
+            results, timings = await self.scheduler.run([
+                Stage("analysis", analysis, timeout=self.stage_timeout),
+                Stage("suggestion", suggestion, depends_on=["analysis"], timeout=self.stage_timeout,
+                      fallback=FALLBACK_SUGGESTION),
+                Stage("wrapper_code", wrapper_code, depends_on=["analysis"], timeout=self.stage_timeout),
+                Stage("env_template", env_template, depends_on=["analysis"],
+                      fallback="# Failed to generate .env template"),
+                Stage("analysis_ir", analysis_ir, depends_on=["analysis"], fallback=None),
+            ] + self._wrapper_stages(additional_languages, use_case, use_cache, codegen_mode, base_url, required=False))
+        logger.info(f"Prompts: {prompt_stats.summary()}")
 
+        endpoints, auth_methods = results["analysis"]
         return {
             "endpoints": endpoints,
             "auth_methods": auth_methods,
-            "suggested_integration": integration_suggestion,
-            "wrapper_code": wrapper_code,
-            "env_template": env_template
+            "suggested_integration": results["suggestion"],
+            "wrapper_code": results["wrapper_code"],
+            "env_template": results["env_template"],
+            "stage_timings": timings,
+            "prompt_tokens": prompt_stats.to_dict() or None,
+            "analysis_id": results["analysis_ir"],
+            "additional_wrappers": {
+                l: results[f"wrapper_code:{l}"] for l in additional_languages
+            } or None
         }
 
+    async def generate_wrappers(self,
+                                ir,
+                                languages: List[str],
+                                use_cache: bool = True,
+                                codegen_mode: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Generate wrapper code for several languages from a stored AnalysisIR, concurrently
+        and without extracting or analysing again
+        """
+        languages = list(dict.fromkeys(languages))
+        endpoints = [e.model_dump() for e in ir.endpoints]
+        auth_methods = [a.model_dump() for a in ir.auth_methods]
+
+        async def analysis(_):
+            return endpoints, auth_methods
+
+        async def env_template(inputs):
+            return await self.generate_env_template(auth_methods)
+
+        with collect_prompt_stats() as prompt_stats:
+            results, timings = await self.scheduler.run([
+                Stage("analysis", analysis),
+                Stage("env_template", env_template, depends_on=["analysis"],
+                      fallback="# Failed to generate .env template"),
+            ] + self._wrapper_stages(languages, ir.use_case, use_cache, codegen_mode, ir.base_url))
+        timings.pop("analysis", None)
+
+        return {
+            "analysis_id": ir.analysis_id,
+            "wrappers": {l: results[f"wrapper_code:{l}"] for l in languages},
+            "env_template": results["env_template"],
+            "stage_timings": timings,
+            "prompt_tokens": prompt_stats.to_dict() or None
+        }
+
+    async def reanalyze_documentation(self,
+                                      extracted_data: Dict[str, Any],
+                                      use_case: str,
+                                      language: str,
+                                      use_cache: bool = True,
+                                      additional_languages: Optional[List[str]] = None,
+                                      codegen_mode: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Analyse documentation again against the stored snapshot of its last analysis.
+
+        Only sections whose hash is not in the snapshot are sent to the model and what it
+        finds is merged into the previous endpoints. With no snapshot (or one for another
+        use case), or when more than REANALYSIS_MAX_CHANGED_RATIO of the sections changed,
+        everything is analysed again. Wrapper code and the suggestion are regenerated
+        only when the endpoints, auth methods or base URL changed; otherwise the
+        snapshot's are reused. Returns the process_api_documentation result plus the mode,
+        the endpoint diff, section counts and whether any wrapper was regenerated.
+        """
+        additional_languages = [l for l in dict.fromkeys(additional_languages or []) if l != language]
+        spec = extracted_data.get("spec")
+        base_url = (spec or {}).get("base_url")
+        url = extracted_data.get("url", "")
+        crawled = "pages" in extracted_data
+        # Wrappers are stored under the mode actually used: languages without a template use llm
+        wrapper_keys = {
+            l: f"{l}:{self._codegen_mode(l, codegen_mode)}" for l in [language] + additional_languages
+        }
+
+        snapshot = await self.store.get_snapshot(url) if self.store is not None else None
+        if snapshot is not None and (snapshot["use_case"] != use_case or snapshot["crawled"] != crawled):
+            logger.info(f"Snapshot of {url} is for another use case or crawl setting; analysing in full")
+            snapshot = None
+
+        sections = document_sections(extracted_data)
+        known = set(snapshot["section_hashes"]) if snapshot else set()
+        current = {section["hash"] for section in sections}
+        changed = [section for section in sections if section["hash"] not in known]
+        removed = len(known - current)
+        text = section_text(sections)
+
+        async def analysis(_):
+            if spec and spec.get("endpoints"):
+                return "spec", await self.analyze_documentation(extracted_data, use_case, use_cache=use_cache)
+            if snapshot is None or len(changed) > self.reanalysis_max_changed * len(sections):
+                return "full", await self.analyze_documentation(extracted_data, use_case, use_cache=use_cache)
+            previous = snapshot["endpoints"], snapshot["auth_methods"]
+            if not changed and not removed:
+                return "unchanged", previous
+            found = [], []
+            if changed:
+                found = await self.analyze_documentation(
+                    narrow_extraction(extracted_data, changed), use_case, use_cache=use_cache
+                )
+            unchanged_text = section_text(section for section in sections if section["hash"] in known)
+            return "incremental", merge_analysis(previous, found, snapshot["matched"], text, unchanged_text)
+
+        with collect_prompt_stats() as prompt_stats:
+            results, timings = await self.scheduler.run([Stage("analysis", analysis, timeout=self.stage_timeout)])
+            mode, (endpoints, auth_methods) = results["analysis"]
+
+            diff = diff_endpoints(snapshot["endpoints"] if snapshot else [], endpoints)
+            regenerate = (
+                snapshot is None or any(diff.values()) or snapshot["base_url"] != base_url
+                # Any change to an auth method (scheme, header name, description) reaches the wrappers
+                or sorted(json.dumps(a, sort_keys=True) for a in snapshot["auth_methods"])
+                != sorted(json.dumps(a, sort_keys=True) for a in auth_methods)
+            )
+            stored_wrappers = {} if regenerate else snapshot["wrappers"]
+            stored_suggestions = {} if regenerate else snapshot["suggestions"]
+            wrappers = {l: stored_wrappers[key] for l, key in wrapper_keys.items() if key in stored_wrappers}
+            missing = [l for l in additional_languages if l not in wrappers]
+
+            async def analysis_result(_):
+                return endpoints, auth_methods
+
+            async def analysis_ir(inputs):
+                return await self.save_analysis(extracted_data, use_case, endpoints, auth_methods)
+
+            async def suggestion(inputs):
+                return await self.generate_integration_suggestion(
+                    endpoints, auth_methods, use_case, language, use_cache=use_cache
+                )
+
+            async def env_template(inputs):
+                return await self.generate_env_template(auth_methods)
+
+            stages = [
+                Stage("analysis", analysis_result),
+                Stage("env_template", env_template, depends_on=["analysis"],
+                      fallback="# Failed to generate .env template"),
+                Stage("analysis_ir", analysis_ir, depends_on=["analysis"], fallback=None),
+            ]
+            if language not in stored_suggestions:
+                stages.append(Stage("suggestion", suggestion, depends_on=["analysis"], timeout=self.stage_timeout,
+                                    fallback=FALLBACK_SUGGESTION))
+            if language not in wrappers:
+                stages += self._wrapper_stages([language], use_case, use_cache, codegen_mode, base_url)
+            stages += self._wrapper_stages(missing, use_case, use_cache, codegen_mode, base_url, required=False)
+            generated, generation_timings = await self.scheduler.run(stages)
+        generation_timings.pop("analysis", None)
+        timings.update(generation_timings)
+        logger.info(f"Re-analysis of {url} ({mode}): {len(changed)} of {len(sections)} sections changed, "
+                    f"{removed} removed; prompts: {prompt_stats.summary()}")
+
+        new_wrappers = {
+            l: generated[f"wrapper_code:{l}"] for l in [language] + missing if f"wrapper_code:{l}" in generated
+        }
+        wrappers.update(new_wrappers)
+        suggested_integration = (
+            stored_suggestions[language] if language in stored_suggestions else generated["suggestion"]
+        )
+
+        if self.store is not None:
+            await self.store.save_snapshot({
+                "documentation_url": url,
+                "use_case": use_case,
+                "crawled": crawled,
+                "base_url": base_url,
+                "section_hashes": sorted(current),
+                "endpoints": endpoints,
+                "auth_methods": auth_methods,
+                "matched": [list(key) for key in mentioned(endpoints, text)],
+                # Placeholders for failed generations are not kept, so the next run retries them
+                "wrappers": {
+                    **stored_wrappers,
+                    **{wrapper_keys[l]: code for l, code in new_wrappers.items() if code != failed_wrapper(l)}
+                },
+                "suggestions": {
+                    **stored_suggestions,
+                    **({language: suggested_integration}
+                       if suggested_integration not in (FALLBACK_SUGGESTION, SUGGESTION_ERROR) else {})
+                },
+                "analysis_id": generated["analysis_ir"],
+                "created_at": time.time()
+            })
+
+        return {
+            "endpoints": endpoints,
+            "auth_methods": auth_methods,
+            "suggested_integration": suggested_integration,
+            "wrapper_code": wrappers[language],
+            "env_template": generated["env_template"],
+            "stage_timings": timings,
+            "prompt_tokens": prompt_stats.to_dict() or None,
+            "analysis_id": generated["analysis_ir"],
+            "additional_wrappers": {l: wrappers[l] for l in additional_languages} or None,
+            "mode": mode,
+            "diff": diff,
+            "sections": {"total": len(sections), "changed": len(changed), "removed": removed},
+            "wrappers_regenerated": bool(new_wrappers)
+        }
+
+    async def stream_api_documentation(self,
+                                       extracted_data: Dict[str, Any],
+                                       use_case: str,
+                                       language: str,
+                                       use_cache: bool = True,
+                                       codegen_mode: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Process API documentation, yielding each result as soon as it is ready.
+
+        Events, in order: "endpoint" for each endpoint as the model reports it, "analysis"
+        (all endpoints and auth methods), "wrapper_code" deltas, "suggestion", "env_template"
+        and finally "done" with the stage timings and prompt token counts.
+        """
+        # The report is collected step by step: a context variable set across a yield
+        # would leak into the consumer's context
+        prompt_stats = PromptReport()
+        timings = {}
+
+        start = time.perf_counter()
+        deadline = start + self.stage_timeout
+        analysis = self.stream_analysis(extracted_data, use_case, use_cache=use_cache)
+        try:
+            while True:
+                with collect_prompt_stats(prompt_stats):
+                    event = await asyncio.wait_for(analysis.__anext__(), timeout=deadline - time.perf_counter())
+                if event["event"] == "analysis":
+                    break
+                yield event
+        finally:
+            await analysis.aclose()
+        endpoints, auth_methods = event["endpoints"], event["auth_methods"]
+        timings["analysis"] = round((time.perf_counter() - start) * 1000, 1)
+        analysis_id = await self.save_analysis(extracted_data, use_case, endpoints, auth_methods)
+        yield {"event": "analysis", "endpoints": endpoints, "auth_methods": auth_methods,
+               "analysis_id": analysis_id}
+
+        # The suggestion runs in the background while the wrapper code streams
+        async def suggestion():
+            suggestion_start = time.perf_counter()
+            try:
+                return await asyncio.wait_for(
+                    self.generate_integration_suggestion(
+                        endpoints, auth_methods, use_case, language, use_cache=use_cache
+                    ),
+                    timeout=self.stage_timeout
+                )
+            except Exception as e:
+                logger.error(f"Error in integration suggestion: {str(e)}")
+                return FALLBACK_SUGGESTION
+            finally:
+                timings["suggestion"] = round((time.perf_counter() - suggestion_start) * 1000, 1)
+
+        # The task copies the context, report included, when it is created
+        with collect_prompt_stats(prompt_stats):
+            suggestion_task = asyncio.ensure_future(suggestion())
+        chunks = self.stream_wrapper_code(
+            endpoints, auth_methods, language, use_case, use_cache=use_cache, mode=codegen_mode,
+            base_url=(extracted_data.get("spec") or {}).get("base_url")
+        )
+        try:
+            start = time.perf_counter()
+            deadline = start + self.stage_timeout
+            while True:
+                try:
+                    with collect_prompt_stats(prompt_stats):
+                        delta = await asyncio.wait_for(chunks.__anext__(), timeout=deadline - time.perf_counter())
+                except StopAsyncIteration:
+                    break
+                yield {"event": "wrapper_code", "delta": delta}
+            timings["wrapper_code"] = round((time.perf_counter() - start) * 1000, 1)
+
+            yield {"event": "suggestion", "suggested_integration": await suggestion_task}
+        finally:
+            suggestion_task.cancel()
+            await chunks.aclose()
+
+        start = time.perf_counter()
+        env_template = await self.generate_env_template(auth_methods)
+        timings["env_template"] = round((time.perf_counter() - start) * 1000, 1)
+        yield {"event": "env_template", "env_template": env_template}
+
+        for name, ms in timings.items():
+            observe_stage(name, ms / 1000)
+        logger.info("Stage timings (ms): " + ", ".join(f"{name}={ms}" for name, ms in timings.items()))
+        logger.info(f"Prompts: {prompt_stats.summary()}")
+        yield {"event": "done", "stage_timings": timings, "prompt_tokens": prompt_stats.to_dict() or None}
+
     async def generate_env_template(self, auth_methods: List[Dict[str, Any]]) -> str:
         """
         Generate a .env file template based on the detected authentication methods
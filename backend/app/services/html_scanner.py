@@ -0,0 +1,402 @@
+import hashlib
+import re
+from typing import Any, Dict, List, Optional
+
+from lxml import etree, html as lxml_html
+
+# One pass over the page text finds both endpoint lines and auth terms: HTTP methods
+# are matched case-sensitively, auth terms case-insensitively
+_SIGNAL_RE = re.compile(
+    r'(?P<method>GET|POST|PUT|DELETE|PATCH)\s+(?P<path>/[\w/{}]+)'
+    r'|(?i:\b(?P<auth>authentication|authorization|api key|bearer token|oauth|basic auth|jwt|access token)\b)'
+)
+_ENDPOINT_RE = re.compile(r'(GET|POST|PUT|DELETE|PATCH)\s+(/[\w/{}]+)')
+_WHITESPACE_RE = re.compile(r'\s+')
+
+SPEC_URL_RE = re.compile(r'(openapi|swagger|api-docs|postman_collection)[^"\'\s]*\.(json|ya?ml)$|/(v[23]/)?api-docs$', re.IGNORECASE)
+_SPEC_HINT_RE = re.compile(r'swagger|openapi|redoc|api-docs', re.IGNORECASE)
+_SCRIPT_SPEC_URL_RE = re.compile(r'(?:url|spec-?url|specUrl)["\']?\s*[:=]\s*["\']([^"\']+)["\']', re.IGNORECASE)
+
+_HEADINGS = frozenset(('h1', 'h2', 'h3', 'h4', 'h5', 'h6'))
+# Elements that end a run of text; a space is emitted after them so adjacent table
+# cells and paragraphs do not run together ("GET/v1/users")
+_BREAKS = frozenset(('p', 'div', 'li', 'td', 'th', 'tr', 'dt', 'dd', 'br', 'section', 'article',
+                     'table', 'ul', 'ol', 'blockquote', 'pre')) | _HEADINGS
+_SKIPPED = frozenset(('script', 'style', 'noscript', 'template'))
+_SPEC_TAGS = frozenset(('redoc', 'rapi-doc', 'elements-api'))
+
+# Sections longer than this are split so the ranker can pick the relevant part
+MAX_SECTION_CHARS = 1500
+MAX_SECTIONS = 2000
+# Caps on repeated hits so the prompt is not filled with the same context
+MAX_ENDPOINT_HITS = 200
+MAX_TABLE_HITS = 20
+MAX_AUTH_CONTEXTS_PER_TERM = 3
+MAX_TEXT_CHARS = 50000
+MAX_LINKS = 5000
+# Text collected before a streamed page stops being read; bounds memory on huge pages
+DEFAULT_TEXT_BUDGET = 1_000_000
+
+
+def section_hash(heading: Optional[str], kind: str, text: str) -> str:
+    """
+    Content hash of a documentation section, so a re-analysis can tell which sections
+    changed since the last snapshot
+    """
+    return hashlib.blake2b(f"{heading or ''}\0{kind}\0{text}".encode("utf-8"), digest_size=8).hexdigest()
+
+
+class DocumentScanner:
+    """
+    Single-pass extraction over lxml start/end events.
+
+    The scanner is fed element events in document order, either from a parsed tree
+    (scan_html) or from an incremental parser, and collects the page text, heading/code
+    sections, endpoint tables, links and spec references without re-walking the tree.
+    Only text inside <main> is kept when the page has one, otherwise <body>. Text
+    beyond text_budget characters is ignored and ``full`` becomes true, so a streaming
+    caller can stop reading.
+    """
+
+    def __init__(self, text_budget: Optional[int] = None):
+        self.text_budget = text_budget
+        self.text_chars = 0
+        self.text_parts: List[str] = []
+        self.sections: List[Dict[str, str]] = []
+        self.table_contexts: List[str] = []
+        self.links: List[str] = []
+        self.spec_candidates: List[str] = []
+
+        self._in_scope = False
+        self._in_main = False
+        self._skip_depth = 0
+        self._heading = ""
+        self._heading_parts: Optional[List[str]] = None
+        self._code_parts: Optional[List[str]] = None
+        self._section_parts: List[str] = []
+        self._tables: List[Dict[str, Any]] = []
+        self._row_parts: Optional[List[str]] = None
+
+    def start(self, element):
+        """Handle a start tag; the text preceding it is complete at this point"""
+        tag = element.tag
+        if not isinstance(tag, str):
+            return
+        self._emit_preceding_text(element)
+        if tag in _BREAKS and self._code_parts is None:
+            self._emit(' ')
+
+        if tag == 'main' and not self._in_main:
+            # A <main> replaces whatever body text was collected so far
+            self._in_main = True
+            self._in_scope = True
+            self.text_parts = []
+            self.text_chars = 0
+            self.sections = []
+            self._section_parts = []
+            self.table_contexts = []
+        elif tag == 'body' and not self._in_main:
+            self._in_scope = True
+
+        if tag in _SKIPPED:
+            self._skip_depth += 1
+        elif tag in _HEADINGS:
+            self._flush_section()
+            self._heading_parts = []
+        elif tag == 'pre':
+            self._flush_section()
+            self._code_parts = []
+        elif tag == 'table':
+            self._tables.append({"header": None, "hit": None})
+        elif tag == 'tr':
+            self._row_parts = []
+        elif tag == 'a':
+            href = element.get('href')
+            if href:
+                if len(self.links) < MAX_LINKS:
+                    self.links.append(href)
+                if SPEC_URL_RE.search(href):
+                    self.spec_candidates.append(href)
+        elif tag == 'link':
+            href = element.get('href')
+            rel = (element.get('rel') or "").lower()
+            if href and ("describedby" in rel or "service-desc" in rel or SPEC_URL_RE.search(href)):
+                self.spec_candidates.append(href)
+        elif tag in _SPEC_TAGS:
+            spec_url = element.get('spec-url') or element.get('apidescriptionurl')
+            if spec_url:
+                self.spec_candidates.append(spec_url)
+
+    def end(self, element):
+        """Handle an end tag; the element's own text and its children's tails are complete"""
+        tag = element.tag
+        if not isinstance(tag, str):
+            return
+        self._emit_trailing_text(element)
+
+        if tag in _SKIPPED:
+            self._skip_depth -= 1
+            if tag == 'script' and element.text and _SPEC_HINT_RE.search(element.text):
+                for match in _SCRIPT_SPEC_URL_RE.finditer(element.text):
+                    candidate = match.group(1)
+                    if candidate.lower().endswith(('.json', '.yaml', '.yml')) or 'api-docs' in candidate:
+                        self.spec_candidates.append(candidate)
+        elif tag in _HEADINGS and self._heading_parts is not None:
+            self._heading = _WHITESPACE_RE.sub(' ', "".join(self._heading_parts)).strip()
+            self._heading_parts = None
+        elif tag == 'pre' and self._code_parts is not None:
+            code = "".join(self._code_parts).strip()
+            self._code_parts = None
+            if code and self._in_scope:
+                for piece in split_text(code, MAX_SECTION_CHARS * 2, sep="\n"):
+                    self._add_section("code", piece)
+        elif tag == 'tr' and self._row_parts is not None:
+            self._end_row()
+        elif tag == 'table' and self._tables:
+            table = self._tables.pop()
+            if table["hit"] and self._in_scope and len(self.table_contexts) < MAX_TABLE_HITS:
+                self.table_contexts.append(table["hit"])
+        elif tag in ('main', 'body'):
+            if tag == 'body' or self._in_main:
+                self._flush_section()
+                self._in_scope = False
+
+        if tag in _BREAKS and self._code_parts is None:
+            self._emit(' ')
+
+    @property
+    def full(self) -> bool:
+        return self.text_budget is not None and self.text_chars >= self.text_budget
+
+    def _end_row(self):
+        row = _WHITESPACE_RE.sub(' ', "".join(self._row_parts)).strip()
+        self._row_parts = None
+        if not self._tables or not row:
+            return
+        table = self._tables[-1]
+        if table["header"] is None:
+            table["header"] = row
+        if table["hit"] is None and _ENDPOINT_RE.search(row):
+            # Keep the header and the first matching row rather than the whole table markup
+            context = row if row == table["header"] else f"{table['header']} | {row}"
+            table["hit"] = context[:1000]
+
+    def _emit_preceding_text(self, element):
+        """Emit the parent's text (first child) or the tails of the preceding siblings"""
+        tails = []
+        sibling = element.getprevious()
+        while sibling is not None and not isinstance(sibling.tag, str):
+            # Comments and processing instructions get no events, so collect their tails here
+            tails.append(sibling.tail)
+            sibling = sibling.getprevious()
+        if sibling is not None:
+            tails.append(sibling.tail)
+        else:
+            parent = element.getparent()
+            if parent is not None:
+                tails.append(parent.text)
+        for text in reversed(tails):
+            if text:
+                self._emit(text)
+
+    def _emit_trailing_text(self, element):
+        """Emit the element's own text (no children) or the tails after its last child"""
+        tails = []
+        child = element[-1] if len(element) else None
+        while child is not None and not isinstance(child.tag, str):
+            tails.append(child.tail)
+            child = child.getprevious()
+        if child is not None:
+            tails.append(child.tail)
+        else:
+            tails.append(element.text)
+        for text in reversed(tails):
+            if text:
+                self._emit(text)
+
+    def _emit(self, text: str):
+        if self._skip_depth:
+            return
+        if self._row_parts is not None:
+            self._row_parts.append(text)
+        if not self._in_scope or self.full:
+            return
+        self.text_parts.append(text)
+        self.text_chars += len(text)
+        if self._heading_parts is not None:
+            self._heading_parts.append(text)
+        elif self._code_parts is not None:
+            self._code_parts.append(text)
+        else:
+            self._section_parts.append(text)
+
+    def _flush_section(self):
+        if not self._section_parts:
+            return
+        text = _WHITESPACE_RE.sub(' ', "".join(self._section_parts)).strip()
+        self._section_parts = []
+        for piece in split_text(text, MAX_SECTION_CHARS):
+            self._add_section("text", piece)
+
+    def _add_section(self, kind: str, text: str):
+        if len(self.sections) < MAX_SECTIONS:
+            self.sections.append({"heading": self._heading, "kind": kind, "text": text,
+                                  "hash": section_hash(self._heading, kind, text)})
+
+    def result(self) -> Dict[str, Any]:
+        """
+        Finish the scan and return text, sections, potential endpoints/auth, links and spec references
+        """
+        self._flush_section()
+        text_content = _WHITESPACE_RE.sub(' ', "".join(self.text_parts)).strip()
+        potential_endpoints, potential_auth = scan_signals(text_content)
+        potential_endpoints.extend(
+            {"context_type": "table", "raw_context": context} for context in self.table_contexts
+        )
+        return {
+            "raw_text": text_content[:MAX_TEXT_CHARS],
+            "sections": self.sections,
+            "potential_endpoints": potential_endpoints,
+            "potential_auth": potential_auth,
+            "links": self.links,
+            "spec_urls": self.spec_candidates
+        }
+
+
+def scan_html(html: str) -> Dict[str, Any]:
+    """
+    Parse an HTML page with lxml and run the scanner over it in one walk
+    """
+    scanner = DocumentScanner()
+    if not html.strip():
+        return scanner.result()
+    try:
+        root = lxml_html.document_fromstring(html)
+    except (etree.ParserError, ValueError):
+        # lxml refuses str input with an XML encoding declaration
+        root = lxml_html.document_fromstring(html.encode("utf-8"))
+    for event, element in etree.iterwalk(root, events=("start", "end")):
+        if event == "start":
+            scanner.start(element)
+        else:
+            scanner.end(element)
+    return scanner.result()
+
+
+class IncrementalScanner:
+    """
+    Runs DocumentScanner over an HTML document fed in byte chunks, e.g. as it downloads.
+
+    Elements are cleared once their end tag has been handled and earlier siblings are
+    removed, so the tree never holds more than the path from the root to the current
+    element; with the scanner's text budget, memory stays flat however large the page.
+    """
+
+    def __init__(self, encoding: Optional[str] = None, text_budget: Optional[int] = DEFAULT_TEXT_BUDGET):
+        self.scanner = DocumentScanner(text_budget)
+        self.parser = etree.HTMLPullParser(events=("start", "end"), encoding=encoding)
+        self.bytes_fed = 0
+
+    @property
+    def full(self) -> bool:
+        """True once the text budget is used up; further input would be ignored"""
+        return self.scanner.full
+
+    def feed(self, data: bytes):
+        self.bytes_fed += len(data)
+        self.parser.feed(data)
+        self._drain()
+
+    def close(self) -> Dict[str, Any]:
+        """Finish parsing and return the scanner result"""
+        if not self.full:
+            try:
+                self.parser.close()
+            except etree.XMLSyntaxError:
+                # Empty or non-HTML input; whatever was scanned is the result
+                pass
+            self._drain()
+        return self.scanner.result()
+
+    def _drain(self):
+        for event, element in self.parser.read_events():
+            if event == "start":
+                self.scanner.start(element)
+                continue
+            self.scanner.end(element)
+            # The text of this element and its children has been emitted; only its tail
+            # is still needed, by the next sibling's start or the parent's end
+            element.clear(keep_tail=True)
+            parent = element.getparent()
+            if parent is not None:
+                while element.getprevious() is not None:
+                    del parent[0]
+
+
+def scan_bytes(data: bytes,
+               encoding: Optional[str] = None,
+               text_budget: Optional[int] = DEFAULT_TEXT_BUDGET,
+               chunk_bytes: int = 64 * 1024) -> Dict[str, Any]:
+    """
+    Scan a downloaded HTML document with IncrementalScanner, stopping once the text
+    budget is full. A module-level function so it can run in a worker process
+    """
+    scanner = IncrementalScanner(encoding=encoding, text_budget=text_budget)
+    for start in range(0, len(data), chunk_bytes):
+        scanner.feed(data[start:start + chunk_bytes])
+        if scanner.full:
+            break
+    return scanner.close()
+
+
+def scan_signals(text_content: str):
+    """
+    Find endpoint lines and auth terms with a single precompiled alternation,
+    deduplicating hits and capping the number of contexts kept
+    """
+    endpoints = []
+    seen_endpoints = set()
+    auth_methods = []
+    auth_counts: Dict[str, int] = {}
+    last_auth_end: Dict[str, int] = {}
+    length = len(text_content)
+
+    for match in _SIGNAL_RE.finditer(text_content):
+        method = match.group('method')
+        if method:
+            path = match.group('path')
+            if (method, path) in seen_endpoints or len(endpoints) >= MAX_ENDPOINT_HITS:
+                continue
+            seen_endpoints.add((method, path))
+            endpoints.append({
+                "method": method,
+                "path": path,
+                "raw_context": text_content[max(0, match.start() - 100):min(length, match.end() + 100)]
+            })
+            continue
+
+        term = match.group('auth').lower()
+        count = auth_counts.get(term, 0)
+        # Skip hits inside the previous context for the same term and stop after a few
+        if count >= MAX_AUTH_CONTEXTS_PER_TERM or match.start() < last_auth_end.get(term, -1):
+            continue
+        start = max(0, match.start() - 100)
+        end = min(length, match.end() + 200)
+        auth_counts[term] = count + 1
+        last_auth_end[term] = end
+        auth_methods.append({"term": term, "context": text_content[start:end]})
+
+    return endpoints, auth_methods
+
+
+def split_text(text: str, limit: int, sep: str = ". ") -> List[str]:
+    """Cut text into pieces of at most limit characters, preferring to break after sep"""
+    pieces = []
+    while len(text) > limit:
+        cut = text.rfind(sep, 0, limit)
+        cut = cut + len(sep) if cut > limit // 2 else limit
+        pieces.append(text[:cut].strip())
+        text = text[cut:]
+    if text.strip():
+        pieces.append(text.strip())
+    return pieces
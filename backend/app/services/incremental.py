@@ -0,0 +1,144 @@
+import re
+from typing import Any, Dict, Iterable, List, Set, Tuple
+
+from app.services.html_scanner import MAX_TEXT_CHARS, section_hash
+from app.services.prompts import contained_in, squash
+
+# Endpoint fields compared when deciding whether an endpoint changed
+ENDPOINT_FIELDS = ("description", "parameters", "response_example")
+# Path segments that name a parameter, in any of the usual notations
+_PARAMETER_SEGMENT_RE = re.compile(r"^(\{[^}]*\}|:\w+|<[^>]*>)$")
+# Words in an auth type that do not tell one scheme from another
+_GENERIC_AUTH_WORDS = {"auth", "authentication", "authorization", "token", "scheme", "method", "header"}
+
+EndpointKey = Tuple[str, str]
+
+
+def endpoint_key(endpoint: Dict[str, Any]) -> EndpointKey:
+    return endpoint["method"].upper(), endpoint["path"].rstrip("/") or "/"
+
+
+def path_pattern(path: str) -> "re.Pattern[str]":
+    """
+    Regex for an endpoint path in documentation text; a parameter segment matches any
+    segment, so /users/{id} is found in text that writes /users/:id
+    """
+    segments = path.rstrip("/").split("/") if path.rstrip("/") else ["", ""]
+    pattern = "/".join(r"[^/\s]+" if _PARAMETER_SEGMENT_RE.match(s) else re.escape(s) for s in segments)
+    return re.compile(pattern + r"(?![\w/{<:-])")
+
+
+def auth_mentioned(auth_type: str, text: str) -> bool:
+    """
+    Whether text still documents an auth type, i.e. mentions the distinctive words of
+    its name ("bearer" for "Bearer Token", "oauth" for "OAuth 2.0")
+    """
+    words = re.findall(r"[a-z]+", auth_type.lower())
+    words = [w for w in words if w not in _GENERIC_AUTH_WORDS] or words
+    text = text.lower()
+    return all(re.search(r"\b" + re.escape(word), text) for word in words)
+
+
+def document_sections(extracted_data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    The extraction's sections, each with its content hash (computed here for extraction
+    results cached before the scanner added them); the raw text as one section when
+    the extractor produced none
+    """
+    sections = extracted_data.get("sections") or [
+        {"heading": "", "kind": "text", "text": extracted_data.get("raw_text", "")}
+    ]
+    return [
+        section if "hash" in section
+        else dict(section, hash=section_hash(section.get("heading"), section.get("kind", "text"), section["text"]))
+        for section in sections
+    ]
+
+
+def section_text(sections: Iterable[Dict[str, Any]]) -> str:
+    return "\n".join(f"{section.get('heading') or ''}\n{section['text']}" for section in sections)
+
+
+def mentioned(endpoints: Iterable[Dict[str, Any]], text: str) -> Set[EndpointKey]:
+    """Keys of the endpoints whose path appears in text"""
+    return {endpoint_key(e) for e in endpoints if path_pattern(e["path"]).search(text)}
+
+
+def narrow_extraction(extracted_data: Dict[str, Any], sections: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    The extraction cut down to the given sections, keeping only the endpoint and auth
+    hits found in them, so the analysis prompt carries nothing else
+    """
+    text = squash(section_text(sections))
+    endpoints = [
+        hit for hit in extracted_data.get("potential_endpoints", [])
+        if (path_pattern(hit["path"]).search(text) if "path" in hit
+            else contained_in(squash(hit.get("raw_context", "")), text))
+    ]
+    auth = [hit for hit in extracted_data.get("potential_auth", []) if contained_in(squash(hit["context"]), text)]
+    return {
+        "url": extracted_data.get("url", ""),
+        "raw_text": text[:MAX_TEXT_CHARS],
+        "sections": sections,
+        "potential_endpoints": endpoints,
+        "potential_auth": auth
+    }
+
+
+def merge_analysis(previous: Tuple[List[Dict[str, Any]], List[Dict[str, Any]]],
+                   found: Tuple[List[Dict[str, Any]], List[Dict[str, Any]]],
+                   matched: Iterable[EndpointKey],
+                   text: str,
+                   unchanged_text: str) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    Merge what the analysis of the changed sections found into the previous endpoints
+    and auth methods.
+
+    Found endpoints replace previous ones with the same method and path and new ones are
+    appended. A previous endpoint that was not found again is dropped only when its path
+    was matched in the old documentation (matched) and no longer appears in text, the
+    new documentation; otherwise it is kept, since the changed sections need not mention
+    every endpoint.
+
+    Auth methods are rebuilt: the ones found in the changed sections, plus previous ones
+    still mentioned in unchanged_text, the sections that did not change. An auth method
+    documented only in sections that changed or were removed is dropped unless the
+    analysis found it again.
+    """
+    previous_endpoints, previous_auth = previous
+    found_endpoints, found_auth = found
+    found_by_key = {endpoint_key(e): e for e in found_endpoints}
+    matched = {tuple(key) for key in matched}
+
+    endpoints = []
+    for endpoint in previous_endpoints:
+        key = endpoint_key(endpoint)
+        if key in found_by_key:
+            endpoints.append(found_by_key.pop(key))
+        elif key not in matched or path_pattern(endpoint["path"]).search(text):
+            endpoints.append(endpoint)
+    endpoints.extend(found_by_key.values())
+
+    auth_methods = {a["type"].lower(): a for a in previous_auth if auth_mentioned(a["type"], unchanged_text)}
+    auth_methods.update((a["type"].lower(), a) for a in found_auth)
+    return endpoints, list(auth_methods.values())
+
+
+def diff_endpoints(before: List[Dict[str, Any]], after: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+    """Endpoints added, removed and changed (with the fields that differ) between two analyses"""
+    old = {endpoint_key(e): e for e in before}
+    new = {endpoint_key(e): e for e in after}
+    changed = []
+    for key, endpoint in new.items():
+        if key not in old:
+            continue
+        # A missing value, None and an empty dict all mean "not documented"
+        fields = [f for f in ENDPOINT_FIELDS if (old[key].get(f) or None) != (endpoint.get(f) or None)]
+        if fields:
+            changed.append({"method": key[0], "path": endpoint["path"], "fields": fields,
+                            "before": old[key], "after": endpoint})
+    return {
+        "added": [e for key, e in new.items() if key not in old],
+        "removed": [e for key, e in old.items() if key not in new],
+        "changed": changed
+    }
@@ -0,0 +1,402 @@
+import asyncio
+import json
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from app.models.schemas import ApiRequest, ApiResponse
+from app.services.cache import connect_sqlite, make_key
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = ("queued", "running")
+
+
+def coalesce_key(request: ApiRequest) -> str:
+    """
+    Identify requests that produce the same result. use_cache is left out: a request
+    that asks for fresh results still gets them from an execution that is already running
+    """
+    return make_key(request.model_dump(mode="json", exclude={"use_cache"}))[:20]
+
+
+def _owner_alive(pid: Optional[int]) -> bool:
+    """Whether the server process (on this host) that owns a job is still running"""
+    if pid is None or pid == os.getpid() or os.name == "nt":
+        # os.kill(pid, 0) would terminate the process on Windows
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class QueueFull(Exception):
+    """Raised when the job queue is at capacity"""
+
+    def __init__(self, depth: int, retry_after: int):
+        super().__init__(f"Job queue is full ({depth} jobs waiting)")
+        self.retry_after = retry_after
+
+
+class MemoryJobStore:
+    """
+    Job records kept in process memory; jobs are lost on restart
+    """
+
+    def __init__(self):
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def save(self, job: Dict[str, Any]):
+        with self._lock:
+            self._jobs[job["job_id"]] = dict(job)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+        return dict(job) if job is not None else None
+
+    def active(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            jobs = [dict(job) for job in self._jobs.values() if job["status"] in ACTIVE_STATUSES]
+        return sorted(jobs, key=lambda job: job["created_at"])
+
+    def claim(self, job: Dict[str, Any], previous: Dict[str, Any]) -> bool:
+        """Save job if its record is still previous; False when another worker changed it first"""
+        with self._lock:
+            if self._jobs.get(job["job_id"]) != previous:
+                return False
+            self._jobs[job["job_id"]] = dict(job)
+            return True
+
+    def purge_finished(self, before: float):
+        with self._lock:
+            for job_id in [job_id for job_id, job in self._jobs.items()
+                           if job["status"] not in ACTIVE_STATUSES and (job["finished_at"] or 0) < before]:
+                del self._jobs[job_id]
+
+    def close(self):
+        pass
+
+
+class SQLiteJobStore:
+    """
+    Job records in a SQLite file, so queued and running jobs are picked up again after a restart
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = connect_sqlite(path)
+        with self._lock:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "job_id TEXT PRIMARY KEY, status TEXT NOT NULL, created_at REAL NOT NULL, "
+                "finished_at REAL, payload TEXT NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status)")
+            self._conn.commit()
+
+    def save(self, job: Dict[str, Any]):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO jobs (job_id, status, created_at, finished_at, payload) VALUES (?, ?, ?, ?, ?)",
+                (job["job_id"], job["status"], job["created_at"], job["finished_at"], json.dumps(job))
+            )
+            self._conn.commit()
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT payload FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    def active(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT payload FROM jobs WHERE status IN (?, ?) ORDER BY created_at", ACTIVE_STATUSES
+            ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def claim(self, job: Dict[str, Any], previous: Dict[str, Any]) -> bool:
+        """Save job if its record is still previous; False when another worker changed it first"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = ?, finished_at = ?, payload = ? WHERE job_id = ? AND payload = ?",
+                (job["status"], job["finished_at"], json.dumps(job), job["job_id"], json.dumps(previous))
+            )
+            self._conn.commit()
+        return cursor.rowcount == 1
+
+    def purge_finished(self, before: float):
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM jobs WHERE status NOT IN (?, ?) AND finished_at < ?", (*ACTIVE_STATUSES, before)
+            )
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class JobQueue:
+    """
+    Runs analyses in the background on a fixed pool of workers.
+
+    Submitting a request that is identical to a queued or running job returns that job
+    instead of starting a second execution. When more than max_queued jobs are waiting,
+    submissions are rejected with QueueFull so clients back off rather than pile up.
+    Job records live in the store; with a SQLite store, jobs that were queued or
+    running when the server stopped are queued again on start. Several server
+    processes (uvicorn workers) can share one SQLite store: each runs the jobs it
+    accepted, any of them can report a job's status, and on start a worker only takes
+    over jobs whose owning process has exited. Coalescing is per process.
+    """
+
+    def __init__(self,
+                 run: Callable[[ApiRequest], Awaitable[ApiResponse]],
+                 store=None,
+                 workers: int = 2,
+                 max_queued: int = 50,
+                 ttl: float = 86400,
+                 purge_seconds: float = 300):
+        self.run = run
+        self.store = store or MemoryJobStore()
+        self.workers = workers
+        self.max_queued = max_queued
+        self.ttl = ttl
+        # How often finished jobs older than ttl are deleted from the store
+        self.purge_seconds = purge_seconds
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        # Queued and running jobs by ID, and their IDs by coalescing key
+        self._active: Dict[str, Dict[str, Any]] = {}
+        self._inflight: Dict[str, str] = {}
+        self._watchers: Dict[str, List[asyncio.Queue]] = {}
+        self._start_lock = asyncio.Lock()
+        # Held from the coalescing check until the new job is saved and tracked
+        self._submit_lock = asyncio.Lock()
+        # Running average of job duration, for the Retry-After estimate
+        self._avg_seconds = 30.0
+        # How often events() re-reads a job that another worker process is running, and how
+        # long it waits for a notification about a job of this process before reading it
+        self.poll_seconds = 1.0
+        self.watch_seconds = 5.0
+
+    @classmethod
+    def from_env(cls, run: Callable[[ApiRequest], Awaitable[ApiResponse]]) -> "JobQueue":
+        """
+        Build the queue from JOB_* environment variables; JOB_STORE_PATH selects the SQLite store
+        """
+        store = None
+        store_path = os.getenv("JOB_STORE_PATH")
+        if store_path:
+            try:
+                store = SQLiteJobStore(store_path)
+            except sqlite3.Error as e:
+                logger.error(f"Could not open job database {store_path}: {str(e)}")
+        return cls(
+            run,
+            store=store,
+            workers=int(os.getenv("JOB_WORKERS", "2")),
+            max_queued=int(os.getenv("JOB_MAX_QUEUED", "50")),
+            ttl=float(os.getenv("JOB_TTL_SECONDS", "86400")),
+            purge_seconds=float(os.getenv("JOB_PURGE_INTERVAL_SECONDS", "300"))
+        )
+
+    async def start(self):
+        """
+        Start the workers and requeue unfinished jobs from the store; safe to call repeatedly
+        """
+        async with self._start_lock:
+            if self._queue is not None:
+                return
+            self._queue = asyncio.Queue()
+            await asyncio.to_thread(self.store.purge_finished, time.time() - self.ttl)
+            recovered = 0
+            for previous in await asyncio.to_thread(self.store.active):
+                if _owner_alive(previous.get("owner")):
+                    continue
+                job = dict(previous, status="queued", started_at=None, owner=os.getpid())
+                # Other workers starting at the same time may try to take the same job
+                if not await asyncio.to_thread(self.store.claim, job, previous):
+                    continue
+                self._track(job)
+                self._queue.put_nowait(job["job_id"])
+                recovered += 1
+            if recovered:
+                logger.info(f"Requeued {recovered} unfinished jobs")
+            self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+            self._tasks.append(asyncio.create_task(self._purger()))
+
+    async def submit(self, request: ApiRequest) -> Tuple[Dict[str, Any], bool]:
+        """
+        Queue a job for the request and return (job, coalesced)
+        """
+        await self.start()
+        key = coalesce_key(request)
+        async with self._submit_lock:
+            existing = self._inflight.get(key)
+            if existing is not None:
+                return dict(self._active[existing]), True
+
+            depth = self._queue.qsize()
+            if depth >= self.max_queued:
+                raise QueueFull(depth, max(1, math.ceil(self._avg_seconds * depth / self.workers)))
+
+            job = self._new_job(key, request)
+            # Saved before it is tracked or queued, so a failed save leaves no job behind
+            await asyncio.to_thread(self.store.save, job)
+            self._track(job)
+            self._queue.put_nowait(job["job_id"])
+        return dict(job), False
+
+    def _new_job(self, key: str, request: ApiRequest) -> Dict[str, Any]:
+        return {
+            "job_id": uuid.uuid4().hex,
+            "key": key,
+            "owner": os.getpid(),
+            "status": "queued",
+            "request": request.model_dump(mode="json"),
+            "created_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+            "result": None,
+            "error": None
+        }
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        if job_id in self._active:
+            return dict(self._active[job_id])
+        return await asyncio.to_thread(self.store.get, job_id)
+
+    def _track(self, job: Dict[str, Any]):
+        self._active[job["job_id"]] = job
+        self._inflight[job["key"]] = job["job_id"]
+
+    def _untrack(self, job: Dict[str, Any]):
+        self._active.pop(job["job_id"], None)
+        if self._inflight.get(job["key"]) == job["job_id"]:
+            del self._inflight[job["key"]]
+
+    async def events(self, job_id: str) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Yield the job now and after every status change, until it finishes. Changes to
+        a job run by another worker process are picked up by polling the store; a job of
+        this process is also read again when no notification came for watch_seconds
+        """
+        updates: asyncio.Queue = asyncio.Queue()
+        # Subscribe before reading so a change between the read and the wait is not missed
+        self._watchers.setdefault(job_id, []).append(updates)
+        try:
+            job = await self.get(job_id)
+            while job is not None:
+                yield job
+                if job["status"] not in ACTIVE_STATUSES:
+                    return
+                previous = job
+                while job == previous:
+                    if job_id in self._active:
+                        try:
+                            job = await asyncio.wait_for(updates.get(), self.watch_seconds)
+                            continue
+                        except asyncio.TimeoutError:
+                            pass
+                    else:
+                        await asyncio.sleep(self.poll_seconds)
+                    job = await self.get(job_id)
+                    # Notifications queued so far are no newer than what was just read
+                    while not updates.empty():
+                        updates.get_nowait()
+        finally:
+            watchers = self._watchers.get(job_id, [])
+            if updates in watchers:
+                watchers.remove(updates)
+            if not watchers:
+                self._watchers.pop(job_id, None)
+
+    async def _update(self, job: Dict[str, Any], attempts: int = 1, **fields):
+        """
+        Change the job, save it (trying up to attempts times) and notify its watchers. The
+        watchers are notified even when saving fails, and the save error is then raised
+        """
+        job.update(fields)
+        try:
+            for attempt in range(attempts):
+                try:
+                    await asyncio.to_thread(self.store.save, job)
+                    break
+                except Exception:
+                    if attempt == attempts - 1:
+                        raise
+                    await asyncio.sleep(0.2 * 2 ** attempt)
+        finally:
+            for watcher in self._watchers.get(job["job_id"], []):
+                watcher.put_nowait(dict(job))
+
+    async def _worker(self):
+        while True:
+            job_id = await self._queue.get()
+            try:
+                job = self._active.get(job_id)
+                if job is not None and job["status"] == "queued":
+                    await self._execute(job)
+            except Exception as e:
+                logger.error(f"Job worker failed on job {job_id}: {str(e)}")
+            finally:
+                self._queue.task_done()
+
+    async def _purger(self):
+        """Delete finished jobs older than ttl every purge_seconds, so the store does not grow without bound"""
+        while True:
+            await asyncio.sleep(self.purge_seconds)
+            try:
+                await asyncio.to_thread(self.store.purge_finished, time.time() - self.ttl)
+            except Exception as e:
+                logger.error(f"Could not purge finished jobs: {str(e)}")
+
+    async def _execute(self, job: Dict[str, Any]):
+        start = time.perf_counter()
+        try:
+            try:
+                await self._update(job, status="running", started_at=time.time())
+            except Exception as e:
+                # The job runs anyway; its final state is saved when it finishes
+                logger.error(f"Could not save job {job['job_id']} as running: {str(e)}")
+            try:
+                response = await self.run(ApiRequest(**job["request"]))
+            except Exception as e:
+                logger.error(f"Job {job['job_id']} ({job['request']['documentation_url']}) failed: {str(e)}")
+                outcome = {"status": "failed", "error": str(e)}
+            else:
+                outcome = {"status": "succeeded", "result": response.model_dump(mode="json")}
+            try:
+                await self._update(job, attempts=3, finished_at=time.time(), **outcome)
+            except Exception as e:
+                logger.error(f"Could not save the result of job {job['job_id']}: {str(e)}")
+        finally:
+            self._untrack(job)
+            self._avg_seconds = 0.8 * self._avg_seconds + 0.2 * (time.perf_counter() - start)
+
+    async def aclose(self):
+        """
+        Stop the workers. Jobs still running stay marked as running in the store and are
+        requeued by the next start
+        """
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+        self._active.clear()
+        self._inflight.clear()
+        self.store.close()
@@ -0,0 +1,271 @@
+import asyncio
+import logging
+import os
+import time
+import uuid
+from collections import Counter
+from typing import Any, AsyncIterator, Dict, List, Optional, Set
+
+from app.models.schemas import LoadTestRequest, LoadTestResult
+from app.services.metrics import LOAD_TEST_REQUESTS
+from app.services.proxy import SUPPORTED_METHODS
+
+logger = logging.getLogger(__name__)
+
+
+class LoadTestBusy(Exception):
+    """Raised when this server process already runs its maximum number of load tests"""
+
+    def __init__(self, active: int, retry_after: int):
+        super().__init__(f"{active} load tests are already running; try again later")
+        self.retry_after = retry_after
+
+
+class LoadTestLimits:
+    """
+    Server-side limits on playground load tests. Requests above a limit are lowered to
+    it (and the result says so) rather than rejected
+    """
+
+    def __init__(self,
+                 max_requests: int = 1000,
+                 max_concurrency: int = 20,
+                 max_rps: float = 100.0,
+                 max_seconds: float = 60.0,
+                 max_active: int = 2,
+                 stop_error_rate: float = 0.5,
+                 min_samples: int = 20,
+                 progress_seconds: float = 0.5):
+        self.max_requests = max_requests
+        self.max_concurrency = max_concurrency
+        self.max_rps = max_rps
+        self.max_seconds = max_seconds
+        self.max_active = max_active
+        # Stop early once this share of at least min_samples requests failed: the target is down
+        # or refusing us, and hammering it further tells the user nothing new
+        self.stop_error_rate = stop_error_rate
+        self.min_samples = min_samples
+        self.progress_seconds = progress_seconds
+
+    @classmethod
+    def from_env(cls) -> "LoadTestLimits":
+        return cls(
+            max_requests=int(os.getenv("LOAD_TEST_MAX_REQUESTS", "1000")),
+            max_concurrency=int(os.getenv("LOAD_TEST_MAX_CONCURRENCY", "20")),
+            max_rps=float(os.getenv("LOAD_TEST_MAX_RPS", "100")),
+            max_seconds=float(os.getenv("LOAD_TEST_MAX_SECONDS", "60")),
+            max_active=int(os.getenv("LOAD_TEST_MAX_ACTIVE", "2")),
+            stop_error_rate=float(os.getenv("LOAD_TEST_STOP_ERROR_RATE", "0.5")),
+            progress_seconds=float(os.getenv("LOAD_TEST_PROGRESS_SECONDS", "0.5"))
+        )
+
+
+def _percentile(ordered: List[float], q: float) -> Optional[float]:
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class LoadTestStats:
+    """Latencies, status and error counts of the requests a load test has finished so far"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.latencies: List[float] = []
+        self.statuses: Counter = Counter()
+        self.errors: Counter = Counter()
+        self.bytes_received = 0
+        self.failed = 0
+
+    @property
+    def completed(self) -> int:
+        return sum(self.statuses.values()) + sum(self.errors.values())
+
+    def add_response(self, status_code: int, seconds: float, size: int):
+        self.latencies.append(seconds)
+        self.statuses[str(status_code)] += 1
+        self.bytes_received += size
+        if status_code >= 500 or status_code == 429:
+            self.failed += 1
+
+    def add_error(self, error: BaseException):
+        # Requests without a response have no meaningful latency; they only count as errors
+        self.errors[type(error).__name__] += 1
+        self.failed += 1
+
+    def error_rate(self) -> float:
+        return self.failed / self.completed if self.completed else 0.0
+
+    def summary(self) -> Dict[str, Any]:
+        elapsed = time.perf_counter() - self.started
+        ordered = sorted(self.latencies)
+
+        def ms(value: Optional[float]) -> Optional[float]:
+            return round(value * 1000, 2) if value is not None else None
+
+        return {
+            "completed": self.completed,
+            "elapsed_s": round(elapsed, 3),
+            "throughput_rps": round(self.completed / elapsed, 2) if elapsed > 0 else 0.0,
+            "latency_ms": {
+                "min": ms(ordered[0] if ordered else None),
+                "mean": ms(sum(ordered) / len(ordered) if ordered else None),
+                "p50": ms(_percentile(ordered, 0.5)),
+                "p90": ms(_percentile(ordered, 0.9)),
+                "p95": ms(_percentile(ordered, 0.95)),
+                "p99": ms(_percentile(ordered, 0.99)),
+                "max": ms(ordered[-1] if ordered else None)
+            },
+            "statuses": dict(self.statuses),
+            "errors": dict(self.errors),
+            "bytes_received": self.bytes_received
+        }
+
+
+class LoadTester:
+    """
+    Fires many copies of a playground request through the pooled ProxyClient.
+
+    Closed loop by default: concurrency requests are kept in flight, each sent as soon as
+    a previous one finishes. With rps set the test runs open loop instead, starting
+    request i at i / rps seconds whether or not earlier ones have answered (still at most
+    concurrency at once), so a slow target shows up as rising latency rather than as a
+    lower send rate. The proxy's per-host connection cap applies as well.
+    """
+
+    def __init__(self, proxy_client, analysis_store=None, limits: Optional[LoadTestLimits] = None):
+        self.proxy_client = proxy_client
+        self.analysis_store = analysis_store
+        self.limits = limits or LoadTestLimits.from_env()
+        # IDs of the planned tests holding one of the max_active slots
+        self._reserved: Set[str] = set()
+
+    @property
+    def active(self) -> int:
+        return len(self._reserved)
+
+    def plan(self, request: LoadTestRequest) -> Dict[str, Any]:
+        """
+        Validate the request, apply the server limits and reserve a slot for the test;
+        raise ValueError for a request that cannot run and LoadTestBusy when too many
+        tests are running already. The slot is held until release(plan), which run()
+        calls when it finishes; a caller that never runs the plan must release it
+        """
+        if request.method.upper() not in SUPPORTED_METHODS:
+            raise ValueError(f"Unsupported method: {request.method.lower()}")
+        if self.active >= self.limits.max_active:
+            raise LoadTestBusy(self.active, max(1, int(self.limits.max_seconds)))
+
+        applied = []
+        requests = request.requests
+        if requests > self.limits.max_requests:
+            requests = self.limits.max_requests
+            applied.append(f"requests lowered to {requests}")
+        concurrency = request.concurrency
+        max_concurrency = min(self.limits.max_concurrency, self.proxy_client.per_host_limit)
+        if concurrency > max_concurrency:
+            concurrency = max_concurrency
+            applied.append(f"concurrency lowered to {concurrency}")
+        rps = request.rps
+        if rps is not None and rps > self.limits.max_rps:
+            rps = self.limits.max_rps
+            applied.append(f"rps lowered to {rps:g}")
+        load_test_id = uuid.uuid4().hex[:16]
+        self._reserved.add(load_test_id)
+        return {"load_test_id": load_test_id, "requests": requests, "concurrency": min(concurrency, requests),
+                "rps": rps, "limits_applied": applied}
+
+    def release(self, plan: Dict[str, Any]):
+        """Give back the slot plan() reserved; safe to call more than once"""
+        self._reserved.discard(plan["load_test_id"])
+
+    async def run(self, request: LoadTestRequest, plan: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Run a test planned with plan(request), yielding a "started" event, a "progress"
+        event with the statistics so far every LOAD_TEST_PROGRESS_SECONDS, and a "done"
+        event with the LoadTestResult. Closing the iterator early (the client went away)
+        cancels the requests in flight; either way the plan's slot is released
+        """
+        stats = LoadTestStats()
+        stop_reason: Optional[str] = None
+        stopped = asyncio.Event()
+        in_flight: set = set()
+        dispatcher: Optional[asyncio.Task] = None
+
+        async def send_one(slots: asyncio.Semaphore):
+            nonlocal stop_reason
+            try:
+                response = await self.proxy_client.measure(
+                    request.method, request.url, request.headers, request.params, request.body
+                )
+            except Exception as e:
+                stats.add_error(e)
+                LOAD_TEST_REQUESTS.inc(outcome="error")
+            else:
+                stats.add_response(response["status_code"], response["timing"]["total_ms"] / 1000,
+                                   response["size_bytes"])
+                LOAD_TEST_REQUESTS.inc(outcome="ok")
+            finally:
+                slots.release()
+            if (stop_reason is None and stats.completed >= self.limits.min_samples
+                    and stats.error_rate() >= self.limits.stop_error_rate):
+                stop_reason = "error_rate"
+                stopped.set()
+
+        async def dispatch():
+            nonlocal stop_reason
+            slots = asyncio.Semaphore(plan["concurrency"])
+            deadline = stats.started + self.limits.max_seconds
+            for index in range(plan["requests"]):
+                if plan["rps"]:
+                    delay = stats.started + index / plan["rps"] - time.perf_counter()
+                    if delay > 0:
+                        try:
+                            await asyncio.wait_for(stopped.wait(), delay)
+                        except asyncio.TimeoutError:
+                            pass
+                await slots.acquire()
+                if stopped.is_set():
+                    slots.release()
+                    break
+                if time.perf_counter() >= deadline:
+                    slots.release()
+                    stop_reason = stop_reason or "max_seconds"
+                    break
+                task = asyncio.create_task(send_one(slots))
+                in_flight.add(task)
+                task.add_done_callback(in_flight.discard)
+            if in_flight:
+                await asyncio.wait(set(in_flight))
+
+        try:
+            dispatcher = asyncio.create_task(dispatch())
+            yield {"event": "started", **plan}
+            while not dispatcher.done():
+                await asyncio.wait({dispatcher}, timeout=self.limits.progress_seconds)
+                if not dispatcher.done():
+                    yield {"event": "progress", "requests": plan["requests"], **stats.summary()}
+            dispatcher.result()
+
+            result = LoadTestResult(
+                load_test_id=plan["load_test_id"],
+                url=request.url,
+                method=request.method.upper(),
+                requests=plan["requests"],
+                concurrency=plan["concurrency"],
+                rps=plan["rps"],
+                started_at=time.time() - (time.perf_counter() - stats.started),
+                stopped_reason=stop_reason,
+                limits_applied=plan["limits_applied"],
+                analysis_id=request.analysis_id,
+                **stats.summary()
+            )
+            if request.analysis_id and self.analysis_store is not None:
+                await self.analysis_store.add_load_test(request.analysis_id, result)
+            yield {"event": "done", "result": result.model_dump()}
+        finally:
+            self.release(plan)
+            if dispatcher is not None and not dispatcher.done():
+                dispatcher.cancel()
+            for task in list(in_flight):
+                task.cancel()
@@ -0,0 +1,354 @@
+import contextvars
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter as TallyCounter, deque
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Latency buckets in seconds, from a cache hit to a slow model call
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+def _label_key(label_names: Sequence[str], labels: Dict[str, Any]) -> Tuple[str, ...]:
+    if set(labels) != set(label_names):
+        raise ValueError(f"Expected labels {list(label_names)}, got {list(labels)}")
+    return tuple(str(labels[name]) for name in label_names)
+
+
+def _format_labels(label_names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(label_names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Counter:
+    """Monotonically increasing value per label set"""
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = _label_key(self.label_names, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.label_names, key)} {value:g}")
+        return lines
+
+
+class Histogram:
+    """Cumulative bucket counts, sum and count per label set"""
+
+    def __init__(self,
+                 name: str,
+                 documentation: str,
+                 label_names: Sequence[str] = (),
+                 buckets: Iterable[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = _label_key(self.label_names, labels)
+        with self._lock:
+            # One count per bucket, then the running sum and total count
+            series = self._series.setdefault(key, [0] * (len(self.buckets) + 2))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                for bound, count in zip(self.buckets, series):
+                    labels = _format_labels(self.label_names, key, f'le="{bound:g}"')
+                    lines.append(f"{self.name}_bucket{labels} {count:g}")
+                labels = _format_labels(self.label_names, key, 'le="+Inf"')
+                lines.append(f"{self.name}_bucket{labels} {series[-1]:g}")
+                plain = _format_labels(self.label_names, key)
+                lines.append(f"{self.name}_sum{plain} {series[-2]:g}")
+                lines.append(f"{self.name}_count{plain} {series[-1]:g}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Minimal Prometheus text-format registry, so the app needs no client library
+    """
+
+    def __init__(self):
+        self._metrics: List[Any] = []
+
+    def counter(self, name: str, documentation: str, label_names: Sequence[str] = ()) -> Counter:
+        metric = Counter(name, documentation, label_names)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, documentation: str, label_names: Sequence[str] = (),
+                  buckets: Iterable[float] = DEFAULT_BUCKETS) -> Histogram:
+        metric = Histogram(name, documentation, label_names, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+REQUEST_SECONDS = REGISTRY.histogram(
+    "integreat_http_request_duration_seconds", "Time to serve an HTTP request, including streamed bodies",
+    ["method", "route", "status"]
+)
+STAGE_SECONDS = REGISTRY.histogram(
+    "integreat_stage_duration_seconds", "Time spent in one pipeline stage", ["stage"]
+)
+GEMINI_CALL_SECONDS = REGISTRY.histogram(
+    "integreat_gemini_call_duration_seconds", "Latency of Gemini calls that missed the cache", ["mode"]
+)
+GEMINI_CALLS = REGISTRY.counter(
+    "integreat_gemini_calls_total", "Gemini calls by outcome (ok, error or cached)", ["outcome"]
+)
+GEMINI_RESILIENCE = REGISTRY.counter(
+    "integreat_gemini_resilience_events_total",
+    "Gemini retries, hedged requests (and hedges that won), timeouts, fallbacks and circuit-open rejections",
+    ["event"]
+)
+GEMINI_TOKENS = REGISTRY.counter(
+    "integreat_gemini_tokens_total", "Prompt and response tokens sent to and received from Gemini", ["kind"]
+)
+BYTES_FETCHED = REGISTRY.counter(
+    "integreat_bytes_fetched_total", "Bytes downloaded from upstream servers", ["source"]
+)
+PROMPT_TOKENS = REGISTRY.counter(
+    "integreat_prompt_tokens_total",
+    "Estimated prompt tokens sent, and saved against uncompacted prompts, per stage", ["stage", "kind"]
+)
+PARSE_POOL_JOBS = REGISTRY.counter(
+    "integreat_parse_pool_jobs_total", "Documents sent to the parser processes by outcome (ok, error or rejected)",
+    ["outcome"]
+)
+LOAD_TEST_REQUESTS = REGISTRY.counter(
+    "integreat_load_test_requests_total", "Requests sent by playground load tests by outcome (ok or error)",
+    ["outcome"]
+)
+
+
+_current_trace: contextvars.ContextVar[Optional["RequestTrace"]] = contextvars.ContextVar("request_trace", default=None)
+_TOKEN_RE = re.compile(r"[^A-Za-z0-9!#$%&'*+.^_`|~-]")
+
+
+class RequestTrace:
+    """
+    Stage timings collected for one request; tasks started while handling the request
+    inherit it through the context
+    """
+
+    def __init__(self):
+        self.spans: List[Tuple[str, float]] = []
+
+    def add(self, name: str, seconds: float):
+        self.spans.append((name, seconds))
+
+    def server_timing(self) -> str:
+        """Render the spans as a Server-Timing header value"""
+        return ", ".join(f"{_TOKEN_RE.sub('-', name)};dur={seconds * 1000:.1f}" for name, seconds in self.spans)
+
+
+def observe_stage(stage: str, seconds: float):
+    """Record a stage duration in the histogram and in the current request trace, if any"""
+    # wrapper_code:<language> stages share one series
+    STAGE_SECONDS.observe(seconds, stage=stage.split(":", 1)[0])
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add(stage, seconds)
+
+
+@contextmanager
+def timed(stage: str):
+    """Time the enclosed block as a pipeline stage"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(stage, time.perf_counter() - start)
+
+
+class SlowRequestProfiler:
+    """
+    Sampling profiler for slow requests.
+
+    A background thread samples the event loop thread's stack at a fixed interval into
+    a ring buffer. When a request takes longer than the threshold, the samples taken
+    while it ran are aggregated into folded stacks (flamegraph.pl / speedscope input),
+    logged, and optionally written to a directory by the sampler thread, so the event
+    loop never waits on the disk. Samples of an idle loop are dropped, so what remains
+    is code that kept the loop busy; with concurrent requests the samples of all of
+    them overlap.
+    """
+
+    def __init__(self, threshold: float, interval: float = 0.01, output_dir: Optional[str] = None,
+                 window_seconds: float = 120.0):
+        self.threshold = threshold
+        self.interval = interval
+        self.output_dir = output_dir
+        self._samples: deque = deque(maxlen=int(window_seconds / interval))
+        # Folded stacks waiting to be written, as (label, folded)
+        self._pending: deque = deque()
+        self._thread_id: Optional[int] = None
+        self._stop = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+
+    @classmethod
+    def from_env(cls) -> Optional["SlowRequestProfiler"]:
+        threshold = float(os.getenv("PROFILE_SLOW_REQUEST_SECONDS", "0"))
+        if threshold <= 0:
+            return None
+        return cls(
+            threshold,
+            interval=float(os.getenv("PROFILE_SAMPLE_INTERVAL_SECONDS", "0.01")),
+            output_dir=os.getenv("PROFILE_OUTPUT_DIR") or None
+        )
+
+    def ensure_started(self):
+        """Start sampling the calling thread, which must be the event loop thread"""
+        if self._sampler is not None:
+            return
+        self._thread_id = threading.get_ident()
+        self._sampler = threading.Thread(target=self._run, name="slow-request-profiler", daemon=True)
+        self._sampler.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._write_pending()
+            frame = sys._current_frames().get(self._thread_id)
+            if frame is None:
+                continue
+            # An idle loop sits in the selector; those samples say nothing about the request
+            if frame.f_code.co_filename.endswith("selectors.py"):
+                continue
+            self._samples.append((time.perf_counter(), _fold(frame)))
+        self._write_pending()
+
+    def _write_pending(self):
+        while self._pending:
+            label, folded = self._pending.popleft()
+            name = re.sub(r"[^\w.-]+", "_", label).strip("_")
+            path = os.path.join(self.output_dir, f"{int(time.time() * 1000)}_{name}.folded")
+            try:
+                os.makedirs(self.output_dir, exist_ok=True)
+                with open(path, "w", encoding="utf-8") as output:
+                    output.write(folded + "\n")
+            except OSError as e:
+                logger.error(f"Could not write the profile of {label}: {str(e)}")
+
+    def report(self, label: str, start: float, end: float) -> Optional[str]:
+        """Log the folded stacks sampled between start and end if the request was slow"""
+        if end - start < self.threshold:
+            return None
+        stacks = TallyCounter(stack for at, stack in list(self._samples) if start <= at <= end)
+        if not stacks:
+            logger.warning(f"Slow request {label}: {end - start:.2f}s, event loop was idle")
+            return None
+        folded = "\n".join(f"{stack} {count}" for stack, count in stacks.most_common())
+        top = "\n".join(f"  {count * self.interval * 1000:.0f} ms  {stack.rsplit(';', 1)[-1]}"
+                        for stack, count in stacks.most_common(10))
+        logger.warning(f"Slow request {label}: {end - start:.2f}s, busiest stacks on the event loop:\n{top}")
+        if self.output_dir:
+            # Written on the sampler thread; this runs on the event loop
+            self._pending.append((label, folded))
+        return folded
+
+
+def _fold(frame, max_depth: int = 60) -> str:
+    names = []
+    while frame is not None and len(names) < max_depth:
+        code = frame.f_code
+        names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware that records request latency per route, and returns a Server-Timing
+    header with the stage timings when the request carries the trace header.
+
+    Streamed responses are timed until their last chunk; their Server-Timing header can
+    only include stages finished before the response started.
+    """
+
+    def __init__(self, app, trace_header: str = "x-trace", profiler: Optional[SlowRequestProfiler] = None):
+        self.app = app
+        self.trace_header = trace_header.lower().encode("latin-1")
+        self.profiler = profiler
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        trace = None
+        header = dict(scope.get("headers") or []).get(self.trace_header)
+        if header and header.lower() not in (b"0", b"false", b"no"):
+            trace = RequestTrace()
+        token = _current_trace.set(trace)
+        if self.profiler is not None:
+            self.profiler.ensure_started()
+
+        start = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if trace is not None:
+                    trace.add("total", time.perf_counter() - start)
+                    headers = list(message.get("headers", []))
+                    headers.append((b"server-timing", trace.server_timing().encode("latin-1")))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            end = time.perf_counter()
+            _current_trace.reset(token)
+            # Label by route template, not raw path, to keep the number of series bounded
+            route = scope.get("route")
+            route_path = "unmatched" if route is None else (getattr(route, "path", "") or "/")
+            REQUEST_SECONDS.observe(end - start, method=scope["method"], route=route_path, status=str(status))
+            if self.profiler is not None:
+                self.profiler.report(f"{scope['method']} {scope['path']}", start, end)
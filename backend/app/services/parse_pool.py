@@ -0,0 +1,105 @@
+import asyncio
+import logging
+import math
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Optional
+
+from app.services.metrics import PARSE_POOL_JOBS
+
+logger = logging.getLogger(__name__)
+
+
+class PoolBusy(Exception):
+    """Raised when the parser processes already have their maximum number of documents waiting"""
+
+    def __init__(self, pending: int, retry_after: int):
+        super().__init__(f"Document parser is busy ({pending} documents in progress)")
+        self.retry_after = retry_after
+
+
+class ParsePool:
+    """
+    Runs CPU-bound document parsing in worker processes, so a large page does not hold
+    up the event loop (and every other request on this server process) while it parses.
+
+    At most workers + max_queued documents are in the pool at once. Further callers
+    wait up to queue_timeout seconds for a slot and then get PoolBusy, so the backlog
+    (each waiting document holds its downloaded bytes in memory) stays bounded. The
+    processes are started on first use.
+    """
+
+    def __init__(self, workers: int, max_queued: int = 8, queue_timeout: float = 10.0):
+        self.workers = workers
+        self.max_queued = max_queued
+        self.queue_timeout = queue_timeout
+        self.pending = 0
+        self._slots = asyncio.Semaphore(workers + max_queued)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        # Running average of parse time, for the Retry-After estimate
+        self._avg_seconds = 0.5
+
+    @classmethod
+    def from_env(cls) -> Optional["ParsePool"]:
+        """
+        Build the pool from EXTRACTION_WORKERS, EXTRACTION_MAX_QUEUED and
+        EXTRACTION_QUEUE_TIMEOUT_SECONDS; None (parse in the request's event loop) when
+        EXTRACTION_WORKERS is 0, the default
+        """
+        workers = int(os.getenv("EXTRACTION_WORKERS", "0"))
+        if workers <= 0:
+            return None
+        return cls(
+            workers,
+            max_queued=int(os.getenv("EXTRACTION_MAX_QUEUED", str(workers * 4))),
+            queue_timeout=float(os.getenv("EXTRACTION_QUEUE_TIMEOUT_SECONDS", "10"))
+        )
+
+    async def run(self, fn: Callable[..., Any], *args) -> Any:
+        """Run fn(*args) in a worker process; fn and its arguments must be picklable"""
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            PARSE_POOL_JOBS.inc(outcome="rejected")
+            raise PoolBusy(self.pending, max(1, math.ceil(self._avg_seconds * self.pending / self.workers)))
+
+        self.pending += 1
+        start = time.perf_counter()
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(self._get_executor(), fn, *args)
+        except BrokenProcessPool:
+            # A worker died (e.g. killed for using too much memory); the next call starts a new pool
+            logger.error("Parser process pool broke; restarting it")
+            self._discard_executor()
+            PARSE_POOL_JOBS.inc(outcome="error")
+            raise
+        except Exception:
+            PARSE_POOL_JOBS.inc(outcome="error")
+            raise
+        finally:
+            self.pending -= 1
+            self._slots.release()
+        self._avg_seconds = 0.8 * self._avg_seconds + 0.2 * (time.perf_counter() - start)
+        PARSE_POOL_JOBS.inc(outcome="ok")
+        return result
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn rather than fork: the server process has threads (asyncio.to_thread,
+            # SQLite) whose locks a forked child could inherit in a held state
+            self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._executor
+
+    def _discard_executor(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def close(self):
+        """Stop the worker processes, waiting for documents already being parsed"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
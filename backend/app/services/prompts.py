@@ -0,0 +1,274 @@
+import contextvars
+import json
+import os
+import re
+import textwrap
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from app.services.metrics import PROMPT_TOKENS
+from app.services.ranking import estimate_tokens
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+class StageBudget:
+    """Input and output token limits for one kind of model call"""
+
+    def __init__(self, input_tokens: int, output_tokens: int):
+        self.input_tokens = input_tokens
+        self.output_tokens = output_tokens
+
+
+# Sized to each task: the suggestion is a short paragraph, while the wrapper is a whole
+# class. Override with PROMPT_<STAGE>_INPUT_TOKENS / PROMPT_<STAGE>_OUTPUT_TOKENS
+DEFAULT_BUDGETS = {
+    "analysis": StageBudget(4500, 6144),
+    "repair": StageBudget(1500, 2048),
+    "suggestion": StageBudget(600, 512),
+    "wrapper": StageBudget(3000, 8192),
+    "docstrings": StageBudget(1500, 2048),
+}
+
+
+def stage_budget(stage: str) -> StageBudget:
+    default = DEFAULT_BUDGETS[stage]
+    prefix = f"PROMPT_{stage.upper()}"
+    return StageBudget(
+        int(os.getenv(f"{prefix}_INPUT_TOKENS", str(default.input_tokens))),
+        int(os.getenv(f"{prefix}_OUTPUT_TOKENS", str(default.output_tokens)))
+    )
+
+
+def squash(text: str, limit: Optional[int] = None) -> str:
+    """Collapse runs of whitespace and cut to at most limit characters at a word boundary"""
+    text = _WHITESPACE_RE.sub(" ", text).strip()
+    if limit is None or len(text) <= limit:
+        return text
+    cut = text.rfind(" ", 0, limit)
+    return text[:cut if cut > limit // 2 else limit] + "…"
+
+
+def prune(value: Any, max_string: int = 200, max_items: int = 10, max_depth: int = 4) -> Any:
+    """
+    Drop empty values and shorten long strings, lists and deeply nested objects, so
+    example payloads keep their shape without their bulk
+    """
+    if isinstance(value, str):
+        return squash(value, max_string)
+    if max_depth <= 0 and isinstance(value, (dict, list)):
+        return "…"
+    if isinstance(value, dict):
+        pruned = {}
+        for key, item in list(value.items())[:max_items]:
+            item = prune(item, max_string, max_items, max_depth - 1)
+            if item not in (None, "", [], {}):
+                pruned[key] = item
+        return pruned
+    if isinstance(value, list):
+        return [prune(item, max_string, max_items, max_depth - 1) for item in value[:max_items]]
+    return value
+
+
+def compact_json(value: Any, **limits) -> str:
+    """Single-line JSON of the pruned value"""
+    return json.dumps(prune(value, **limits), separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+def contained_in(context: str, text: str, probe_chars: int = 60) -> bool:
+    """Whether the middle of context appears in text (both whitespace-squashed)"""
+    if len(context) <= probe_chars:
+        return context in text
+    middle = len(context) // 2
+    return context[middle - probe_chars // 2:middle + probe_chars // 2] in text
+
+
+def endpoint_hints(potential_endpoints: List[Dict[str, Any]],
+                   documentation: str = "",
+                   context_chars: int = 160) -> List[str]:
+    """
+    One line per distinct endpoint hit, "METHOD /path: context", with the context
+    shortened and left out when the documentation excerpt already contains it
+    """
+    documentation = squash(documentation)
+    seen = set()
+    lines = []
+    for hit in potential_endpoints:
+        context = squash(hit.get("raw_context", ""))
+        if "path" in hit:
+            key, label = (hit["method"], hit["path"]), f"{hit['method']} {hit['path']}"
+        else:
+            key, label = ("table", context), "table row"
+        if key in seen:
+            continue
+        seen.add(key)
+        if not context or contained_in(context, documentation):
+            lines.append(label)
+        else:
+            lines.append(f"{label}: {squash(context, context_chars)}")
+    return lines
+
+
+def auth_hints(potential_auth: List[Dict[str, Any]], documentation: str = "", context_chars: int = 200) -> List[str]:
+    """
+    One line per auth term with its first context not already in the documentation excerpt
+    """
+    documentation = squash(documentation)
+    contexts: Dict[str, Optional[str]] = {}
+    for hit in potential_auth:
+        term = hit["term"]
+        context = squash(hit.get("context", ""))
+        if contexts.get(term) or not context:
+            contexts.setdefault(term, None)
+            continue
+        contexts[term] = None if contained_in(context, documentation) else squash(context, context_chars)
+    return [f"{term}: {context}" if context else term for term, context in contexts.items()]
+
+
+class Prompt:
+    """A built prompt with its token count and the output limit for its stage"""
+
+    def __init__(self, stage: str, text: str, baseline_tokens: int, max_output_tokens: int, dropped_items: int):
+        self.stage = stage
+        self.text = text
+        self.tokens = estimate_tokens(text)
+        self.baseline_tokens = baseline_tokens
+        self.max_output_tokens = max_output_tokens
+        self.dropped_items = dropped_items
+
+    def generation_config(self, base: Dict[str, Any]) -> Dict[str, Any]:
+        """The base generation config with the stage's output limit"""
+        limit = min(base.get("max_output_tokens", self.max_output_tokens), self.max_output_tokens)
+        return {**base, "max_output_tokens": limit}
+
+
+class PromptBuilder:
+    """
+    Assembles a prompt from instructions and item lists within the stage's input budget.
+
+    Instructions are always kept (dedented, since the indentation of a triple-quoted
+    template costs tokens on every line). Item lists are cut to the budget left, whole
+    lines at a time. Each part can name the text the previous repr-based prompt sent in
+    its place, so the saving is reported per stage.
+    """
+
+    def __init__(self, stage: str, budget: Optional[StageBudget] = None):
+        self.stage = stage
+        self.budget = budget or stage_budget(stage)
+        self._parts: List[str] = []
+        self._used = 0
+        self._baseline = 0
+        self._dropped = 0
+
+    def remaining(self, reserve: int = 0) -> int:
+        """Input tokens still available, keeping reserve tokens back for later parts"""
+        return max(0, self.budget.input_tokens - self._used - reserve)
+
+    def text(self, text: str, baseline: Optional[str] = None) -> "PromptBuilder":
+        self._add(textwrap.dedent(text).strip(), text if baseline is None else baseline)
+        return self
+
+    def block(self, title: str, body: str, baseline: Optional[str] = None) -> "PromptBuilder":
+        """Add text the caller has already sized to the budget, unchanged"""
+        part = f"{title}:\n{body}"
+        self._add(part, part if baseline is None else baseline)
+        return self
+
+    def lines(self,
+              title: str,
+              lines: Iterable[str],
+              max_tokens: Optional[int] = None,
+              baseline: Optional[str] = None,
+              empty: str = "none") -> "PromptBuilder":
+        """Add a titled list, keeping as many lines as fit in max_tokens and the budget"""
+        lines = list(lines)
+        cap = self.remaining() if max_tokens is None else min(max_tokens, self.remaining())
+        used = estimate_tokens(title)
+        kept = []
+        for line in lines:
+            cost = estimate_tokens(line)
+            if used + cost > cap:
+                break
+            kept.append(line)
+            used += cost
+        self._dropped += len(lines) - len(kept)
+        body = "\n".join(kept) if kept else empty
+        part = f"{title}:\n{body}"
+        self._add(part, part if baseline is None else baseline)
+        return self
+
+    def _add(self, part: str, baseline: str):
+        self._parts.append(part)
+        self._used += estimate_tokens(part)
+        self._baseline += estimate_tokens(baseline)
+
+    def build(self) -> Prompt:
+        prompt = Prompt(self.stage, "\n\n".join(self._parts), self._baseline, self.budget.output_tokens, self._dropped)
+        record_prompt(prompt)
+        return prompt
+
+
+class PromptReport:
+    """Prompt tokens sent, and saved against the previous prompts, per stage of one request"""
+
+    def __init__(self):
+        self.stages: Dict[str, Dict[str, int]] = {}
+
+    def add(self, prompt: Prompt):
+        stats = self.stages.setdefault(prompt.stage, {
+            "calls": 0, "prompt_tokens": 0, "baseline_tokens": 0, "saved_tokens": 0,
+            "max_output_tokens": 0, "dropped_items": 0
+        })
+        stats["calls"] += 1
+        stats["prompt_tokens"] += prompt.tokens
+        stats["baseline_tokens"] += prompt.baseline_tokens
+        stats["saved_tokens"] += prompt.baseline_tokens - prompt.tokens
+        stats["max_output_tokens"] = max(stats["max_output_tokens"], prompt.max_output_tokens)
+        stats["dropped_items"] += prompt.dropped_items
+
+    def to_dict(self) -> Dict[str, Dict[str, int]]:
+        report = {stage: dict(stats) for stage, stats in self.stages.items()}
+        if report:
+            report["total"] = {
+                key: sum(stats[key] for stats in self.stages.values())
+                for key in ("calls", "prompt_tokens", "baseline_tokens", "saved_tokens", "dropped_items")
+            }
+        return report
+
+    def summary(self) -> str:
+        total = self.to_dict().get("total")
+        if not total:
+            return "no model prompts"
+        share = total["saved_tokens"] / total["baseline_tokens"] * 100 if total["baseline_tokens"] else 0.0
+        return (f"{total['prompt_tokens']} prompt tokens in {total['calls']} calls, "
+                f"saved {total['saved_tokens']} ({share:.0f}%)")
+
+
+_current_report: contextvars.ContextVar[Optional[PromptReport]] = contextvars.ContextVar("prompt_report", default=None)
+
+
+@contextmanager
+def collect_prompt_stats(report: Optional[PromptReport] = None) -> Iterator[PromptReport]:
+    """
+    Collect the prompts built in the enclosed block, including tasks it starts, into
+    report (a new one by default).
+
+    In an async generator the block must not contain a yield: the report would be seen by
+    the consumer, and closing the generator from another context could not reset it.
+    Enter the block around each step instead, passing the same report.
+    """
+    report = report if report is not None else PromptReport()
+    token = _current_report.set(report)
+    try:
+        yield report
+    finally:
+        _current_report.reset(token)
+
+
+def record_prompt(prompt: Prompt):
+    PROMPT_TOKENS.inc(prompt.tokens, stage=prompt.stage, kind="sent")
+    if prompt.baseline_tokens > prompt.tokens:
+        PROMPT_TOKENS.inc(prompt.baseline_tokens - prompt.tokens, stage=prompt.stage, kind="saved")
+    report = _current_report.get()
+    if report is not None:
+        report.add(prompt)
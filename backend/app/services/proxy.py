@@ -0,0 +1,303 @@
+import asyncio
+import base64
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional
+from urllib.parse import urlparse
+
+import httpx
+
+from app.services.metrics import BYTES_FETCHED
+
+logger = logging.getLogger(__name__)
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:  # httpx[http2] not installed; fall back to HTTP/1.1
+    HTTP2_AVAILABLE = False
+
+_TEXT_CONTENT_TYPES = ("text/", "json", "xml", "javascript", "x-www-form-urlencoded", "yaml", "html")
+_BODY_METHODS = ("POST", "PUT", "PATCH")
+SUPPORTED_METHODS = ("GET", "POST", "PUT", "DELETE", "PATCH")
+
+
+class ResponseTooLarge(Exception):
+    """Raised when an upstream body exceeds the size cap and truncation is off"""
+
+
+class RequestTimer:
+    """
+    Collects connection-phase timings from httpcore's trace extension.
+
+    DNS resolution happens inside httpcore's TCP connect, so it is included in connect_ms.
+    Reused keep-alive connections report no connect or TLS time.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.marks: Dict[str, float] = {}
+
+    async def trace(self, event_name: str, info: Dict[str, Any]):
+        self.marks[event_name] = time.perf_counter()
+
+    def _span(self, start: str, end: str) -> Optional[float]:
+        if start in self.marks and end in self.marks:
+            return round((self.marks[end] - self.marks[start]) * 1000, 2)
+        return None
+
+    def breakdown(self, finished: Optional[float] = None) -> Dict[str, Any]:
+        headers_done = next(
+            (self.marks[name] for name in (
+                "http11.receive_response_headers.complete",
+                "http2.receive_response_headers.complete"
+            ) if name in self.marks),
+            None
+        )
+        return {
+            "connect_ms": self._span("connection.connect_tcp.started", "connection.connect_tcp.complete"),
+            "tls_ms": self._span("connection.start_tls.started", "connection.start_tls.complete"),
+            "ttfb_ms": round((headers_done - self.started) * 1000, 2) if headers_done else None,
+            "total_ms": round(((finished or time.perf_counter()) - self.started) * 1000, 2),
+            "connection_reused": "connection.connect_tcp.started" not in self.marks
+        }
+
+
+class ProxyClient:
+    """
+    App-lifetime HTTP client pool for the test playground proxy.
+
+    Connections are kept alive and reused (HTTP/2 when h2 is installed), the number of
+    concurrent requests per upstream host is capped, and response bodies are read as a
+    stream with a size cap instead of being buffered whole.
+    """
+
+    def __init__(self):
+        self.max_response_bytes = int(os.getenv("PROXY_MAX_RESPONSE_BYTES", str(5 * 1024 * 1024)))
+        self.per_host_limit = int(os.getenv("PROXY_MAX_CONNECTIONS_PER_HOST", "10"))
+        # Created on first use, like the extractor's client
+        self._client: Optional[httpx.AsyncClient] = None
+        # Host -> [semaphore, requests holding or waiting for it]; a host's entry is
+        # dropped when its last request finishes, so only hosts in use are kept
+        self._host_slots: Dict[str, list] = {}
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                http2=HTTP2_AVAILABLE,
+                timeout=float(os.getenv("PROXY_TIMEOUT_SECONDS", "30")),
+                limits=httpx.Limits(
+                    max_connections=int(os.getenv("PROXY_MAX_CONNECTIONS", "100")),
+                    max_keepalive_connections=int(os.getenv("PROXY_MAX_KEEPALIVE", "20")),
+                    keepalive_expiry=float(os.getenv("PROXY_KEEPALIVE_SECONDS", "30"))
+                )
+            )
+        return self._client
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+
+    async def _acquire_slot(self, url: str) -> str:
+        """Wait for one of the per-host connection slots and return the host"""
+        host = urlparse(url).netloc
+        entry = self._host_slots.setdefault(host, [asyncio.Semaphore(self.per_host_limit), 0])
+        entry[1] += 1
+        try:
+            await entry[0].acquire()
+        except BaseException:
+            self._leave_slot(host)
+            raise
+        return host
+
+    def _release_slot(self, host: str):
+        self._host_slots[host][0].release()
+        self._leave_slot(host)
+
+    def _leave_slot(self, host: str):
+        entry = self._host_slots[host]
+        entry[1] -= 1
+        if entry[1] == 0:
+            del self._host_slots[host]
+
+    @asynccontextmanager
+    async def _slot(self, url: str) -> AsyncIterator[None]:
+        host = await self._acquire_slot(url)
+        try:
+            yield
+        finally:
+            self._release_slot(host)
+
+    def _build_request(self, method: str, url: str, headers: Dict[str, str],
+                       params: Dict[str, str], body: Dict[str, Any], timer: RequestTimer) -> httpx.Request:
+        method = method.upper()
+        if method not in SUPPORTED_METHODS:
+            raise ValueError(f"Unsupported method: {method.lower()}")
+        return self.client.build_request(
+            method,
+            url,
+            headers=headers,
+            params=params,
+            json=body if method in _BODY_METHODS else None,
+            extensions={"trace": timer.trace}
+        )
+
+    def _cap(self, max_bytes: Optional[int]) -> int:
+        # Callers may lower the cap but never raise it above the server limit
+        return min(max_bytes, self.max_response_bytes) if max_bytes else self.max_response_bytes
+
+    async def fetch(self,
+                    method: str,
+                    url: str,
+                    headers: Dict[str, str],
+                    params: Dict[str, str],
+                    body: Dict[str, Any],
+                    max_bytes: Optional[int] = None,
+                    truncate: bool = True) -> Dict[str, Any]:
+        """
+        Send the request and read the (decompressed) body up to the size cap
+        """
+        cap = self._cap(max_bytes)
+        timer = RequestTimer()
+        request = self._build_request(method, url, headers, params, body, timer)
+
+        async with self._slot(url):
+            response = await self.client.send(request, stream=True)
+            try:
+                chunks = []
+                size = 0
+                truncated = False
+                async for chunk in response.aiter_bytes():
+                    if size + len(chunk) > cap:
+                        if not truncate:
+                            raise ResponseTooLarge(f"Response body exceeds {cap} bytes")
+                        chunks.append(chunk[:cap - size])
+                        size = cap
+                        truncated = True
+                        break
+                    chunks.append(chunk)
+                    size += len(chunk)
+            finally:
+                await response.aclose()
+
+        timing = timer.breakdown()
+        BYTES_FETCHED.inc(size, source="proxy")
+        content = b"".join(chunks)
+        response_body, encoding = _encode_body(content, response.headers, truncated)
+
+        return {
+            "status_code": response.status_code,
+            "headers": dict(response.headers),
+            "response": response_body,
+            "encoding": encoding,
+            "size_bytes": size,
+            "truncated": truncated,
+            "http_version": response.http_version,
+            "time_ms": timing["total_ms"],
+            "timing": timing
+        }
+
+    async def measure(self,
+                      method: str,
+                      url: str,
+                      headers: Dict[str, str],
+                      params: Dict[str, str],
+                      body: Dict[str, Any],
+                      max_bytes: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Send the request and read the raw body up to the size cap without keeping it, for
+        load tests. The timer starts once the per-host slot is held, so time spent waiting
+        behind other requests to the host is not counted as latency
+        """
+        cap = self._cap(max_bytes)
+        async with self._slot(url):
+            timer = RequestTimer()
+            request = self._build_request(method, url, headers, params, body, timer)
+            response = await self.client.send(request, stream=True)
+            size = 0
+            try:
+                async for chunk in response.aiter_raw():
+                    size += len(chunk)
+                    if size >= cap:
+                        size = cap
+                        break
+            finally:
+                await response.aclose()
+
+        BYTES_FETCHED.inc(size, source="load_test")
+        return {"status_code": response.status_code, "size_bytes": size, "timing": timer.breakdown()}
+
+    async def open_stream(self,
+                          method: str,
+                          url: str,
+                          headers: Dict[str, str],
+                          params: Dict[str, str],
+                          body: Dict[str, Any],
+                          max_bytes: Optional[int] = None):
+        """
+        Send the request and return the upstream response, its timer, an iterator over
+        the raw (still content-encoded) body that stops at the size cap, and a close
+        coroutine function that closes the response and frees the host slot.
+
+        The iterator calls close when done, but an iterator that is never started (the
+        client went away before the body was sent) does not, so the caller must call close
+        as well, e.g. as the StreamingResponse's background task; it is safe to call twice.
+        """
+        cap = self._cap(max_bytes)
+        timer = RequestTimer()
+        request = self._build_request(method, url, headers, params, body, timer)
+
+        host = await self._acquire_slot(url)
+        try:
+            response = await self.client.send(request, stream=True)
+        except BaseException:
+            self._release_slot(host)
+            raise
+
+        size = 0
+        closed = False
+
+        async def close():
+            nonlocal closed
+            if closed:
+                return
+            closed = True
+            self._release_slot(host)
+            BYTES_FETCHED.inc(size, source="proxy")
+            logger.debug(f"Proxied {url}: {timer.breakdown()}")
+            await response.aclose()
+
+        async def body_iterator() -> AsyncIterator[bytes]:
+            nonlocal size
+            try:
+                async for chunk in response.aiter_raw():
+                    if size + len(chunk) > cap:
+                        yield chunk[:cap - size]
+                        size = cap
+                        break
+                    size += len(chunk)
+                    yield chunk
+            finally:
+                await close()
+
+        return response, timer, body_iterator(), close
+
+
+def _encode_body(content: bytes, headers: httpx.Headers, truncated: bool):
+    """
+    Return the body as text when it is textual and decodes cleanly, otherwise base64
+    """
+    content_type = headers.get("content-type", "").lower()
+    if not content_type or any(t in content_type for t in _TEXT_CONTENT_TYPES):
+        charset = "utf-8"
+        if "charset=" in content_type:
+            charset = content_type.split("charset=", 1)[1].split(";")[0].strip() or "utf-8"
+        try:
+            # A truncated body may end mid-character
+            return content.decode(charset, errors="ignore" if truncated else "strict"), "text"
+        except (UnicodeDecodeError, LookupError):
+            pass
+    return base64.b64encode(content).decode("ascii"), "base64"
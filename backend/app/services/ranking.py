@@ -0,0 +1,130 @@
+import math
+import re
+from collections import Counter
+from typing import Any, Dict, List
+
+_TOKEN_RE = re.compile(r"[a-z0-9_]+")
+_ENDPOINT_RE = re.compile(r"\b(GET|POST|PUT|DELETE|PATCH)\s+/[\w/{}:.-]*")
+_AUTH_RE = re.compile(r"\b(authentication|authorization|api[ _-]?key|bearer|oauth|jwt|access token|basic auth)\b", re.IGNORECASE)
+
+# Words every query gets, so endpoint and auth reference material ranks above prose
+SIGNAL_TERMS = [
+    "endpoint", "request", "response", "parameter", "parameters", "get", "post", "put", "delete",
+    "patch", "authentication", "authorization", "api", "key", "token", "bearer", "oauth", "header"
+]
+
+_STOPWORDS = {
+    "the", "a", "an", "and", "or", "of", "to", "in", "for", "on", "with", "is", "are", "be", "it",
+    "this", "that", "as", "by", "from", "at", "i", "we", "want", "need", "my", "our", "use"
+}
+
+# Rough characters-per-token ratio for English prose and code
+CHARS_PER_TOKEN = 4
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in _TOKEN_RE.findall(text.lower()) if t not in _STOPWORDS]
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+class BM25:
+    """
+    Okapi BM25 over a small in-memory corpus
+    """
+
+    def __init__(self, documents: List[List[str]], k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.term_freqs = [Counter(doc) for doc in documents]
+        self.doc_lengths = [len(doc) for doc in documents]
+        self.avg_length = (sum(self.doc_lengths) / len(documents)) if documents else 0.0
+
+        document_freq = Counter()
+        for freqs in self.term_freqs:
+            document_freq.update(freqs.keys())
+        n = len(documents)
+        self.idf = {
+            term: math.log(1 + (n - df + 0.5) / (df + 0.5))
+            for term, df in document_freq.items()
+        }
+
+    def scores(self, query: List[str]) -> List[float]:
+        query_terms = Counter(query)
+        results = []
+        for freqs, length in zip(self.term_freqs, self.doc_lengths):
+            norm = self.k1 * (1 - self.b + self.b * length / self.avg_length) if self.avg_length else self.k1
+            score = 0.0
+            for term, weight in query_terms.items():
+                tf = freqs.get(term)
+                if tf:
+                    score += weight * self.idf[term] * tf * (self.k1 + 1) / (tf + norm)
+            results.append(score)
+        return results
+
+
+def rank_sections(sections: List[Dict[str, Any]],
+                  use_case: str,
+                  potential_endpoints: List[Dict[str, Any]] = ()) -> List[float]:
+    """
+    Score each section against the use case and the endpoint/auth signals
+    """
+    query = tokenize(use_case) * 2 + SIGNAL_TERMS
+    for endpoint in list(potential_endpoints)[:50]:
+        if "path" in endpoint:
+            query.extend(tokenize(endpoint["path"]))
+
+    index = BM25([tokenize(f"{s.get('heading', '')} {s['text']}") for s in sections])
+    scores = index.scores(query)
+
+    for i, section in enumerate(sections):
+        # Concrete endpoint lines and auth instructions are what the analysis needs most
+        endpoint_hits = len(_ENDPOINT_RE.findall(section["text"]))
+        auth_hits = len(_AUTH_RE.findall(section["text"]))
+        scores[i] += min(endpoint_hits, 5) * 1.5 + min(auth_hits, 3) * 1.0
+    return scores
+
+
+def pack_sections(sections: List[Dict[str, Any]], scores: List[float], token_budget: int) -> str:
+    """
+    Greedily take the highest-scoring sections that fit the token budget and render
+    them in document order
+    """
+    chosen = []
+    used = 0
+    for i in sorted(range(len(sections)), key=lambda i: -scores[i]):
+        cost = estimate_tokens(sections[i]["text"]) + estimate_tokens(sections[i].get("heading", ""))
+        if used + cost > token_budget:
+            continue
+        chosen.append(i)
+        used += cost
+        if token_budget - used < 20:
+            break
+
+    parts = []
+    last_heading = None
+    for i in sorted(chosen):
+        section = sections[i]
+        heading = section.get("heading", "")
+        if heading and heading != last_heading:
+            parts.append(f"## {heading}")
+            last_heading = heading
+        if section.get("kind") == "code":
+            parts.append(f"```\n{section['text']}\n```")
+        else:
+            parts.append(section["text"])
+    return "\n".join(parts)
+
+
+def select_relevant_text(extracted_data: Dict[str, Any], use_case: str, token_budget: int) -> str:
+    """
+    Documentation text for the analysis prompt: the most relevant sections when the
+    extractor produced them, otherwise the head of raw_text
+    """
+    sections = extracted_data.get("sections")
+    if not sections:
+        return extracted_data["raw_text"][:token_budget * CHARS_PER_TOKEN]
+    scores = rank_sections(sections, use_case, extracted_data.get("potential_endpoints", []))
+    return pack_sections(sections, scores, token_budget)
@@ -0,0 +1,220 @@
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from app.services.cache import connect_sqlite
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """
+    Refills continuously up to capacity; the balance may go negative when actual usage
+    turns out higher than what was reserved, which delays later callers
+    """
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self.available = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.available = min(self.capacity, self.available + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.available >= amount:
+            return 0.0
+        return (amount - self.available) / self.rate
+
+    def take(self, amount: float):
+        self._refill()
+        self.available -= amount
+
+
+class RateLimiter:
+    """
+    Requests-per-minute and tokens-per-minute limiter for model calls.
+
+    Callers reserve their estimated input tokens with acquire() and report the output
+    tokens afterwards with record(). A limit of 0 disables that dimension.
+    """
+
+    def __init__(self, requests_per_minute: float = 0, tokens_per_minute: float = 0):
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute > 0 else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute > 0 else None
+        self._lock = asyncio.Lock()
+
+    @classmethod
+    def from_env(cls) -> "RateLimiter":
+        """
+        Limits from GEMINI_RPM/GEMINI_TPM, unlimited when unset. With RATE_LIMIT_SQLITE_PATH
+        set, the limits are shared with the other server processes using the same file
+        """
+        requests_per_minute = float(os.getenv("GEMINI_RPM", "0"))
+        tokens_per_minute = float(os.getenv("GEMINI_TPM", "0"))
+        sqlite_path = os.getenv("RATE_LIMIT_SQLITE_PATH")
+        if sqlite_path:
+            try:
+                return SharedRateLimiter(SQLiteRateState(sqlite_path), requests_per_minute, tokens_per_minute)
+            except sqlite3.Error as e:
+                logger.error(f"Could not open rate limit database {sqlite_path}: {str(e)}")
+        return cls(requests_per_minute, tokens_per_minute)
+
+    async def acquire(self, tokens: int = 0):
+        """
+        Wait until one request and the given number of tokens fit within the limits
+        """
+        # Callers queue on the lock so they are admitted in arrival order
+        async with self._lock:
+            while True:
+                wait = await self._reserve(tokens)
+                if wait <= 0:
+                    break
+                logger.debug(f"Rate limited, waiting {wait:.2f}s")
+                await asyncio.sleep(wait)
+
+    async def _reserve(self, tokens: int) -> float:
+        """Take one request and the tokens if both fit now and return 0, else the seconds to wait"""
+        wait = 0.0
+        if self.requests is not None:
+            wait = max(wait, self.requests.wait_time(1))
+        if self.tokens is not None:
+            wait = max(wait, self.tokens.wait_time(tokens))
+        if wait > 0:
+            return wait
+        if self.requests is not None:
+            self.requests.take(1)
+        if self.tokens is not None:
+            self.tokens.take(tokens)
+        return 0.0
+
+    async def record(self, tokens: int):
+        """Charge tokens used beyond the reservation (e.g. the response)"""
+        if self.tokens is not None and tokens > 0:
+            self.tokens.take(tokens)
+
+    def snapshot(self) -> dict:
+        return {
+            "requests_available": round(self.requests.available, 1) if self.requests else None,
+            "tokens_available": round(self.tokens.available) if self.tokens else None
+        }
+
+    def close(self):
+        pass
+
+
+class SQLiteRateState:
+    """
+    Token bucket balances in a SQLite file, so that every uvicorn worker on the host
+    draws on the same per-minute limits instead of each getting the full allowance.
+    Refill and take happen in one write transaction, so concurrent workers cannot both
+    spend the same balance
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = connect_sqlite(path)
+        # Transactions are opened explicitly with BEGIN IMMEDIATE
+        self._conn.isolation_level = None
+        with self._lock:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS buckets ("
+                "name TEXT PRIMARY KEY, available REAL NOT NULL, updated REAL NOT NULL)"
+            )
+
+    def reserve(self, amounts: Dict[str, Tuple[float, float]], force: bool = False) -> float:
+        """
+        amounts maps a bucket name to (per-minute capacity, amount). Take every amount if
+        all fit (or force is set) and return 0, otherwise take nothing and return the
+        seconds until they would fit
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                balances = {}
+                wait = 0.0
+                for name, (capacity, amount) in amounts.items():
+                    row = self._conn.execute(
+                        "SELECT available, updated FROM buckets WHERE name = ?", (name,)
+                    ).fetchone()
+                    available, updated = row if row is not None else (capacity, now)
+                    rate = capacity / 60.0
+                    balances[name] = min(capacity, available + max(0.0, now - updated) * rate)
+                    needed = min(amount, capacity)
+                    if not force and balances[name] < needed:
+                        wait = max(wait, (needed - balances[name]) / rate)
+                if wait <= 0:
+                    self._conn.executemany(
+                        "INSERT OR REPLACE INTO buckets (name, available, updated) VALUES (?, ?, ?)",
+                        [(name, balances[name] - amount, now) for name, (_, amount) in amounts.items()]
+                    )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return wait
+
+    def balances(self) -> Dict[str, float]:
+        with self._lock:
+            rows = self._conn.execute("SELECT name, available FROM buckets").fetchall()
+        return dict(rows)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class SharedRateLimiter(RateLimiter):
+    """
+    RateLimiter whose buckets live in a SQLiteRateState shared between processes.
+    Balances are refilled from wall-clock time, since each process has its own monotonic clock
+    """
+
+    def __init__(self, state: SQLiteRateState, requests_per_minute: float = 0, tokens_per_minute: float = 0):
+        super().__init__(requests_per_minute, tokens_per_minute)
+        self.state = state
+
+    def _amounts(self, requests: int, tokens: int) -> Dict[str, Tuple[float, float]]:
+        amounts = {}
+        if self.requests is not None and requests:
+            amounts["requests"] = (self.requests.capacity, requests)
+        if self.tokens is not None and tokens:
+            amounts["tokens"] = (self.tokens.capacity, tokens)
+        return amounts
+
+    async def _reserve(self, tokens: int) -> float:
+        amounts = self._amounts(1, tokens)
+        if not amounts:
+            return 0.0
+        return await asyncio.to_thread(self.state.reserve, amounts)
+
+    async def record(self, tokens: int):
+        amounts = self._amounts(0, tokens)
+        if not amounts:
+            return
+        try:
+            # BEGIN IMMEDIATE can wait for another process's write lock, so not on the event loop
+            await asyncio.to_thread(self.state.reserve, amounts, True)
+        except sqlite3.Error as e:
+            logger.error(f"Could not record {tokens} tokens in the shared rate limit: {str(e)}")
+
+    def close(self):
+        self.state.close()
+
+    def snapshot(self) -> dict:
+        balances = self.state.balances()
+        return {
+            "requests_available": round(balances.get("requests", self.requests.capacity), 1) if self.requests else None,
+            "tokens_available": round(balances.get("tokens", self.tokens.capacity)) if self.tokens else None
+        }
@@ -0,0 +1,179 @@
+import asyncio
+import math
+import random
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Tuple
+
+# HTTP statuses (the google.api_core exceptions carry them as .code) worth another attempt
+RETRYABLE_CODES = frozenset((408, 429, 500, 502, 503, 504))
+
+
+def is_retryable(error: BaseException) -> bool:
+    """
+    Whether a failed model call may succeed when repeated: timeouts, connection errors,
+    rate limiting and server errors. Bad requests, auth errors and blocked prompts are not
+    """
+    if isinstance(error, (asyncio.TimeoutError, ConnectionError)):
+        return True
+    return getattr(error, "code", None) in RETRYABLE_CODES
+
+
+def backoff_delay(attempt: int, base: float, cap: float, rng: random.Random = random) -> float:
+    """
+    "Full jitter" backoff before retry number attempt (1-based): a uniform delay up to the
+    exponential bound, so clients that failed together do not retry together
+    """
+    return rng.uniform(0, min(cap, base * 2 ** (attempt - 1)))
+
+
+class CircuitOpen(Exception):
+    """Raised instead of calling a model whose circuit breaker is open"""
+
+    def __init__(self, name: str, retry_after: float):
+        self.name = name
+        self.retry_after = max(1, math.ceil(retry_after))
+        super().__init__(f"Circuit open for {name}; upstream is failing, retry in {self.retry_after}s")
+
+
+class CircuitBreaker:
+    """
+    Stops calls to an upstream after failure_threshold consecutive failures.
+
+    While open, allow() returns False for reset_seconds. Then a single probe call is let
+    through (half open): its success closes the circuit, its failure opens it again.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_seconds: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+
+    def allow(self) -> bool:
+        if self.state == "closed":
+            return True
+        if self.state == "open":
+            if time.monotonic() - self.opened_at < self.reset_seconds:
+                return False
+            self.state = "half_open"
+            self._probing = False
+        if self._probing:
+            return False
+        self._probing = True
+        return True
+
+    def record_success(self):
+        self.state = "closed"
+        self.failures = 0
+        self._probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            self.state = "open"
+            self.opened_at = time.monotonic()
+            self._probing = False
+
+    def record_cancelled(self):
+        """A call was abandoned without an outcome; let another probe through"""
+        self._probing = False
+
+    def retry_after(self) -> float:
+        return max(0.0, self.reset_seconds - (time.monotonic() - self.opened_at))
+
+
+class RetryBudget:
+    """
+    Caps retries and hedged requests at a fraction of the calls made, so an upstream
+    that is struggling gets ratio extra requests per call rather than max_attempts times
+    the load. Each call deposits ratio tokens and each retry or hedge spends one;
+    min_per_second keeps a few retries available when traffic is light
+    """
+
+    def __init__(self, ratio: float = 0.2, min_per_second: float = 0.5, max_tokens: float = 10.0):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.max_tokens = max_tokens
+        self.balance = max_tokens
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.balance = min(self.max_tokens, self.balance + (now - self.updated) * self.min_per_second)
+        self.updated = now
+
+    def deposit(self):
+        self._refill()
+        self.balance = min(self.max_tokens, self.balance + self.ratio)
+
+    def withdraw(self) -> bool:
+        self._refill()
+        if self.balance < 1:
+            return False
+        self.balance -= 1
+        return True
+
+
+class LatencyTracker:
+    """Recent latencies of successful calls per key (e.g. prompt stage), for percentiles"""
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self.window = window
+        self.min_samples = min_samples
+        self._samples: Dict[str, Deque[float]] = {}
+
+    def observe(self, key: str, seconds: float):
+        self._samples.setdefault(key, deque(maxlen=self.window)).append(seconds)
+
+    def percentile(self, key: str, q: float) -> Optional[float]:
+        """The q-quantile (0..1) of the key's recent latencies; None until min_samples are in"""
+        samples = self._samples.get(key)
+        if samples is None or len(samples) < self.min_samples:
+            return None
+        ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+async def hedged(attempt: Callable[[], Awaitable[Any]],
+                 delay: Optional[float],
+                 may_hedge: Callable[[], bool],
+                 discard: Optional[Callable[[Any], Awaitable[None]]] = None) -> Tuple[Any, int]:
+    """
+    Run attempt(); if it has not finished after delay seconds and may_hedge() agrees,
+    start a second, identical attempt. Return (result, leg) of the first to succeed,
+    where leg is 0 for the original and 1 for the hedge, and cancel the other. A result
+    that arrives but loses is passed to discard (e.g. to close a stream). When every
+    attempt fails, the last error is raised
+    """
+    if delay is None:
+        return await attempt(), 0
+
+    tasks = [asyncio.create_task(attempt())]
+    winner = None
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=delay)
+        if not done and may_hedge():
+            tasks.append(asyncio.create_task(attempt()))
+        pending = set(tasks)
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in sorted(done, key=tasks.index):
+                if task.exception() is None:
+                    winner = task
+                    return task.result(), tasks.index(task)
+                error = task.exception()
+        raise error
+    finally:
+        losers = [task for task in tasks if task is not winner]
+        for task in losers:
+            task.cancel()
+        outcomes = await asyncio.gather(*losers, return_exceptions=True)
+        if discard is not None:
+            for outcome in outcomes:
+                if not isinstance(outcome, BaseException):
+                    await discard(outcome)
@@ -0,0 +1,105 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from app.services.metrics import observe_stage
+
+logger = logging.getLogger(__name__)
+
+# Marker for stages whose failure must fail the whole run
+REQUIRED = object()
+
+
+class StageError(Exception):
+    """Raised when a required stage fails or times out"""
+
+    def __init__(self, stage: str, error: Exception):
+        self.stage = stage
+        self.error = error
+        super().__init__(f"Stage '{stage}' failed: {error}")
+
+
+class Stage:
+    """
+    A named unit of pipeline work.
+
+    ``func`` receives the results of the stages it depends on, keyed by stage name.
+    When ``fallback`` is given the stage is optional: on error or timeout its result
+    becomes the fallback value (or ``fallback(error)`` if it is callable).
+    """
+
+    def __init__(self,
+                 name: str,
+                 func: Callable[[Dict[str, Any]], Awaitable[Any]],
+                 depends_on: Iterable[str] = (),
+                 timeout: Optional[float] = None,
+                 fallback: Any = REQUIRED):
+        self.name = name
+        self.func = func
+        self.depends_on = tuple(depends_on)
+        self.timeout = timeout
+        self.fallback = fallback
+
+    @property
+    def required(self) -> bool:
+        return self.fallback is REQUIRED
+
+
+class StageScheduler:
+    """
+    Run pipeline stages as soon as their dependencies are done, so independent
+    stages overlap instead of running one after another
+    """
+
+    async def run(self, stages: List[Stage]) -> Tuple[Dict[str, Any], Dict[str, float]]:
+        """
+        Run all stages and return their results and wall-clock timings in milliseconds
+        """
+        names = {stage.name for stage in stages}
+        for stage in stages:
+            missing = [dep for dep in stage.depends_on if dep not in names]
+            if missing:
+                raise ValueError(f"Stage '{stage.name}' depends on unknown stages: {missing}")
+
+        results: Dict[str, Any] = {}
+        timings: Dict[str, float] = {}
+        tasks: Dict[str, asyncio.Task] = {}
+
+        async def run_stage(stage: Stage) -> Any:
+            for dep in stage.depends_on:
+                await tasks[dep]
+
+            inputs = {dep: results[dep] for dep in stage.depends_on}
+            start = time.perf_counter()
+            try:
+                result = await asyncio.wait_for(stage.func(inputs), timeout=stage.timeout)
+            except Exception as e:
+                if isinstance(e, asyncio.TimeoutError):
+                    e = TimeoutError(f"timed out after {stage.timeout}s")
+                if stage.required:
+                    raise StageError(stage.name, e) from e
+                logger.error(f"Stage '{stage.name}' failed, using fallback: {str(e)}")
+                result = stage.fallback(e) if callable(stage.fallback) else stage.fallback
+            finally:
+                elapsed = time.perf_counter() - start
+                timings[stage.name] = round(elapsed * 1000, 1)
+                observe_stage(stage.name, elapsed)
+
+            results[stage.name] = result
+            return result
+
+        for stage in stages:
+            tasks[stage.name] = asyncio.ensure_future(run_stage(stage))
+
+        try:
+            await asyncio.gather(*tasks.values())
+        finally:
+            for task in tasks.values():
+                if not task.done():
+                    task.cancel()
+            # Let cancelled stages unwind before returning
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+
+        logger.info("Stage timings (ms): " + ", ".join(f"{name}={ms}" for name, ms in timings.items()))
+        return results, timings
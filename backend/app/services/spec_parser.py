@@ -0,0 +1,371 @@
+import json
+import logging
+import re
+from typing import Any, Dict, List, Optional
+
+try:
+    import yaml
+    _YamlLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+except ImportError:  # PyYAML is optional; JSON specs still work without it
+    yaml = None
+
+logger = logging.getLogger(__name__)
+
+HTTP_METHODS = ("get", "post", "put", "delete", "patch", "head", "options")
+
+# Paths commonly used to publish machine-readable API descriptions
+WELL_KNOWN_SPEC_PATHS = [
+    "/openapi.json",
+    "/openapi.yaml",
+    "/swagger.json",
+    "/swagger.yaml",
+    "/v3/api-docs",
+    "/v2/api-docs",
+    "/api-docs",
+    "/swagger/v1/swagger.json",
+]
+
+
+class SpecParser:
+    """
+    Turn OpenAPI 3, Swagger 2 and Postman v2 collections into Endpoint/AuthMethod dicts
+    without asking Gemini to rediscover them
+    """
+
+    def load(self, text: str) -> Optional[Dict[str, Any]]:
+        """
+        Parse JSON or YAML text and return it if it looks like a supported spec
+        """
+        text = text.strip()
+        if not text:
+            return None
+
+        document = None
+        if text[0] in "{[":
+            try:
+                document = json.loads(text)
+            except ValueError:
+                document = None
+        if document is None and yaml is not None and not text.startswith("<"):
+            try:
+                document = yaml.load(text, Loader=_YamlLoader)
+            except yaml.YAMLError:
+                document = None
+
+        if isinstance(document, dict) and self.detect_format(document):
+            return document
+        return None
+
+    def detect_format(self, document: Dict[str, Any]) -> Optional[str]:
+        if "openapi" in document and "paths" in document:
+            return "openapi"
+        if "swagger" in document and "paths" in document:
+            return "swagger"
+        info = document.get("info")
+        if isinstance(info, dict) and "item" in document and (
+            "_postman_id" in info or "getpostman.com" in str(info.get("schema", ""))
+        ):
+            return "postman"
+        return None
+
+    def parse(self, document: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Extract endpoints, auth methods and the base URL from a loaded spec
+        """
+        spec_format = self.detect_format(document)
+        if spec_format == "postman":
+            return self._parse_postman(document)
+        return _OpenApiParser(document, spec_format).parse()
+
+    def _parse_postman(self, collection: Dict[str, Any]) -> Dict[str, Any]:
+        endpoints = []
+        auth_types = {}
+        base_url = None
+
+        def add_auth(auth):
+            if isinstance(auth, dict) and auth.get("type") and auth["type"] != "noauth":
+                auth_types.setdefault(auth["type"], auth)
+
+        add_auth(collection.get("auth"))
+
+        stack = list(reversed(collection.get("item", [])))
+        while stack:
+            item = stack.pop()
+            if "item" in item:
+                add_auth(item.get("auth"))
+                stack.extend(reversed(item["item"]))
+                continue
+
+            request = item.get("request")
+            if isinstance(request, str):
+                request = {"url": request, "method": "GET"}
+            if not isinstance(request, dict):
+                continue
+            add_auth(request.get("auth"))
+
+            url = request.get("url", "")
+            parameters = {}
+            if isinstance(url, dict):
+                raw = url.get("raw", "")
+                path = "/" + "/".join(str(segment) for segment in url.get("path", []))
+                for query in url.get("query", []) or []:
+                    if query.get("key"):
+                        parameters[query["key"]] = {
+                            "in": "query",
+                            "type": "string",
+                            "description": query.get("description", "")
+                        }
+            else:
+                raw = url
+                path = re.sub(r"^(?:\{\{[^}]+\}\}|[a-z]+://[^/]+)", "", raw).split("?")[0] or "/"
+            if base_url is None and raw:
+                match = re.match(r"^(\{\{[^}]+\}\}|[a-z]+://[^/]+)", raw)
+                base_url = match.group(1) if match else None
+
+            body = request.get("body") or {}
+            mode = body.get("mode")
+            if mode in ("urlencoded", "formdata"):
+                for field in body.get(mode) or []:
+                    if field.get("key"):
+                        parameters[field["key"]] = {"in": "body", "type": field.get("type", "string")}
+            elif mode == "raw":
+                try:
+                    raw_body = json.loads(body.get("raw") or "null")
+                except ValueError:
+                    raw_body = None
+                if isinstance(raw_body, dict):
+                    for key, value in raw_body.items():
+                        parameters[key] = {"in": "body", "type": type(value).__name__}
+
+            description = request.get("description") or item.get("name", "")
+            if isinstance(description, dict):
+                description = description.get("content", "")
+
+            # Postman variables ({{id}}, :id) become OpenAPI-style path params
+            path = re.sub(r":(\w+)", r"{\1}", path.replace("{{", "{").replace("}}", "}"))
+            endpoints.append({
+                "path": path,
+                "method": str(request.get("method", "GET")).upper(),
+                "description": description,
+                "parameters": parameters
+            })
+
+        auth_methods = []
+        for auth_type, auth in auth_types.items():
+            auth_methods.append(_postman_auth(auth_type, auth))
+
+        return {
+            "format": "postman",
+            "base_url": base_url,
+            "endpoints": endpoints,
+            "auth_methods": auth_methods
+        }
+
+
+class _OpenApiParser:
+    """Single-use parser for one OpenAPI/Swagger document with a $ref resolution cache"""
+
+    def __init__(self, document: Dict[str, Any], spec_format: str):
+        self.document = document
+        self.format = spec_format
+        self._refs: Dict[str, Any] = {}
+
+    def parse(self) -> Dict[str, Any]:
+        endpoints = []
+        for path, path_item in (self.document.get("paths") or {}).items():
+            path_item = self.resolve(path_item)
+            if not isinstance(path_item, dict):
+                continue
+            shared_params = path_item.get("parameters", [])
+            for method in HTTP_METHODS:
+                operation = path_item.get(method)
+                if not isinstance(operation, dict):
+                    continue
+                endpoints.append({
+                    "path": path,
+                    "method": method.upper(),
+                    "description": operation.get("summary") or operation.get("description") or "",
+                    "parameters": self._parameters(shared_params, operation),
+                    "response_example": self._response_example(operation)
+                })
+
+        return {
+            "format": self.format,
+            "base_url": self._base_url(),
+            "endpoints": endpoints,
+            "auth_methods": self._auth_methods()
+        }
+
+    def resolve(self, node: Any) -> Any:
+        """Follow local $refs, caching each resolved pointer"""
+        seen = 0
+        while isinstance(node, dict) and "$ref" in node and seen < 16:
+            ref = node["$ref"]
+            if ref not in self._refs:
+                self._refs[ref] = self._lookup(ref)
+            node = self._refs[ref]
+            seen += 1
+        return node
+
+    def _lookup(self, ref: str) -> Any:
+        if not ref.startswith("#/"):
+            # External references are not fetched
+            return {}
+        node = self.document
+        for token in ref[2:].split("/"):
+            token = token.replace("~1", "/").replace("~0", "~")
+            if isinstance(node, dict):
+                node = node.get(token)
+            elif isinstance(node, list) and token.isdigit() and int(token) < len(node):
+                node = node[int(token)]
+            else:
+                return {}
+        return node if node is not None else {}
+
+    def _schema_type(self, schema: Any) -> str:
+        if isinstance(schema, dict) and "$ref" in schema:
+            return schema["$ref"].rsplit("/", 1)[-1]
+        schema = self.resolve(schema)
+        if not isinstance(schema, dict):
+            return "string"
+        if schema.get("type") == "array":
+            return f"array[{self._schema_type(schema.get('items', {}))}]"
+        return schema.get("type", "object")
+
+    def _parameters(self, shared_params: List[Any], operation: Dict[str, Any]) -> Dict[str, Any]:
+        parameters = {}
+        for param in list(shared_params) + list(operation.get("parameters", [])):
+            param = self.resolve(param)
+            if not isinstance(param, dict) or not param.get("name"):
+                continue
+            if param.get("in") == "body":
+                # Swagger 2 body parameter: expand the schema's top-level properties
+                parameters.update(self._body_fields(param.get("schema", {})))
+                continue
+            parameters[param["name"]] = {
+                "in": param.get("in"),
+                "required": bool(param.get("required", False)),
+                "type": self._schema_type(param.get("schema", param)),
+                "description": param.get("description", "")
+            }
+
+        request_body = self.resolve(operation.get("requestBody"))
+        if isinstance(request_body, dict):
+            content = request_body.get("content") or {}
+            media = content.get("application/json") or next(iter(content.values()), {})
+            parameters.update(self._body_fields(self.resolve(media).get("schema", {})))
+        return parameters
+
+    def _body_fields(self, schema: Any) -> Dict[str, Any]:
+        schema = self.resolve(schema)
+        if not isinstance(schema, dict):
+            return {}
+        required = set(schema.get("required", []))
+        fields = {}
+        for name, prop in (schema.get("properties") or {}).items():
+            resolved = self.resolve(prop)
+            fields[name] = {
+                "in": "body",
+                "required": name in required,
+                "type": self._schema_type(prop),
+                "description": resolved.get("description", "") if isinstance(resolved, dict) else ""
+            }
+        return fields
+
+    def _response_example(self, operation: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        responses = operation.get("responses") or {}
+        for status in ("200", "201", 200, 201):
+            response = self.resolve(responses.get(status))
+            if not isinstance(response, dict):
+                continue
+            if self.format == "swagger":
+                example = (response.get("examples") or {}).get("application/json")
+            else:
+                media = (response.get("content") or {}).get("application/json") or {}
+                example = media.get("example")
+                if example is None and media.get("examples"):
+                    example = self.resolve(next(iter(media["examples"].values()))).get("value")
+            if isinstance(example, dict):
+                return example
+        return None
+
+    def _base_url(self) -> Optional[str]:
+        if self.format == "swagger":
+            host = self.document.get("host")
+            if not host:
+                return None
+            scheme = (self.document.get("schemes") or ["https"])[0]
+            return f"{scheme}://{host}{self.document.get('basePath', '')}"
+        servers = self.document.get("servers") or []
+        return servers[0].get("url") if servers and isinstance(servers[0], dict) else None
+
+    def _auth_methods(self) -> List[Dict[str, Any]]:
+        if self.format == "swagger":
+            schemes = self.document.get("securityDefinitions") or {}
+        else:
+            schemes = (self.document.get("components") or {}).get("securitySchemes") or {}
+
+        auth_methods = []
+        for name, scheme in schemes.items():
+            scheme = self.resolve(scheme)
+            if not isinstance(scheme, dict):
+                continue
+            scheme_type = str(scheme.get("type", "")).lower()
+            http_scheme = str(scheme.get("scheme", "")).lower()
+            if scheme_type == "apikey":
+                auth_type = "API Key"
+                description = f"API key sent in the {scheme.get('in', 'header')} parameter '{scheme.get('name', name)}'"
+            elif scheme_type == "http" and http_scheme == "bearer":
+                auth_type = "Bearer Token"
+                description = "Bearer token in the Authorization header"
+                if scheme.get("bearerFormat"):
+                    description += f" ({scheme['bearerFormat']})"
+            elif scheme_type == "basic" or (scheme_type == "http" and http_scheme == "basic"):
+                auth_type = "Basic Auth"
+                description = "HTTP Basic authentication with username and password"
+            elif scheme_type == "oauth2":
+                auth_type = "OAuth 2.0"
+                flows = scheme.get("flows") or ({scheme["flow"]: scheme} if scheme.get("flow") else {})
+                description = "OAuth 2.0 flows: " + ", ".join(flows) if flows else "OAuth 2.0"
+            elif scheme_type == "openidconnect":
+                auth_type = "OpenID Connect"
+                description = f"OpenID Connect discovery at {scheme.get('openIdConnectUrl', '')}"
+            else:
+                auth_type = scheme_type or name
+                description = scheme.get("description", "")
+            if scheme.get("description") and scheme_type in ("apikey", "http", "basic", "oauth2"):
+                description = f"{description}. {scheme['description']}"
+            auth_methods.append({"type": auth_type, "description": description})
+        return auth_methods
+
+
+def _postman_auth(auth_type: str, auth: Dict[str, Any]) -> Dict[str, str]:
+    auth_type = auth_type.lower()
+    if auth_type == "apikey":
+        return {"type": "API Key", "description": "API key configured in the Postman collection"}
+    if auth_type == "bearer":
+        return {"type": "Bearer Token", "description": "Bearer token in the Authorization header"}
+    if auth_type == "basic":
+        return {"type": "Basic Auth", "description": "HTTP Basic authentication with username and password"}
+    if auth_type.startswith("oauth"):
+        return {"type": "OAuth 2.0" if auth_type == "oauth2" else "OAuth 1.0", "description": "OAuth authentication"}
+    return {"type": auth_type, "description": f"{auth_type} authentication configured in the Postman collection"}
+
+
+def select_relevant_endpoints(endpoints: List[Dict[str, Any]], use_case: str, limit: int) -> List[Dict[str, Any]]:
+    """
+    Keep the endpoints whose path and description best overlap the use case words
+    """
+    if len(endpoints) <= limit:
+        return endpoints
+    words = {w for w in re.findall(r"[a-z0-9]+", use_case.lower()) if len(w) > 2}
+
+    def score(endpoint):
+        text = f"{endpoint['path']} {endpoint.get('description', '')}".lower()
+        tokens = set(re.findall(r"[a-z0-9]+", text))
+        # Crude stemming so "users" matches "user"
+        tokens |= {t.rstrip("s") for t in tokens}
+        return sum(1 for w in words if w in tokens or w.rstrip("s") in tokens)
+
+    ranked = sorted(range(len(endpoints)), key=lambda i: (-score(endpoints[i]), i))
+    return [endpoints[i] for i in sorted(ranked[:limit])]
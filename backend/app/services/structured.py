@@ -0,0 +1,114 @@
+import json
+from typing import Any, Dict, List, Optional, Tuple, Type
+
+from pydantic import BaseModel
+
+# Keywords of the OpenAPI subset Gemini accepts as a response schema
+_SCHEMA_KEYS = ("type", "format", "description", "enum", "properties", "items", "required", "nullable")
+
+
+def response_schema(model: Type[BaseModel]) -> Dict[str, Any]:
+    """
+    Convert a pydantic model into a Gemini response schema: references are inlined,
+    Optional[X] becomes a nullable X and unsupported keywords are dropped
+    """
+    schema = model.model_json_schema()
+    return _convert(schema, schema.get("$defs", {}))
+
+
+def _convert(node: Dict[str, Any], defs: Dict[str, Any]) -> Dict[str, Any]:
+    if "$ref" in node:
+        return _convert(defs[node["$ref"].rsplit("/", 1)[-1]], defs)
+
+    nullable = False
+    if "anyOf" in node:
+        options = [option for option in node["anyOf"] if option.get("type") != "null"]
+        nullable = len(options) < len(node["anyOf"])
+        merged = {k: v for k, v in node.items() if k != "anyOf"}
+        node = {**_convert(options[0], defs), **{k: v for k, v in merged.items() if k in _SCHEMA_KEYS}}
+    if "const" in node:
+        node = {**node, "enum": [node["const"]]}
+
+    result = {}
+    for key in _SCHEMA_KEYS:
+        if key not in node:
+            continue
+        value = node[key]
+        if key == "properties":
+            value = {name: _convert(prop, defs) for name, prop in value.items()}
+        elif key == "items":
+            value = _convert(value, defs)
+        result[key] = value
+    if nullable:
+        result["nullable"] = True
+    return result
+
+
+class IncrementalJsonParser:
+    """
+    Incremental scanner for a JSON object whose top-level values are arrays of objects.
+
+    Text is fed in chunks as the model generates it; every array element is returned,
+    together with the key of its array, as soon as its closing brace arrives.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._key: Optional[str] = None
+        self._string_start = 0
+        self._last_string: Optional[str] = None
+        self._item_start: Optional[int] = None
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        self.text += chunk
+        items = []
+        text = self.text
+        for pos in range(self._pos, len(text)):
+            char = text[pos]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        self._last_string = text[self._string_start:pos + 1]
+                continue
+
+            if char == '"':
+                self._in_string = True
+                self._string_start = pos
+            elif char == ":" and self._depth == 1 and self._last_string is not None:
+                self._key = json.loads(self._last_string)
+                self._last_string = None
+            elif char in "{[":
+                self._depth += 1
+                if self._depth == 3 and char == "{":
+                    self._item_start = pos
+            elif char in "}]":
+                if self._depth == 3 and char == "}" and self._item_start is not None:
+                    try:
+                        items.append((self._key, json.loads(text[self._item_start:pos + 1])))
+                    except ValueError:
+                        pass
+                    self._item_start = None
+                self._depth -= 1
+        self._pos = len(text)
+        return items
+
+    def result(self) -> Optional[Dict[str, Any]]:
+        """The complete document, or None when the text is not (yet) valid JSON"""
+        # Tolerate a ```json fence around the object when structured output is off
+        start, end = self.text.find("{"), self.text.rfind("}")
+        if start < 0 or end < start:
+            return None
+        try:
+            data = json.loads(self.text[start:end + 1])
+        except ValueError:
+            return None
+        return data if isinstance(data, dict) else None
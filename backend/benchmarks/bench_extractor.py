@@ -0,0 +1,109 @@
+"""
+Micro-benchmark for the extractor's HTML parsing and signal scanning.
+
+Compares the single-pass lxml scanner with the previous BeautifulSoup implementation
+(repeated traversals, one regex per auth term, str(table) serialisation).
+
+    python -m benchmarks.bench_extractor                 # synthetic corpus
+    python -m benchmarks.bench_extractor --pages DIR     # saved *.html pages
+"""
+import argparse
+import json
+import re
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.services.html_scanner import scan_html  # noqa: E402
+from benchmarks.corpus import make_corpus  # noqa: E402
+
+
+def legacy_extract(html: str) -> dict:
+    """The extraction as it was before the single-pass scanner"""
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, 'lxml')
+    main_content = soup.find('main') or soup.find('body')
+    text_content = main_content.get_text() if main_content else soup.get_text()
+    text_content = re.sub(r'\s+', ' ', text_content).strip()
+
+    endpoints = []
+    for match in re.finditer(r'(GET|POST|PUT|DELETE|PATCH)\s+(/[\w/{}]+)', text_content):
+        method, path = match.groups()
+        endpoints.append({
+            "method": method,
+            "path": path,
+            "raw_context": text_content[max(0, match.start() - 100):min(len(text_content), match.end() + 100)]
+        })
+    for table in soup.find_all('table'):
+        for row in table.find_all('tr'):
+            cells = row.find_all(['td', 'th'])
+            if len(cells) >= 2:
+                text = ' '.join(cell.get_text().strip() for cell in cells)
+                if re.search(r'(GET|POST|PUT|DELETE|PATCH)\s+(/[\w/{}]+)', text):
+                    endpoints.append({"context_type": "table", "raw_context": str(table)[:1000]})
+                    break
+
+    auth_methods = []
+    for term in ["authentication", "authorization", "api key", "bearer token",
+                 "oauth", "basic auth", "jwt", "access token"]:
+        for match in re.finditer(rf'\b{term}\b', text_content, re.IGNORECASE):
+            start = max(0, match.start() - 100)
+            end = min(len(text_content), match.end() + 200)
+            auth_methods.append({"term": term, "context": text_content[start:end]})
+
+    return {"raw_text": text_content[:50000], "potential_endpoints": endpoints, "potential_auth": auth_methods}
+
+
+def _time(func, html: str, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(html)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", help="directory of saved .html documentation pages")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args()
+
+    if args.pages:
+        corpus = {p.name: p.read_text(errors="replace") for p in sorted(Path(args.pages).glob("*.html"))}
+    else:
+        corpus = make_corpus()
+
+    results = []
+    for name, html in corpus.items():
+        legacy = _time(legacy_extract, html, args.repeat)
+        scanner = _time(scan_html, html, args.repeat)
+        legacy_out = legacy_extract(html)
+        scanner_out = scan_html(html)
+        results.append({
+            "page": name,
+            "bytes": len(html),
+            "legacy_ms": round(legacy * 1000, 1),
+            "scanner_ms": round(scanner * 1000, 1),
+            "speedup": round(legacy / scanner, 2) if scanner else None,
+            "legacy_hits": len(legacy_out["potential_endpoints"]) + len(legacy_out["potential_auth"]),
+            "scanner_hits": len(scanner_out["potential_endpoints"]) + len(scanner_out["potential_auth"]),
+        })
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'page':<24}{'bytes':>10}{'legacy ms':>12}{'scanner ms':>12}{'speedup':>9}{'hits old/new':>15}")
+    for r in results:
+        print(f"{r['page']:<24}{r['bytes']:>10}{r['legacy_ms']:>12}{r['scanner_ms']:>12}"
+              f"{r['speedup']:>8}x{r['legacy_hits']:>8}/{r['scanner_hits']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""
+Offline benchmark for the Gemini client's timeouts, retries, hedging, fallback and
+circuit breaker.
+
+GeminiService.generate_text is called directly (no cache, no rate limit) against
+benchmarks.fakes.FakeGenerativeModel in three upstream conditions, once with the
+resilience features switched off ("plain": one attempt, no hedge, no fallback; the
+circuit breaker stays on) and once with them on ("resilient"):
+
+  tail    a share of calls takes --tail-latency instead of --latency
+  errors  a share of calls fails with a 503
+  outage  the primary model is down; the fallback model is healthy
+
+Reports p50/p95/p99 latency, the share of calls that failed and the upstream calls
+made per request (the load amplification). Fails when the resilient client does not
+cut the p99 in the tail condition, lets errors through in the errors condition,
+or keeps calling the primary model once its circuit is open during the outage.
+
+    python -m benchmarks.bench_gemini
+    python -m benchmarks.bench_gemini --requests 1000 --concurrency 32 --json
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.bench_pipeline import percentile  # noqa: E402
+from benchmarks.fakes import FakeGenerativeModel, install_fake_model  # noqa: E402
+
+CONDITIONS = ("tail", "errors", "outage")
+
+
+def make_service(resilient: bool, args):
+    from app.services.gemini_service import GeminiService
+    from app.services.rate_limit import RateLimiter
+
+    service = GeminiService(cache=None, rate_limiter=RateLimiter())
+    service.backoff_base = 0.02
+    service.backoff_cap = 0.2
+    service.hedge_min_delay = 0.0
+    if resilient:
+        service.timeout = args.tail_latency * 2
+    else:
+        service.max_attempts = 1
+        service.hedge = False
+        service.fallback_model_name = None
+    return service
+
+
+def make_models(condition: str, args):
+    primary = FakeGenerativeModel(latency=args.latency, jitter=args.latency / 4, seed=1)
+    fallback = FakeGenerativeModel(latency=args.latency, jitter=args.latency / 4, seed=2)
+    if condition == "tail":
+        primary.tail_rate, primary.tail_latency = args.tail_rate, args.tail_latency
+    elif condition == "errors":
+        primary.error_rate = args.error_rate
+    elif condition == "outage":
+        primary.down = True
+    return primary, fallback
+
+
+async def run_condition(condition: str, resilient: bool, args) -> Dict[str, Any]:
+    service = make_service(resilient, args)
+    primary, fallback = make_models(condition, args)
+    install_fake_model(service, primary, fallback=fallback if resilient else None)
+
+    latencies: List[float] = []
+    failures = 0
+    next_index = iter(range(args.requests))
+
+    async def worker():
+        nonlocal failures
+        for index in next_index:
+            start = time.perf_counter()
+            try:
+                await service.generate_text(f"benchmark prompt {index}", use_cache=False, stage="bench")
+            except Exception:
+                failures += 1
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    elapsed = time.perf_counter() - start
+    await service.aclose()
+
+    def ms(value):
+        return round(value * 1000, 1) if value is not None else None
+
+    return {
+        "condition": condition,
+        "client": "resilient" if resilient else "plain",
+        "requests": args.requests,
+        "elapsed_s": round(elapsed, 2),
+        "failed_pct": round(failures / args.requests * 100, 1),
+        "p50_ms": ms(percentile(latencies, 50)),
+        "p95_ms": ms(percentile(latencies, 95)),
+        "p99_ms": ms(percentile(latencies, 99)),
+        "primary_calls": primary.calls,
+        "fallback_calls": fallback.calls,
+        "calls_per_request": round((primary.calls + fallback.calls) / args.requests, 2),
+        "circuits": service.circuit_states(),
+    }
+
+
+def check(results: List[Dict[str, Any]], args) -> List[str]:
+    """The expectations the module docstring lists, as failure messages"""
+    by_key = {(r["condition"], r["client"]): r for r in results}
+    failures = []
+    tail = by_key.get(("tail", "plain")), by_key.get(("tail", "resilient"))
+    if all(tail) and tail[1]["p99_ms"] >= tail[0]["p99_ms"]:
+        failures.append(f"tail: resilient p99 {tail[1]['p99_ms']} ms is not below plain {tail[0]['p99_ms']} ms")
+    errors = by_key.get(("errors", "resilient"))
+    if errors and errors["failed_pct"] > args.error_rate * 100 / 4:
+        failures.append(f"errors: {errors['failed_pct']}% of resilient calls failed")
+    outage = by_key.get(("outage", "resilient"))
+    if outage:
+        if outage["failed_pct"] > 0:
+            failures.append(f"outage: {outage['failed_pct']}% of calls failed despite the fallback")
+        # Once open, the breaker only lets a probe through every reset period
+        if outage["primary_calls"] > args.requests / 4:
+            failures.append(f"outage: {outage['primary_calls']} calls reached the primary model")
+    return failures
+
+
+async def run_all(args) -> List[Dict[str, Any]]:
+    results = []
+    for condition in args.conditions.split(","):
+        if condition not in CONDITIONS:
+            raise SystemExit(f"Unknown condition {condition}; choose from {CONDITIONS}")
+        for resilient in (False, True):
+            result = await run_condition(condition, resilient, args)
+            results.append(result)
+            print(f"{result['condition']:<8}{result['client']:<11}{result['p50_ms']:>9} p50{result['p95_ms']:>9} p95"
+                  f"{result['p99_ms']:>9} p99{result['failed_pct']:>7}% failed"
+                  f"{result['calls_per_request']:>7} calls/req", file=sys.stderr)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--conditions", default=",".join(CONDITIONS), help="comma-separated upstream conditions")
+    parser.add_argument("--requests", type=int, default=400, help="calls per condition and client")
+    parser.add_argument("--concurrency", type=int, default=16, help="calls in flight at once")
+    parser.add_argument("--latency", type=float, default=0.05, help="normal fake model latency in seconds")
+    parser.add_argument("--tail-rate", type=float, default=0.03, help="share of slow calls in the tail condition")
+    parser.add_argument("--tail-latency", type=float, default=1.0, help="latency of a slow call in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.1, help="share of failing calls in the errors condition")
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    args = parser.parse_args()
+
+    os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+    results = asyncio.run(run_all(args))
+    if args.json:
+        print(json.dumps(results, indent=2))
+
+    failures = check(results, args)
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,228 @@
+"""
+Offline load test for /api/analyze and /api/test-endpoint.
+
+The app runs in-process behind httpx's ASGI transport, Gemini is replaced by
+benchmarks.fakes.FakeGenerativeModel and documentation pages come from a local
+DocServer, so no network access or API key is needed. Each scenario sends a fixed
+number of requests at a fixed concurrency and reports throughput, p50/p95/p99
+latency and the process's peak RSS so far.
+
+    python -m benchmarks.bench_pipeline
+    python -m benchmarks.bench_pipeline --concurrency 1,8,32 --pages 20KB,1MB --output run.json
+    python -m benchmarks.bench_pipeline --output new.json --compare baseline.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.corpus import make_corpus  # noqa: E402
+from benchmarks.doc_server import DocServer  # noqa: E402
+from benchmarks.fakes import FakeGenerativeModel, install_fake_model  # noqa: E402
+
+
+def percentile(samples: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile"""
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    rank = max(1, int(round(pct / 100 * len(ordered) + 0.5)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+async def run_scenario(name: str,
+                       send: Callable[[int], Any],
+                       total: int,
+                       concurrency: int) -> Dict[str, Any]:
+    """Send total requests with at most concurrency in flight and summarise them"""
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    next_index = iter(range(total))
+
+    async def worker():
+        for index in next_index:
+            start = time.perf_counter()
+            try:
+                response = await send(index)
+                await response.aread()
+                status = str(response.status_code)
+            except Exception as e:
+                status = type(e).__name__
+            latencies.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    def ms(value):
+        return round(value * 1000, 1) if value is not None else None
+
+    return {
+        "scenario": name,
+        "concurrency": concurrency,
+        "requests": total,
+        "errors": sum(count for status, count in statuses.items() if not status.startswith("2")),
+        "statuses": statuses,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(total / elapsed, 2) if elapsed else None,
+        "p50_ms": ms(percentile(latencies, 50)),
+        "p95_ms": ms(percentile(latencies, 95)),
+        "p99_ms": ms(percentile(latencies, 99)),
+        "mean_ms": ms(statistics.fmean(latencies)) if latencies else None,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=Path(__file__).resolve().parent, timeout=5).stdout.strip() or None
+    except Exception:
+        return None
+
+
+async def run_benchmarks(args) -> Dict[str, Any]:
+    import httpx
+
+    from app.main import app
+
+    corpus = make_corpus()
+    pages = list(corpus) if args.pages == "all" else args.pages.split(",")
+    unknown = [page for page in pages if page not in corpus]
+    if unknown:
+        raise SystemExit(f"Unknown pages {unknown}; choose from {list(corpus)}")
+    server = DocServer({page: corpus[page] for page in pages})
+    server.start()
+
+    concurrency_levels = [int(c) for c in args.concurrency.split(",")]
+    results = []
+    transport = httpx.ASGITransport(app=app)
+    try:
+        # ASGITransport does not send lifespan events, so run the handler that builds the services here
+        async with app.router.lifespan_context(app), \
+                httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            model = install_fake_model(app.state.services.gemini_service, FakeGenerativeModel(
+                latency=args.gemini_latency, jitter=args.gemini_jitter, chunk_delay=args.chunk_delay
+            ))
+            if "analyze" in args.scenarios:
+                for page in pages:
+                    for concurrency in concurrency_levels:
+                        def send(index, page=page):
+                            return client.post("/api/analyze", json={
+                                "documentation_url": f"{server.base_url}/docs/{page}",
+                                # A distinct use case per request defeats the Gemini cache
+                                "use_case": f"benchmark request {index}",
+                                "preferred_language": "python",
+                                "use_cache": args.use_cache
+                            })
+                        result = await run_scenario(f"analyze:{page}", send, args.requests, concurrency)
+                        results.append(result)
+                        _progress(result)
+
+            if "test-endpoint" in args.scenarios:
+                for size in [int(s) for s in args.blob_sizes.split(",")]:
+                    for concurrency in concurrency_levels:
+                        def send(index, size=size):
+                            return client.post("/api/test-endpoint", json={
+                                "url": f"{server.base_url}/blob/{size}", "method": "GET"
+                            })
+                        result = await run_scenario(f"test-endpoint:{size}B", send, args.requests, concurrency)
+                        results.append(result)
+                        _progress(result)
+    finally:
+        server.stop()
+
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "gemini_latency_s": args.gemini_latency,
+            "gemini_jitter_s": args.gemini_jitter,
+            "use_cache": args.use_cache,
+            "gemini_calls": model.calls,
+        },
+        "results": results,
+    }
+
+
+def _progress(result: Dict[str, Any]):
+    print(f"{result['scenario']:<24}c={result['concurrency']:<4}{result['throughput_rps']:>9} rps"
+          f"{result['p50_ms']:>10} p50{result['p95_ms']:>10} p95{result['p99_ms']:>10} p99"
+          f"{result['errors']:>5} err{result['peak_rss_mb']:>9} MB", file=sys.stderr)
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any]):
+    """Print the change of each metric relative to a previous run"""
+    previous = {(r["scenario"], r["concurrency"]): r for r in baseline["results"]}
+    print(f"\nvs {baseline['meta'].get('commit') or 'baseline'}:")
+    print(f"{'scenario':<24}{'c':>4}{'rps':>10}{'p50':>10}{'p95':>10}{'p99':>10}{'rss':>10}")
+    for result in current["results"]:
+        old = previous.get((result["scenario"], result["concurrency"]))
+        if old is None:
+            continue
+        cells = []
+        for key in ("throughput_rps", "p50_ms", "p95_ms", "p99_ms", "peak_rss_mb"):
+            if old.get(key) and result.get(key) is not None:
+                cells.append(f"{(result[key] - old[key]) / old[key] * 100:+.1f}%")
+            else:
+                cells.append("n/a")
+        print(f"{result['scenario']:<24}{result['concurrency']:>4}" + "".join(f"{cell:>10}" for cell in cells))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", default="analyze,test-endpoint", help="comma-separated: analyze, test-endpoint")
+    parser.add_argument("--concurrency", default="1,4,16", help="comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=32, help="requests per scenario and concurrency level")
+    parser.add_argument("--pages", default="20KB,200KB,1MB", help="corpus pages to analyze, or 'all' (adds 5MB)")
+    parser.add_argument("--blob-sizes", default="1024,1048576", help="response sizes for /api/test-endpoint")
+    parser.add_argument("--gemini-latency", type=float, default=0.2, help="fake model latency per call in seconds")
+    parser.add_argument("--gemini-jitter", type=float, default=0.05, help="uniform +/- jitter on the latency")
+    parser.add_argument("--chunk-delay", type=float, default=0.0, help="delay between streamed chunks")
+    parser.add_argument("--use-cache", action="store_true", help="let requests hit the extraction/Gemini caches")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    parser.add_argument("--compare", help="previous --output file to compare against")
+    args = parser.parse_args()
+
+    # Offline defaults: dummy key, no rate limiting and a throwaway disk cache
+    os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+    os.environ.setdefault("GEMINI_RPM", "0")
+    os.environ.setdefault("GEMINI_TPM", "0")
+    os.environ.setdefault("CACHE_SQLITE_PATH", os.path.join(tempfile.mkdtemp(prefix="bench-cache-"), "cache.db"))
+    os.environ.setdefault("SPEC_PROBE_WELL_KNOWN", "false")
+
+    report = asyncio.run(run_benchmarks(args))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output:
+            json.dump(report, output, indent=2)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as source:
+            compare(report, json.load(source))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Cold-start benchmark for the backend.
+
+Each run starts a fresh interpreter with -X importtime, imports app.main and then
+enters the app's lifespan handler (which builds the services), without a
+GEMINI_API_KEY. Reports the median import and startup times, the slowest imports,
+and fails when a budget is exceeded or a module that should load lazily
+(google.generativeai and its gRPC stack) was imported at startup.
+
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --runs 10 --import-budget-ms 300 --json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# Runs in the child interpreter; prints the lifespan startup time on the last line of stdout
+_CHILD = """
+import asyncio, time
+start = time.perf_counter()
+import app.main
+imported = time.perf_counter()
+
+async def startup():
+    async with app.main.app.router.lifespan_context(app.main.app):
+        return time.perf_counter()
+
+ready = asyncio.run(startup())
+print((imported - start) * 1000, (ready - imported) * 1000)
+"""
+
+DEFAULT_FORBIDDEN = "google.generativeai,google.ai.generativelanguage,grpc"
+
+
+def parse_importtime(stderr: str) -> Dict[str, Tuple[int, int]]:
+    """Map each imported module to its (self, cumulative) import time in microseconds"""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules[name.strip()] = (int(self_us), int(cumulative_us))
+    return modules
+
+
+def run_once() -> Tuple[float, float, Dict[str, Tuple[int, int]]]:
+    env = {key: value for key, value in os.environ.items() if key != "GEMINI_API_KEY"}
+    # Keep a local .env from supplying the key, and keep the run off the real caches
+    env["GEMINI_API_KEY"] = ""
+    env.setdefault("CACHE_SQLITE_PATH", os.path.join(tempfile.mkdtemp(prefix="bench-startup-"), "cache.db"))
+    completed = subprocess.run([sys.executable, "-X", "importtime", "-c", _CHILD], cwd=BACKEND_DIR, env=env,
+                               capture_output=True, text=True, check=False)
+    if completed.returncode != 0:
+        raise SystemExit(f"Startup failed:\n{completed.stderr[-4000:]}")
+    import_ms, startup_ms = (float(value) for value in completed.stdout.strip().splitlines()[-1].split())
+    return import_ms, startup_ms, parse_importtime(completed.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters to start")
+    parser.add_argument("--import-budget-ms", type=float, default=400, help="maximum median time to import app.main")
+    parser.add_argument("--startup-budget-ms", type=float, default=100,
+                        help="maximum median time for the lifespan handler to build the services")
+    parser.add_argument("--forbid", default=DEFAULT_FORBIDDEN,
+                        help="comma-separated modules that must not be imported at startup")
+    parser.add_argument("--top", type=int, default=15, help="number of slowest imports to list")
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args()
+
+    import_times: List[float] = []
+    startup_times: List[float] = []
+    modules: Dict[str, Tuple[int, int]] = {}
+    for _ in range(args.runs):
+        import_ms, startup_ms, modules = run_once()
+        import_times.append(import_ms)
+        startup_times.append(startup_ms)
+
+    forbidden = [name for name in args.forbid.split(",") if name]
+    loaded = sorted(name for name in modules if any(name == f or name.startswith(f + ".") for f in forbidden))
+    # Slowest imports by self time from the last run, so nested packages are not counted twice
+    slowest = sorted(modules.items(), key=lambda item: item[1][0], reverse=True)[:args.top]
+    report = {
+        "runs": args.runs,
+        "import_ms": round(statistics.median(import_times), 1),
+        "startup_ms": round(statistics.median(startup_times), 1),
+        "import_budget_ms": args.import_budget_ms,
+        "startup_budget_ms": args.startup_budget_ms,
+        "modules_imported": len(modules),
+        "forbidden_loaded": loaded,
+        "slowest_imports": [{"module": name, "self_ms": round(self_us / 1000, 1),
+                             "cumulative_ms": round(cumulative_us / 1000, 1)}
+                            for name, (self_us, cumulative_us) in slowest],
+    }
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"import app.main   {report['import_ms']:>8} ms  (budget {args.import_budget_ms:g} ms)")
+        print(f"lifespan startup  {report['startup_ms']:>8} ms  (budget {args.startup_budget_ms:g} ms)")
+        print(f"modules imported  {report['modules_imported']:>8}")
+        print(f"\n{'self ms':>9}{'cumul ms':>10}  module")
+        for entry in report["slowest_imports"]:
+            print(f"{entry['self_ms']:>9}{entry['cumulative_ms']:>10}  {entry['module']}")
+
+    failures = []
+    if report["import_ms"] > args.import_budget_ms:
+        failures.append(f"import took {report['import_ms']} ms, budget is {args.import_budget_ms:g} ms")
+    if report["startup_ms"] > args.startup_budget_ms:
+        failures.append(f"startup took {report['startup_ms']} ms, budget is {args.startup_budget_ms:g} ms")
+    if loaded:
+        failures.append(f"imported at startup but should load lazily: {', '.join(loaded[:10])}")
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
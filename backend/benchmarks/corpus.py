@@ -0,0 +1,65 @@
+"""
+Synthetic documentation pages for the offline benchmarks.
+
+Pages mimic a single-page API reference: navigation chrome, prose, endpoint tables,
+code samples and repeated authentication notes. Sizes range from a few KB to several MB.
+"""
+import random
+from typing import Dict
+
+_WORDS = (
+    "request response client server resource field value returns list object string "
+    "integer optional required pagination cursor limit offset filter sort created updated "
+    "deleted webhook event retry idempotency header version error status rate quota"
+).split()
+
+_RESOURCES = ["users", "orders", "invoices", "payments", "customers", "products", "refunds", "events"]
+
+
+def _sentence(rng: random.Random, n: int = 14) -> str:
+    return " ".join(rng.choice(_WORDS) for _ in range(n)).capitalize() + "."
+
+
+def make_doc_page(target_bytes: int, seed: int = 0) -> str:
+    """
+    Build an HTML API reference page of roughly target_bytes
+    """
+    rng = random.Random(seed)
+    parts = [
+        "<!DOCTYPE html><html><head><title>API Reference</title>",
+        "<script>window.analytics = {track: function () {}};</script>",
+        "<style>body { font-family: sans-serif; }</style></head><body>",
+        "<nav>" + "".join(f'<a href="/docs/{r}">{r}</a>' for r in _RESOURCES) + "</nav><main>",
+        "<h1>API Reference</h1>",
+        "<h2>Authentication</h2><p>Authenticate every request with an API key sent as a "
+        "Bearer token in the Authorization header. OAuth access tokens are also accepted.</p>",
+    ]
+    size = sum(len(p) for p in parts)
+    i = 0
+    while size < target_bytes:
+        resource = _RESOURCES[i % len(_RESOURCES)]
+        block = [
+            f"<h2>{resource.title()} {i}</h2>",
+            "<p>" + " ".join(_sentence(rng) for _ in range(6)) + "</p>",
+            f"<table><tr><th>Method</th><th>Path</th><th>Description</th></tr>"
+            f"<tr><td>GET</td><td>/v1/{resource}/{i}</td><td>{_sentence(rng, 6)}</td></tr>"
+            f"<tr><td>POST /v1/{resource}</td><td>create</td><td>{_sentence(rng, 6)}</td></tr></table>",
+            f"<p>Call GET /v1/{resource}/{{id}} to fetch one. Requests without an API key fail "
+            f"with 401; see authentication.</p>",
+            f"<pre><code>curl https://api.example.com/v1/{resource} \\\n  -H \"Authorization: Bearer $TOKEN\"</code></pre>",
+            "<!-- generated -->",
+        ]
+        chunk = "".join(block)
+        parts.append(chunk)
+        size += len(chunk)
+        i += 1
+    parts.append("</main><footer>Copyright</footer></body></html>")
+    return "".join(parts)
+
+
+def make_corpus() -> Dict[str, str]:
+    """
+    Pages keyed by a size label: 20 KB, 200 KB, 1 MB and 5 MB
+    """
+    sizes = {"20KB": 20_000, "200KB": 200_000, "1MB": 1_000_000, "5MB": 5_000_000}
+    return {label: make_doc_page(size, seed=n) for n, (label, size) in enumerate(sizes.items())}
@@ -0,0 +1,88 @@
+"""
+Local HTTP server for the offline benchmarks.
+
+Serves the synthetic documentation corpus at /docs/<label> (e.g. /docs/1MB) and
+binary payloads for the proxy at /blob/<bytes>, plus an optional /robots.txt and
+redirects for the crawler tests. Runs in a background thread:
+
+    server = DocServer(make_corpus())
+    server.start()
+    ...
+    server.stop()
+"""
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+
+# Upper bound for /blob so a typo cannot allocate gigabytes
+MAX_BLOB_BYTES = 64 * 1024 * 1024
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    pages: Dict[str, bytes] = {}
+    robots: Optional[bytes] = None
+    redirects: Dict[str, str] = {}
+
+    def setup(self):
+        super().setup()
+        # Headers and body are written separately; without this small responses stall on delayed ACKs
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def do_GET(self):
+        path = self.path.split("?", 1)[0]
+        if path in self.redirects:
+            self.send_response(302)
+            self.send_header("Location", self.redirects[path])
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+        elif path == "/robots.txt" and self.robots is not None:
+            self._send(200, self.robots, "text/plain")
+        elif path.startswith("/docs/") and path[len("/docs/"):] in self.pages:
+            self._send(200, self.pages[path[len("/docs/"):]], "text/html; charset=utf-8")
+        elif path.startswith("/blob/") and path[len("/blob/"):].isdigit():
+            size = min(int(path[len("/blob/"):]), MAX_BLOB_BYTES)
+            self._send(200, b"x" * size, "application/octet-stream")
+        else:
+            # Spec probes and robots.txt land here
+            self._send(404, b"not found", "text/plain")
+
+    def _send(self, status: int, body: bytes, content_type: str):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            # The extractor stops reading huge pages once it has enough text
+            self.close_connection = True
+
+    def log_message(self, format, *args):
+        pass
+
+
+class DocServer:
+    def __init__(self, pages: Dict[str, str], host: str = "127.0.0.1", port: int = 0,
+                 robots: Optional[str] = None, redirects: Optional[Dict[str, str]] = None):
+        handler = type("DocHandler", (_Handler,), {
+            "pages": {k: v.encode("utf-8") for k, v in pages.items()},
+            "robots": robots.encode("utf-8") if robots is not None else None,
+            "redirects": dict(redirects or {})
+        })
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="doc-server", daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
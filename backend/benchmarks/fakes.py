@@ -0,0 +1,180 @@
+"""
+Offline stand-in for the Gemini model used by the benchmarks.
+
+FakeGenerativeModel replaces GeminiService.model, so prompt building, caching, rate
+limiting, retries and response parsing still run exactly as in production; only the
+network call to Gemini is replaced by a configurable delay and a canned response. It
+can also inject a latency tail, server errors and outages.
+"""
+import asyncio
+import json
+import random
+import re
+import time
+from types import SimpleNamespace
+from typing import List, Optional
+
+_ENDPOINT_RE = re.compile(r"\b(GET|POST|PUT|PATCH|DELETE)\s+(/[\w/{}]+)")
+
+_WRAPPER_TEMPLATE = '''import os
+import httpx
+
+
+class ApiClient:
+    """Client generated for the benchmark"""
+
+    def __init__(self, api_key=None):
+        self.api_key = api_key or os.getenv("API_KEY")
+        self.client = httpx.Client(base_url="https://api.example.com",
+                                   headers={{"Authorization": f"Bearer {{self.api_key}}"}})
+{methods}
+'''
+
+_METHOD_TEMPLATE = '''
+    def call_{n}(self, **params):
+        """Call endpoint {n}"""
+        response = self.client.get("/v1/resource/{n}", params=params)
+        response.raise_for_status()
+        return response.json()
+'''
+
+
+class FakeServerError(Exception):
+    """Stands in for google.api_core's ServiceUnavailable and friends, which carry the HTTP status as .code"""
+
+    def __init__(self, code: int = 503):
+        super().__init__(f"{code} fake upstream error")
+        self.code = code
+
+
+class FakeResponse:
+    def __init__(self, text: str, prompt_tokens: int, response_tokens: int):
+        self.text = text
+        self.usage_metadata = SimpleNamespace(
+            prompt_token_count=prompt_tokens,
+            candidates_token_count=response_tokens
+        )
+
+
+class FakeStream:
+    """Async iterator over response chunks, like a streamed generate_content_async result"""
+
+    def __init__(self, chunks: List[str], prompt_tokens: int, chunk_delay: float):
+        self.chunks = chunks
+        self.prompt_tokens = prompt_tokens
+        self.chunk_delay = chunk_delay
+
+    async def _iterate(self):
+        for i, chunk in enumerate(self.chunks):
+            if self.chunk_delay:
+                await asyncio.sleep(self.chunk_delay)
+            last = i == len(self.chunks) - 1
+            # Like Gemini, only the final chunk reports usage for the whole response
+            yield FakeResponse(chunk, self.prompt_tokens if last else 0,
+                               sum(len(c) for c in self.chunks) // 4 if last else 0)
+
+    def __aiter__(self):
+        return self._iterate()
+
+
+class FakeGenerativeModel:
+    """
+    Answers analysis, suggestion, docstring, repair and wrapper prompts with canned
+    responses after latency (+/- jitter) seconds. A tail_rate share of calls take
+    tail_latency instead, an error_rate share fail with FakeServerError, and while
+    down is set every call fails
+    """
+
+    def __init__(self,
+                 latency: float = 0.2,
+                 jitter: float = 0.0,
+                 chunk_delay: float = 0.0,
+                 wrapper_methods: int = 20,
+                 seed: int = 0,
+                 tail_rate: float = 0.0,
+                 tail_latency: float = 2.0,
+                 error_rate: float = 0.0,
+                 down: bool = False):
+        self.latency = latency
+        self.jitter = jitter
+        self.chunk_delay = chunk_delay
+        self.wrapper_methods = wrapper_methods
+        self.tail_rate = tail_rate
+        self.tail_latency = tail_latency
+        self.error_rate = error_rate
+        self.down = down
+        self.calls = 0
+        self.errors = 0
+        self._rng = random.Random(seed)
+
+    def _delay(self) -> float:
+        if self.tail_rate and self._rng.random() < self.tail_rate:
+            return self.tail_latency
+        return max(0.0, self.latency + self._rng.uniform(-self.jitter, self.jitter))
+
+    def _fails(self) -> bool:
+        if self.down or (self.error_rate and self._rng.random() < self.error_rate):
+            self.errors += 1
+            return True
+        return False
+
+    def respond(self, prompt: str) -> str:
+        if "analyze this API documentation" in prompt:
+            seen = []
+            for method, path in _ENDPOINT_RE.findall(prompt):
+                if (method, path) not in seen:
+                    seen.append((method, path))
+                if len(seen) >= 8:
+                    break
+            return json.dumps({
+                "endpoints": [
+                    {"path": path, "method": method, "description": f"{method} {path}",
+                     "parameters": [{"name": "limit", "location": "query", "type": "integer"}]}
+                    for method, path in seen
+                ],
+                "auth_methods": [{"type": "API Key", "description": "Bearer token in the Authorization header"}]
+            })
+        if "failed validation" in prompt:
+            return json.dumps({"items": []})
+        if "docstring" in prompt:
+            return "{}"
+        if "Generate a complete, production-ready API wrapper" in prompt:
+            methods = "".join(_METHOD_TEMPLATE.format(n=n) for n in range(self.wrapper_methods))
+            return _WRAPPER_TEMPLATE.format(methods=methods)
+        return ("Use a thin client class around httpx with retries and typed methods "
+                "for the endpoints this use case needs.")
+
+    def _chunks(self, text: str, size: int = 200) -> List[str]:
+        return [text[i:i + size] for i in range(0, len(text), size)] or [""]
+
+    async def generate_content_async(self, prompt, generation_config=None, safety_settings=None, stream=False):
+        self.calls += 1
+        text = self.respond(prompt)
+        fails = self._fails()
+        await asyncio.sleep(self._delay() / 10 if fails else self._delay())
+        if fails:
+            raise FakeServerError()
+        if stream:
+            return FakeStream(self._chunks(text), len(prompt) // 4, self.chunk_delay)
+        return FakeResponse(text, len(prompt) // 4, len(text) // 4)
+
+    def generate_content(self, prompt, generation_config=None, safety_settings=None, stream=False):
+        self.calls += 1
+        text = self.respond(prompt)
+        fails = self._fails()
+        time.sleep(self._delay() / 10 if fails else self._delay())
+        if fails:
+            raise FakeServerError()
+        return FakeResponse(text, len(prompt) // 4, len(text) // 4)
+
+
+def install_fake_model(gemini_service,
+                       model: Optional[FakeGenerativeModel] = None,
+                       fallback: Optional[FakeGenerativeModel] = None) -> FakeGenerativeModel:
+    """Swap the service's Gemini model (and optionally its fallback model) for fakes and return the main one"""
+    model = model or FakeGenerativeModel()
+    gemini_service.model = model
+    if fallback is not None:
+        gemini_service.fallback_model_name = gemini_service.fallback_model_name or "fake-fallback"
+        gemini_service.fallback_model = fallback
+    return model
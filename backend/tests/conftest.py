@@ -0,0 +1,12 @@
+import os
+import sys
+from pathlib import Path
+
+# Tests import the app and the benchmark fakes from the backend directory
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# Gemini is always replaced by benchmarks.fakes.FakeGenerativeModel; no request leaves the machine
+os.environ.setdefault("GEMINI_API_KEY", "test")
+os.environ.setdefault("SPEC_PROBE_WELL_KNOWN", "false")
+# Snapshots and load test results live only as long as the test process
+os.environ.setdefault("ANALYSIS_RECORDS_PATH", ":memory:")
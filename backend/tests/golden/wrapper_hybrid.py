@@ -0,0 +1,89 @@
+"""
+API client generated for: Sync users from our CRM
+"""
+import os
+from typing import Any, Dict, List, Optional
+from urllib.parse import quote
+
+import httpx
+
+
+class ApiError(Exception):
+    """Raised when the API responds with an error status"""
+
+    def __init__(self, status_code: int, body: str):
+        super().__init__(f"API request failed with status {status_code}: {body[:200]}")
+        self.status_code = status_code
+        self.body = body
+
+
+class ApiClient:
+    """
+    Client for the API's endpoints.
+    """
+
+    def __init__(self, base_url: Optional[str] = None, api_key: Optional[str] = None, timeout: float = 30.0):
+        self.base_url = (base_url or os.getenv("API_BASE_URL", "https://api.example.test")).rstrip("/")
+        self.api_key = api_key or os.getenv("API_KEY")
+        if not self.api_key:
+            raise ValueError("An API key is required (pass api_key or set API_KEY)")
+        self._client = httpx.Client(
+            base_url=self.base_url,
+            timeout=timeout,
+            headers={"X-Api-Key": self.api_key}
+        )
+
+    def close(self):
+        self._client.close()
+
+    def __enter__(self) -> "ApiClient":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _request(self,
+                 method: str,
+                 path: str,
+                 params: Optional[Dict[str, Any]] = None,
+                 headers: Optional[Dict[str, Any]] = None,
+                 json: Any = None) -> Any:
+        params = {k: v for k, v in (params or {}).items() if v is not None}
+        headers = {k: str(v) for k, v in (headers or {}).items() if v is not None}
+        response = self._client.request(method, path, params=params, headers=headers, json=json)
+        if response.is_error:
+            raise ApiError(response.status_code, response.text)
+        if not response.content:
+            return None
+        try:
+            return response.json()
+        except ValueError:
+            return response.text
+
+    def get_users(self, limit: Optional[int] = None, cursor: Optional[str] = None) -> Any:
+        """
+        Calls GET /v1/users for the CRM sync.
+
+        Args:
+            limit: Page size
+        """
+        return self._request("GET", "/v1/users", params={"limit": limit, "cursor": cursor})
+
+    def get_users_by_user_id(self, user_id: str) -> Any:
+        """
+        Calls GET /v1/users/{user_id} for the CRM sync.
+        """
+        return self._request("GET", f"/v1/users/{quote(str(user_id), safe='')}")
+
+    def create_users(self, name: str, email: str, idempotency_key: Optional[str] = None) -> Any:
+        """
+        Calls POST /v1/users for the CRM sync.
+        """
+        body = {k: v for k, v in {"name": name, "email": email}.items() if v is not None}
+        return self._request("POST", "/v1/users", headers={"Idempotency-Key": idempotency_key}, json=body)
+
+    def delete_users_by_user_id(self, user_id: str) -> Any:
+        """
+        Calls DELETE /v1/users/{user_id} for the CRM sync.
+        """
+        return self._request("DELETE", f"/v1/users/{quote(str(user_id), safe='')}")
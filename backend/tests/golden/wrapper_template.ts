@@ -0,0 +1,109 @@
+/**
+ * API client generated for: Sync users from our CRM
+ */
+
+type QueryValue = string | number | boolean | undefined | null;
+
+function env(name: string): string | undefined {
+  return typeof process !== "undefined" ? process.env[name] : undefined;
+}
+
+export class ApiError extends Error {
+  constructor(public readonly status: number, public readonly body: string) {
+    super(`API request failed with status ${status}: ${body.slice(0, 200)}`);
+    this.name = "ApiError";
+  }
+}
+
+export interface ApiClientOptions {
+  baseUrl?: string;
+  apiKey?: string;
+}
+
+export class ApiClient {
+  private readonly baseUrl: string;
+  private readonly apiKey: string;
+
+  constructor(options: ApiClientOptions = {}) {
+    this.baseUrl = (options.baseUrl ?? env("API_BASE_URL") ?? "https://api.example.test").replace(/\/+$/, "");
+    const apiKey = options.apiKey ?? env("API_KEY");
+    if (!apiKey) {
+      throw new Error("An API key is required (pass apiKey or set API_KEY)");
+    }
+    this.apiKey = apiKey;
+  }
+
+  private async request<T>(
+    method: string,
+    path: string,
+    query: Record<string, QueryValue> = {},
+    headers: Record<string, QueryValue> = {},
+    body?: unknown
+  ): Promise<T> {
+    const url = new URL(this.baseUrl + path);
+    const allQuery: Record<string, QueryValue> = { ...query };
+    for (const [key, value] of Object.entries(allQuery)) {
+      if (value !== undefined && value !== null) {
+        url.searchParams.set(key, String(value));
+      }
+    }
+    const requestHeaders: Record<string, string> = {
+      "X-Api-Key": this.apiKey,
+      Accept: "application/json",
+    };
+    for (const [key, value] of Object.entries(headers)) {
+      if (value !== undefined && value !== null) {
+        requestHeaders[key] = String(value);
+      }
+    }
+    if (body !== undefined) {
+      requestHeaders["Content-Type"] = "application/json";
+    }
+    const response = await fetch(url, {
+      method,
+      headers: requestHeaders,
+      body: body !== undefined ? JSON.stringify(body) : undefined,
+    });
+    const text = await response.text();
+    if (!response.ok) {
+      throw new ApiError(response.status, text);
+    }
+    if (!text) {
+      return undefined as T;
+    }
+    try {
+      return JSON.parse(text) as T;
+    } catch {
+      return text as unknown as T;
+    }
+  }
+
+  /**
+   * List users, newest first.
+   * @param params.limit Page size
+   */
+  async getUsers(params: { limit?: number; cursor?: string } = {}): Promise<unknown> {
+    return this.request("GET", `/v1/users`, { limit: params.limit, cursor: params.cursor }, {});
+  }
+
+  /**
+   * Fetch one user.
+   */
+  async getUsersByUserId(params: { user_id: string }): Promise<unknown> {
+    return this.request("GET", `/v1/users/${encodeURIComponent(String(params.user_id))}`, {}, {});
+  }
+
+  /**
+   * Create a user.
+   */
+  async createUsers(params: { name: string; email: string; "Idempotency-Key"?: string }): Promise<unknown> {
+    return this.request("POST", `/v1/users`, {}, { "Idempotency-Key": params["Idempotency-Key"] }, { name: params.name, email: params.email });
+  }
+
+  /**
+   * Delete a user and their data.
+   */
+  async deleteUsersByUserId(params: { user_id: string }): Promise<unknown> {
+    return this.request("DELETE", `/v1/users/${encodeURIComponent(String(params.user_id))}`, {}, {});
+  }
+}
@@ -0,0 +1,53 @@
+import os
+import time
+from pathlib import Path
+
+from app.services.analysis_store import DEFAULT_RECORDS_PATH, AnalysisStore, RecordStore
+from app.services.cache import LayeredCache
+
+
+def save(records, count):
+    for n in range(count):
+        records.save_snapshot(f"http://docs{n}.example.test/api", {"n": n})
+
+
+def test_default_records_path_does_not_depend_on_the_working_directory():
+    assert os.path.isabs(DEFAULT_RECORDS_PATH)
+    assert Path(DEFAULT_RECORDS_PATH).parent == Path(__file__).resolve().parent.parent
+
+
+def test_purge_drops_old_snapshots(tmp_path):
+    records = RecordStore(str(tmp_path / "records.db"))
+    save(records, 3)
+    cutoff = time.time()
+    records.save_snapshot("http://new.example.test/api", {"n": 3})
+
+    assert records.purge_snapshots(cutoff) == 3
+    assert records.get_snapshot("http://docs0.example.test/api") is None
+    assert records.get_snapshot("http://new.example.test/api") == {"n": 3}
+    records.close()
+
+
+def test_purge_keeps_the_most_recently_saved_snapshots(tmp_path):
+    records = RecordStore(str(tmp_path / "records.db"))
+    save(records, 5)
+    # Saving again makes the first URL the newest
+    records.save_snapshot("http://docs0.example.test/api", {"n": 0})
+
+    assert records.purge_snapshots(0, max_rows=3) == 2
+    kept = [n for n in range(5) if records.get_snapshot(f"http://docs{n}.example.test/api") is not None]
+    assert kept == [0, 3, 4]
+    records.close()
+
+
+def test_store_purges_snapshots_on_start(tmp_path):
+    path = str(tmp_path / "records.db")
+    records = RecordStore(path)
+    save(records, 4)
+    records.close()
+
+    store = AnalysisStore(LayeredCache(), records=RecordStore(path), max_snapshots=2)
+    remaining = [n for n in range(4) if store.records.get_snapshot(f"http://docs{n}.example.test/api")]
+    store.close()
+
+    assert remaining == [2, 3]
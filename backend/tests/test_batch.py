@@ -0,0 +1,63 @@
+import asyncio
+import json
+
+from app.models.schemas import ApiRequest
+from app.services.batch import BatchRunner, completed_keys, job_key
+
+
+class FakeExtractor:
+    async def extract(self, url, **kwargs):
+        return {"url": url}
+
+
+class FakeGenerator:
+    """Fails the use cases in failing; records every use case it is asked for"""
+
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.use_cases = []
+
+    async def process_api_documentation(self, extracted_data, use_case, language, **kwargs):
+        self.use_cases.append(use_case)
+        if use_case in self.failing:
+            raise RuntimeError("model unavailable")
+        return {"endpoints": [], "auth_methods": [], "suggested_integration": use_case, "wrapper_code": ""}
+
+
+def make_jobs():
+    return [ApiRequest(documentation_url=f"http://docs{n}.example.test/api", use_case=f"case {n}",
+                       preferred_language="python") for n in range(3)]
+
+
+def test_rerun_skips_jobs_that_succeeded(tmp_path):
+    output = str(tmp_path / "results.jsonl")
+    jobs = make_jobs()
+
+    generator = FakeGenerator(failing={"case 1"})
+    counts = asyncio.run(BatchRunner(FakeExtractor(), generator).run_to_file(jobs, output))
+    assert counts == {"skipped": 0, "ok": 2, "error": 1}
+    assert completed_keys(output) == {job_key(jobs[0]), job_key(jobs[2])}
+
+    generator = FakeGenerator()
+    counts = asyncio.run(BatchRunner(FakeExtractor(), generator).run_to_file(jobs, output))
+    assert counts == {"skipped": 2, "ok": 1, "error": 0}
+    assert generator.use_cases == ["case 1"]
+    assert completed_keys(output) == {job_key(job) for job in jobs}
+
+
+def test_completed_keys_ignores_a_truncated_last_line(tmp_path):
+    output = tmp_path / "results.jsonl"
+    done, cut_off = make_jobs()[:2]
+    output.write_text(
+        json.dumps({"key": job_key(done), "status": "ok"}) + "\n"
+        + json.dumps({"key": job_key(cut_off), "status": "ok"})[:20]
+    )
+
+    assert completed_keys(str(output)) == {job_key(done)}
+    assert completed_keys(str(tmp_path / "missing.jsonl")) == set()
+
+
+def test_job_key_ignores_options_that_do_not_change_the_job():
+    job = make_jobs()[0]
+    assert job_key(job) == job_key(job.model_copy(update={"use_cache": False}))
+    assert job_key(job) != job_key(job.model_copy(update={"preferred_language": "go"}))
@@ -0,0 +1,196 @@
+import asyncio
+import hashlib
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from app.services.cache import LayeredCache, MemoryCache, SQLiteCache
+from app.services.extractor import ApiExtractor
+
+
+def test_memory_entries_expire():
+    cache = MemoryCache()
+    cache.set("short", '"a"', ttl=0.05)
+    cache.set("long", '"b"', ttl=60)
+    assert cache.get("short") == '"a"'
+
+    time.sleep(0.1)
+
+    assert cache.get("short") is None
+    assert cache.get("long") == '"b"'
+    assert len(cache) == 1
+    assert cache.total_bytes == 3
+
+
+def test_memory_evicts_least_recently_used_entries():
+    cache = MemoryCache(max_entries=2)
+    cache.set("a", "1", ttl=60)
+    cache.set("b", "2", ttl=60)
+    cache.get("a")
+    cache.set("c", "3", ttl=60)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "1"
+    assert cache.get("c") == "3"
+
+
+def test_memory_evicts_down_to_max_bytes():
+    cache = MemoryCache(max_bytes=10)
+    cache.set("a", "aaaa", ttl=60)
+    cache.set("b", "bbbb", ttl=60)
+    cache.set("c", "cccc", ttl=60)
+
+    assert cache.get("a") is None
+    assert cache.total_bytes == 8
+
+    # Replacing an entry counts only its new size
+    cache.set("c", "cc", ttl=60)
+    assert cache.total_bytes == 6
+    # An entry larger than the whole cache is not stored and evicts nothing
+    cache.set("huge", "x" * 11, ttl=60)
+    assert cache.get("huge") is None
+    assert len(cache) == 2
+
+
+def test_sqlite_entries_expire(tmp_path):
+    cache = SQLiteCache(str(tmp_path / "cache.db"))
+    cache.set("short", '"a"', ttl=0.05)
+    cache.set("long", '"b"', ttl=60)
+
+    time.sleep(0.1)
+
+    assert cache.get("short") is None
+    payload, expires_at = cache.get_entry("long")
+    assert payload == '"b"' and expires_at > time.time() + 50
+    cache.close()
+
+
+def test_purge_removes_expired_rows(tmp_path):
+    cache = SQLiteCache(str(tmp_path / "cache.db"))
+    for n in range(3):
+        cache.set(f"old{n}", "x", ttl=-1)
+    cache.set("new", "x", ttl=60)
+
+    assert cache.purge_expired() == 3
+    assert cache.get("new") == "x"
+    cache.close()
+
+
+def test_purge_trims_to_max_rows_keeping_the_latest_expiry(tmp_path):
+    cache = SQLiteCache(str(tmp_path / "cache.db"), max_rows=3)
+    for n in range(5):
+        cache.set(f"k{n}", "x", ttl=60 + n)
+
+    assert cache.purge_expired() == 2
+    assert [cache.get(f"k{n}") for n in range(5)] == [None, None, "x", "x", "x"]
+    cache.close()
+
+
+def test_purge_trims_to_max_bytes(tmp_path):
+    cache = SQLiteCache(str(tmp_path / "cache.db"), max_bytes=25)
+    for n in range(4):
+        # Five two-byte characters: ten bytes of payload
+        cache.set(f"k{n}", "é" * 5, ttl=60 + n)
+
+    assert cache.purge_expired() == 2
+    assert [cache.get(f"k{n}") is not None for n in range(4)] == [False, False, True, True]
+    cache.close()
+
+
+def test_layered_cache_reads_through_to_disk(tmp_path):
+    path = str(tmp_path / "cache.db")
+
+    async def main():
+        first = LayeredCache(disk=SQLiteCache(path), memory_ttl=0.1)
+        second = LayeredCache(disk=SQLiteCache(path), memory_ttl=0.1)
+        try:
+            await first.set("gemini", "k", {"text": "one"})
+            assert await second.get("gemini", "k") == {"text": "one"}
+            assert await second.get("gemini", "k") == {"text": "one"}
+            counters = second.stats()["namespaces"]["gemini"]
+            assert (counters["disk_hits"], counters["memory_hits"]) == (1, 1)
+
+            # Another process rewrites the entry; the memory copy is used until memory_ttl passes
+            await second.set("gemini", "k", {"text": "two"})
+            assert await first.get("gemini", "k") == {"text": "one"}
+            await asyncio.sleep(0.15)
+            assert await first.get("gemini", "k") == {"text": "two"}
+
+            await first.delete("gemini", "k")
+            assert await first.get("gemini", "k") is None
+            assert first.stats()["namespaces"]["gemini"]["misses"] == 1
+        finally:
+            first.close()
+            second.close()
+
+    asyncio.run(main())
+
+
+def test_layered_cache_without_disk_keeps_the_full_ttl():
+    async def main():
+        cache = LayeredCache(memory_ttl=0.05)
+        await cache.set("extraction", "k", [1, 2])
+        await asyncio.sleep(0.1)
+        assert await cache.get("extraction", "k") == [1, 2]
+        assert cache.stats()["disk_enabled"] is False
+
+    asyncio.run(main())
+
+
+class EtagHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    body = b""
+    statuses = []
+
+    def do_GET(self):
+        etag = '"{}"'.format(hashlib.sha256(self.body).hexdigest()[:16])
+        if self.headers.get("If-None-Match") == etag:
+            self.statuses.append(304)
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.statuses.append(200)
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def test_extractor_revalidates_with_the_etag():
+    page = "<html><body><h1>API</h1><p>Use GET /v1/{} to list them.</p></body></html>"
+    handler = type("Handler", (EtagHandler,), {"body": page.format("users").encode(), "statuses": []})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = "http://{}:{}/api".format(*server.server_address[:2])
+
+    async def main():
+        extractor = ApiExtractor(cache=LayeredCache())
+        # Always revalidate instead of serving the cached page as fresh
+        extractor.fresh_seconds = 0
+        try:
+            first = await extractor.extract_from_url(url)
+            second = await extractor.extract_from_url(url)
+            handler.body = page.format("orders").encode()
+            third = await extractor.extract_from_url(url)
+            return first, second, third
+        finally:
+            await extractor.aclose()
+
+    try:
+        first, second, third = asyncio.run(main())
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert handler.statuses == [200, 304, 200]
+    assert second == first
+    assert "/v1/users" in first["raw_text"]
+    assert "/v1/orders" in third["raw_text"]
@@ -0,0 +1,82 @@
+"""
+Template wrapper output compared against the files in tests/golden.
+
+After an intended change to the templates, regenerate the files with
+UPDATE_GOLDEN=1 python -m pytest tests/test_codegen_golden.py and review the diff.
+"""
+import os
+from pathlib import Path
+
+import pytest
+
+from app.models.schemas import AnalysisEndpoint, AuthMethod
+from app.services.codegen import client_methods, render_wrapper
+from app.services.generator import WrapperGenerator
+
+GOLDEN_DIR = Path(__file__).resolve().parent / "golden"
+EXTENSIONS = {"python": "py", "typescript": "ts"}
+
+ENDPOINTS = [
+    AnalysisEndpoint(
+        path="/v1/users", method="GET", description="List users, newest first.",
+        parameters=[
+            {"name": "limit", "location": "query", "type": "integer", "description": "Page size"},
+            {"name": "cursor", "location": "query", "type": "string"},
+        ],
+        response_example='{"users": [{"id": "u_1", "name": "Ada"}], "next_cursor": null}'
+    ),
+    AnalysisEndpoint(
+        path="/v1/users/{user_id}", method="GET", description="Fetch one user.",
+        parameters=[{"name": "user_id", "location": "path", "type": "string", "required": True}]
+    ),
+    AnalysisEndpoint(
+        path="/v1/users", method="POST", description="Create a user.",
+        parameters=[
+            {"name": "name", "location": "body", "type": "string", "required": True},
+            {"name": "email", "location": "body", "type": "string", "required": True},
+            {"name": "Idempotency-Key", "location": "header", "type": "string"},
+        ]
+    ),
+    AnalysisEndpoint(
+        path="/v1/users/{user_id}", method="DELETE", description="Delete a user and their data.",
+        parameters=[{"name": "user_id", "location": "path", "type": "string", "required": True}]
+    ),
+]
+AUTH_METHODS = [AuthMethod(type="API Key", description="Send the key in the 'X-Api-Key' header")]
+USE_CASE = "Sync users from our CRM"
+BASE_URL = "https://api.example.test"
+
+
+def endpoints():
+    return [WrapperGenerator.normalize_endpoint(e.model_dump()) for e in ENDPOINTS]
+
+
+def docstrings():
+    """What the model would write in hybrid mode, fixed"""
+    return {method["name"]: f"Calls {method['http_method']} {method['path']} for the CRM sync."
+            for method in client_methods(endpoints())}
+
+
+@pytest.mark.parametrize("language", sorted(EXTENSIONS))
+@pytest.mark.parametrize("mode", ["template", "hybrid"])
+def test_wrapper_matches_golden_file(language, mode):
+    code = render_wrapper(
+        language, endpoints(), [a.model_dump() for a in AUTH_METHODS], USE_CASE, BASE_URL,
+        docstrings() if mode == "hybrid" else None
+    )
+    golden = GOLDEN_DIR / f"wrapper_{mode}.{EXTENSIONS[language]}"
+    if os.getenv("UPDATE_GOLDEN"):
+        golden.parent.mkdir(exist_ok=True)
+        golden.write_text(code, encoding="utf-8")
+    assert code == golden.read_text(encoding="utf-8")
+
+
+def test_python_wrappers_compile():
+    for mode in ("template", "hybrid"):
+        compile((GOLDEN_DIR / f"wrapper_{mode}.py").read_text(encoding="utf-8"), f"wrapper_{mode}.py", "exec")
+
+
+def test_output_is_deterministic():
+    first = render_wrapper("python", endpoints(), [a.model_dump() for a in AUTH_METHODS], USE_CASE, BASE_URL)
+    second = render_wrapper("py", endpoints(), [a.model_dump() for a in AUTH_METHODS], USE_CASE, BASE_URL)
+    assert first == second
@@ -0,0 +1,108 @@
+import asyncio
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+import pytest
+
+from app.services.extractor import ApiExtractor
+from app.services.gemini_service import GeminiService
+
+MODEL_SECONDS = 0.3
+PAGE = (b"<html><body><h1>API</h1><p>Authenticate with an API key.</p>"
+        b"<h2>Users</h2><p>GET /v1/users lists users.</p></body></html>")
+
+
+class AsyncModel:
+    """Model with the SDK's async generation"""
+
+    async def generate_content_async(self, prompt, **kwargs):
+        await asyncio.sleep(MODEL_SECONDS)
+        return SimpleNamespace(text="ok", usage_metadata=None)
+
+
+class BlockingModel:
+    """Model of an SDK release without async generation; the service runs it in its executor"""
+
+    def generate_content(self, prompt, **kwargs):
+        time.sleep(MODEL_SECONDS)
+        return SimpleNamespace(text="ok", usage_metadata=None)
+
+
+class SlowPageHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        time.sleep(MODEL_SECONDS)
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(PAGE)))
+        self.end_headers()
+        self.wfile.write(PAGE)
+
+    def log_message(self, format, *args):
+        pass
+
+
+async def timed_with_loop_lag(calls):
+    """Run the calls concurrently; return the elapsed seconds and the longest event loop stall"""
+    lag = 0.0
+    done = False
+
+    async def ticker():
+        nonlocal lag
+        while not done:
+            before = time.perf_counter()
+            await asyncio.sleep(0.01)
+            lag = max(lag, time.perf_counter() - before - 0.01)
+
+    watcher = asyncio.create_task(ticker())
+    start = time.perf_counter()
+    await asyncio.gather(*calls)
+    elapsed = time.perf_counter() - start
+    done = True
+    await watcher
+    return elapsed, lag
+
+
+@pytest.mark.parametrize("model", [AsyncModel(), BlockingModel()], ids=["async", "executor"])
+def test_concurrent_model_calls_overlap(model):
+    service = GeminiService(cache=None)
+    service.model = model
+    service.hedge = False
+
+    async def main():
+        try:
+            return await timed_with_loop_lag(
+                service.generate_text(f"prompt {n}", use_cache=False) for n in range(4)
+            )
+        finally:
+            await service.aclose()
+
+    elapsed, lag = asyncio.run(main())
+
+    # One after another would take 4 * MODEL_SECONDS
+    assert elapsed < 2 * MODEL_SECONDS
+    assert lag < 0.1
+
+
+def test_concurrent_fetches_overlap():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), SlowPageHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = "http://{}:{}/docs".format(*server.server_address[:2])
+
+    async def main():
+        extractor = ApiExtractor()
+        try:
+            return await timed_with_loop_lag(extractor.extract_from_url(url, use_cache=False) for _ in range(4))
+        finally:
+            await extractor.aclose()
+
+    try:
+        elapsed, lag = asyncio.run(main())
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert elapsed < 2 * MODEL_SECONDS
+    assert lag < 0.1
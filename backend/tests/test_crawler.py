@@ -0,0 +1,133 @@
+import asyncio
+import random
+import re
+
+import httpx
+import pytest
+
+from app.services.crawler import DocCrawler, simhash
+from benchmarks.doc_server import DocServer
+
+_HREF_RE = re.compile(r'href="([^"]*)"')
+_TAG_RE = re.compile(r"<[^>]+>")
+_WORDS = ("request", "token", "user", "account", "limit", "page", "error", "field", "value", "order",
+          "invoice", "webhook", "event", "retry", "header", "scope", "client", "secret", "status", "query")
+
+
+def doc_page(seed: int, links=(), words: int = 300) -> str:
+    rng = random.Random(seed)
+    text = " ".join(rng.choice(_WORDS) for _ in range(words))
+    anchors = "".join(f'<a href="{link}">{link}</a>' for link in links)
+    return f"<html><body><nav>{anchors}</nav><p>{text}</p></body></html>"
+
+
+async def parse_page(html: str, url: str):
+    return url, _TAG_RE.sub(" ", html), _HREF_RE.findall(html)
+
+
+def crawl(start_url: str, **options):
+    async def main():
+        async with httpx.AsyncClient(follow_redirects=True) as session:
+            crawler = DocCrawler(session, **{"delay": 0.0, **options})
+            return await crawler.crawl(start_url, parse_page)
+
+    pages, stats = asyncio.run(main())
+    return [url for url, _ in pages], stats.to_dict()
+
+
+@pytest.fixture
+def server_factory():
+    servers = []
+
+    def start(pages, **options) -> DocServer:
+        server = DocServer(pages, **options)
+        server.start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.stop()
+
+
+def test_robots_disallow_is_honoured(server_factory):
+    server = server_factory(
+        {"index": doc_page(0, ["guide", "private-keys"]), "guide": doc_page(1), "private-keys": doc_page(2)},
+        robots="User-agent: *\nDisallow: /docs/private\n"
+    )
+
+    urls, stats = crawl(f"{server.base_url}/docs/index")
+
+    assert urls == [f"{server.base_url}/docs/index", f"{server.base_url}/docs/guide"]
+    assert stats["pages_skipped_robots"] == 1
+
+    urls, stats = crawl(f"{server.base_url}/docs/index", respect_robots=False)
+    assert f"{server.base_url}/docs/private-keys" in urls
+    assert stats["pages_skipped_robots"] == 0
+
+
+def test_stays_on_origin_after_redirects(server_factory):
+    other = server_factory({"elsewhere": doc_page(10)})
+    server = server_factory(
+        {"index": doc_page(0, ["guide", f"{other.base_url}/docs/elsewhere", "/leave"]), "guide": doc_page(1)},
+        redirects={"/start": "/docs/index", "/leave": f"{other.base_url}/docs/elsewhere"}
+    )
+
+    urls, stats = crawl(f"{server.base_url}/start")
+
+    # Relative links resolve against the redirect target, /docs/, not against /start
+    assert urls == [f"{server.base_url}/docs/index", f"{server.base_url}/docs/guide"]
+    # The direct off-origin link is never requested; the one that redirects off origin is dropped
+    assert stats["pages_fetched"] == 2
+    assert stats["pages_skipped_offsite"] == 1
+
+
+def test_start_redirect_to_another_origin_sets_the_origin(server_factory):
+    target = server_factory({"index": doc_page(0, ["guide"]), "guide": doc_page(1)})
+    entry = server_factory({}, redirects={"/docs": f"{target.base_url}/docs/index"})
+
+    urls, _ = crawl(f"{entry.base_url}/docs")
+
+    assert urls == [f"{target.base_url}/docs/index", f"{target.base_url}/docs/guide"]
+
+
+def test_depth_and_page_limits(server_factory):
+    pages = {f"p{i}": doc_page(i, [f"p{i + 1}"]) for i in range(5)}
+    pages["p0"] = doc_page(0, ["p1", "q1", "q2"])
+    pages.update({"q1": doc_page(11), "q2": doc_page(12)})
+    server = server_factory(pages)
+    start = f"{server.base_url}/docs/p0"
+
+    urls, _ = crawl(start, max_depth=2)
+    assert [url.rsplit("/", 1)[1] for url in urls] == ["p0", "p1", "q1", "q2", "p2"]
+
+    urls, _ = crawl(start, max_depth=0)
+    assert urls == [start]
+
+    urls, stats = crawl(start, max_depth=5, max_pages=3)
+    assert len(urls) == 3
+    assert stats["pages_fetched"] == 3
+
+
+def test_near_duplicate_pages_are_skipped(server_factory):
+    original = doc_page(1, words=2000)
+    # One word added: a mirror or versioned copy of the same page
+    near_copy = original.replace("<p>", "<p>changelog ", 1)
+    assert 0 < bin(simhash(_TAG_RE.sub(" ", original)) ^ simhash(_TAG_RE.sub(" ", near_copy))).count("1") <= 3
+    server = server_factory({
+        "index": doc_page(0, ["v1", "v2", "other"]), "v1": original, "v2": near_copy, "other": doc_page(2)
+    })
+
+    urls, stats = crawl(f"{server.base_url}/docs/index")
+
+    assert [url.rsplit("/", 1)[1] for url in urls] == ["index", "v1", "other"]
+    assert stats["pages_skipped_duplicate"] == 1
+
+
+def test_pages_are_cut_off_at_max_bytes(server_factory):
+    server = server_factory({"index": doc_page(0, words=20000)})
+
+    urls, stats = crawl(f"{server.base_url}/docs/index", max_bytes=4096)
+
+    assert len(urls) == 1
+    assert stats["bytes_fetched"] == 4096
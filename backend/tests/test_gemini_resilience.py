@@ -0,0 +1,155 @@
+import asyncio
+import time
+
+import pytest
+
+from app.services.gemini_service import GeminiService
+from app.services.rate_limit import RateLimiter
+from app.services.resilience import CircuitBreaker, CircuitOpen, RetryBudget
+from benchmarks.fakes import FakeGenerativeModel, FakeServerError, install_fake_model
+
+
+def make_service(monkeypatch, **settings) -> GeminiService:
+    monkeypatch.setenv("GEMINI_BREAKER_FAILURES", str(settings.pop("breaker_failures", 5)))
+    monkeypatch.setenv("GEMINI_BREAKER_RESET_SECONDS", str(settings.pop("breaker_reset", 30)))
+    service = GeminiService(cache=None, rate_limiter=RateLimiter())
+    service.fallback_model_name = None
+    service.backoff_base = 0.001
+    service.backoff_cap = 0.002
+    service.hedge = False
+    for name, value in settings.items():
+        setattr(service, name, value)
+    return service
+
+
+class ScriptedModel(FakeGenerativeModel):
+    """Fake model whose nth call takes delays[n] seconds, recording the calls that were cancelled"""
+
+    def __init__(self, delays):
+        super().__init__(latency=0.0)
+        self.delays = list(delays)
+        self.cancelled = 0
+
+    def _delay(self) -> float:
+        return self.delays[self.calls - 1]
+
+    async def generate_content_async(self, *args, **kwargs):
+        try:
+            return await super().generate_content_async(*args, **kwargs)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+
+
+def test_breaker_opens_then_lets_one_probe_through(monkeypatch):
+    service = make_service(monkeypatch, max_attempts=1, breaker_failures=3, breaker_reset=0.2)
+    model = install_fake_model(service, FakeGenerativeModel(latency=0.0, down=True))
+
+    async def main():
+        for _ in range(3):
+            with pytest.raises(FakeServerError):
+                await service.generate_text("prompt", use_cache=False)
+        assert service.circuit_states() == {service.model_name: "open"}
+
+        # While open, calls are refused without reaching the model
+        with pytest.raises(CircuitOpen) as refused:
+            await service.generate_text("prompt", use_cache=False)
+        assert refused.value.retry_after >= 1
+        assert model.calls == 3
+
+        # After the reset period one probe goes through; its success closes the circuit
+        await asyncio.sleep(0.25)
+        model.down = False
+        assert await service.generate_text("prompt", use_cache=False)
+        assert model.calls == 4
+        assert service.circuit_states() == {service.model_name: "closed"}
+
+    asyncio.run(main())
+
+
+def test_half_open_breaker_allows_a_single_probe_and_reopens_on_failure():
+    breaker = CircuitBreaker("model", failure_threshold=2, reset_seconds=0.05)
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == "open" and not breaker.allow()
+
+    time.sleep(0.06)
+    assert breaker.allow()
+    assert breaker.state == "half_open"
+    assert not breaker.allow()
+
+    breaker.record_failure()
+    assert breaker.state == "open" and not breaker.allow()
+
+
+def test_retries_stop_when_the_budget_runs_out(monkeypatch):
+    service = make_service(monkeypatch, max_attempts=5, breaker_failures=100)
+    service.retry_budget = RetryBudget(ratio=0.0, min_per_second=0.0, max_tokens=2)
+    model = install_fake_model(service, FakeGenerativeModel(latency=0.0, down=True))
+
+    async def main():
+        with pytest.raises(FakeServerError):
+            await service.generate_text("prompt", use_cache=False)
+        # The first attempt plus the two retries the budget held, not max_attempts
+        assert model.calls == 3
+
+        with pytest.raises(FakeServerError):
+            await service.generate_text("prompt", use_cache=False)
+        assert model.calls == 4
+
+    asyncio.run(main())
+
+
+def test_hedge_wins_and_the_slow_attempt_is_cancelled(monkeypatch):
+    service = make_service(monkeypatch, max_attempts=1, hedge=True, hedge_min_delay=0.05)
+    model = install_fake_model(service, ScriptedModel([5.0, 0.01]))
+    for _ in range(service.latency.min_samples):
+        service.latency.observe("analysis", 0.01)
+
+    async def main():
+        start = time.perf_counter()
+        text = await service.generate_text("prompt", use_cache=False, stage="analysis")
+        elapsed = time.perf_counter() - start
+        assert text
+        assert elapsed < 1.0
+        assert model.calls == 2
+        assert model.cancelled == 1
+
+    asyncio.run(main())
+
+
+def test_no_hedge_without_latency_history(monkeypatch):
+    service = make_service(monkeypatch, max_attempts=1, hedge=True, hedge_min_delay=0.01)
+    model = install_fake_model(service, ScriptedModel([0.1]))
+
+    asyncio.run(service.generate_text("prompt", use_cache=False, stage="analysis"))
+    assert model.calls == 1
+
+
+def test_falls_back_to_the_secondary_model(monkeypatch):
+    service = make_service(monkeypatch, max_attempts=2)
+    primary = FakeGenerativeModel(latency=0.0, down=True)
+    fallback = FakeGenerativeModel(latency=0.0)
+    install_fake_model(service, primary, fallback=fallback)
+
+    text = asyncio.run(service.generate_text("Use GET /v1/items", use_cache=False))
+    assert text
+    assert primary.calls == 2
+    assert fallback.calls == 1
+
+
+def test_non_retryable_errors_are_not_retried_or_sent_to_the_fallback(monkeypatch):
+    service = make_service(monkeypatch, max_attempts=3)
+    primary = FakeGenerativeModel(latency=0.0)
+    fallback = FakeGenerativeModel(latency=0.0)
+    install_fake_model(service, primary, fallback=fallback)
+
+    async def bad_request(*args, **kwargs):
+        primary.calls += 1
+        raise FakeServerError(code=400)
+    primary.generate_content_async = bad_request
+
+    with pytest.raises(FakeServerError):
+        asyncio.run(service.generate_text("prompt", use_cache=False))
+    assert primary.calls == 1
+    assert fallback.calls == 0
@@ -0,0 +1,70 @@
+from app.services.html_scanner import MAX_SECTION_CHARS, scan_html, split_text
+
+
+def squashed(text):
+    return " ".join(text.split())
+
+
+def test_empty_and_blank_input_give_no_pieces():
+    assert split_text("", 100) == []
+    assert split_text("   \n ", 100) == []
+
+
+def test_short_input_is_one_piece():
+    assert split_text("  GET /v1/users lists users.  ", 100) == ["GET /v1/users lists users."]
+
+
+def test_input_at_the_limit_is_not_split():
+    text = "x" * 100
+    assert split_text(text, 100) == [text]
+
+
+def test_pieces_break_after_the_separator():
+    sentences = [f"Sentence number {i} about the users endpoint." for i in range(40)]
+    pieces = split_text(" ".join(sentences), 200)
+    assert len(pieces) > 1
+    for piece in pieces:
+        assert len(piece) <= 200
+        assert piece.endswith(".")
+        # Every piece starts at the beginning of a sentence
+        assert piece.startswith("Sentence number")
+
+
+def test_pieces_do_not_overlap_or_drop_text():
+    text = " ".join(f"Step {i}. Call POST /v1/orders/{i} with the order body." for i in range(100))
+    pieces = split_text(text, 300)
+    assert squashed(" ".join(pieces)) == squashed(text)
+    # No piece repeats the end of the one before it
+    for before, after in zip(pieces, pieces[1:]):
+        assert not before.endswith(after[:20])
+
+
+def test_text_without_separator_is_cut_at_the_limit():
+    text = "a" * 250
+    assert split_text(text, 100) == ["a" * 100, "a" * 100, "a" * 50]
+
+
+def test_separator_early_in_the_piece_is_ignored():
+    # Breaking at the only separator would leave a tiny first piece, so the text is cut at the limit
+    text = "Hi. " + "b" * 300
+    pieces = split_text(text, 100)
+    assert pieces[0] == text[:100]
+    assert squashed("".join(pieces)) == squashed(text)
+
+
+def test_code_is_split_on_lines():
+    code = "\n".join(f"line_{i} = call_api({i})" for i in range(400))
+    pieces = split_text(code, 500, sep="\n")
+    assert all(len(piece) <= 500 for piece in pieces)
+    assert all(piece.startswith("line_") for piece in pieces)
+    assert "\n".join(pieces) == code
+
+
+def test_long_sections_are_split_under_their_heading():
+    paragraph = " ".join(f"The widgets endpoint returns page {i} of results." for i in range(200))
+    result = scan_html(f"<html><body><h2>Widgets</h2><p>{paragraph}</p><h2>Auth</h2><p>Use a key.</p></body></html>")
+    widgets = [s for s in result["sections"] if s["heading"] == "Widgets"]
+    assert len(widgets) > 1
+    assert all(len(s["text"]) <= MAX_SECTION_CHARS for s in widgets)
+    assert squashed(" ".join(s["text"] for s in widgets)) == squashed(paragraph)
+    assert [s["text"] for s in result["sections"] if s["heading"] == "Auth"] == ["Use a key."]
@@ -0,0 +1,130 @@
+import asyncio
+
+import httpx
+
+from app.services.incremental import auth_mentioned, merge_analysis
+from benchmarks.doc_server import DocServer
+from benchmarks.fakes import FakeGenerativeModel, install_fake_model
+
+API_KEY = {"type": "API Key", "description": "X-Api-Key header"}
+BEARER = {"type": "Bearer Token", "description": "Authorization: Bearer <token>"}
+OAUTH = {"type": "OAuth 2.0", "description": "Client credentials"}
+USERS = {"method": "GET", "path": "/v1/users", "description": "List users"}
+
+
+def test_auth_mentioned_uses_the_distinctive_words():
+    assert auth_mentioned("Bearer Token", "Send the bearer header with every request")
+    assert auth_mentioned("OAuth 2.0", "Get an access token from the OAuth2 endpoint")
+    assert auth_mentioned("API Key", "Pass your API key in X-Api-Key")
+    assert not auth_mentioned("Basic Auth", "Authentication uses a token")
+
+
+def test_merge_drops_auth_only_documented_in_changed_sections():
+    previous = [USERS], [API_KEY, BEARER]
+    unchanged_text = "Users\nGET /v1/users lists users. Pass your API key in X-Api-Key."
+
+    endpoints, auth = merge_analysis(previous, ([], [OAUTH]), [], unchanged_text, unchanged_text)
+
+    assert endpoints == [USERS]
+    # The bearer section was rewritten to describe OAuth; the API key section did not change
+    assert [a["type"] for a in auth] == ["API Key", "OAuth 2.0"]
+
+
+def test_merge_keeps_auth_found_again():
+    previous = [USERS], [BEARER]
+    updated = dict(BEARER, description="Bearer token from the dashboard")
+
+    _, auth = merge_analysis(previous, ([], [updated]), [], "", "")
+
+    assert auth == [updated]
+
+
+def test_wrappers_are_reused_under_the_mode_actually_used():
+    """A language without a template is generated with the LLM whatever mode was asked for"""
+    from app.main import app
+
+    server = DocServer({"api": (
+        "<html><body><h1>API</h1><p>Authenticate with an API key header.</p>"
+        "<h2>Users</h2><p>Use GET /v1/users to list users.</p></body></html>"
+    )})
+    server.start()
+
+    async def main():
+        async with app.router.lifespan_context(app), httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url="http://test", timeout=None
+        ) as client:
+            model = FakeGenerativeModel(latency=0.0)
+            install_fake_model(app.state.services.gemini_service, model)
+
+            async def reanalyze(codegen_mode):
+                before = model.calls
+                response = await client.post("/api/reanalyze", json={
+                    "documentation_url": f"{server.base_url}/docs/api",
+                    "use_case": "list users",
+                    "preferred_language": "python",
+                    "additional_languages": ["go"],
+                    "codegen_mode": codegen_mode,
+                    "use_cache": False
+                })
+                assert response.status_code == 200, response.text
+                return model.calls - before
+
+            await reanalyze("template")
+            assert await reanalyze("template") == 0
+            # Only the Python wrapper changes mode; the Go wrapper was already made with the LLM
+            assert await reanalyze("llm") == 1
+
+    try:
+        asyncio.run(main())
+    finally:
+        server.stop()
+
+
+def test_stored_results_are_reused_only_while_auth_is_unchanged():
+    from app.main import app
+
+    page = ("<html><body><h1>API</h1><p>Authenticate with an API key header.</p>"
+            "<h2>Users</h2><p>Use GET /v1/users to list users.{}</p></body></html>")
+    server = DocServer({"api": page.format("")})
+    server.start()
+
+    async def main():
+        async with app.router.lifespan_context(app), httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url="http://test", timeout=None
+        ) as client:
+            install_fake_model(app.state.services.gemini_service, FakeGenerativeModel(latency=0.0))
+            store = app.state.services.analysis_store
+            url = f"{server.base_url}/docs/api"
+
+            async def reanalyze():
+                response = await client.post("/api/reanalyze", json={
+                    "documentation_url": url, "use_case": "list users", "preferred_language": "python",
+                    "codegen_mode": "llm", "use_cache": False
+                })
+                assert response.status_code == 200, response.text
+                return response.json()
+
+            await reanalyze()
+            # A stored suggestion may be empty; it is still used
+            snapshot = await store.get_snapshot(url)
+            snapshot["suggestions"]["python"] = ""
+            await store.save_snapshot(snapshot)
+            result = await reanalyze()
+            assert result["mode"] == "unchanged"
+            assert result["suggested_integration"] == ""
+
+            # Same auth type, other description: the stored wrapper is not reused
+            snapshot = await store.get_snapshot(url)
+            snapshot["auth_methods"][0]["description"] = "Key in the query string"
+            snapshot["wrappers"]["python:llm"] = "# stale"
+            await store.save_snapshot(snapshot)
+            server.httpd.RequestHandlerClass.pages["api"] = page.format(" Results are paginated.").encode()
+            result = await reanalyze()
+            assert result["mode"] == "incremental"
+            assert result["wrappers_regenerated"]
+            assert result["wrapper_code"] != "# stale"
+
+    try:
+        asyncio.run(main())
+    finally:
+        server.stop()
@@ -0,0 +1,185 @@
+import asyncio
+import os
+import subprocess
+import sys
+
+import httpx
+
+from app.models.schemas import ApiRequest, ApiResponse
+from app.services.jobs import JobQueue, MemoryJobStore, SQLiteJobStore, coalesce_key
+
+
+def make_request(use_case: str = "list users") -> ApiRequest:
+    return ApiRequest(documentation_url="http://docs.example.test/api", use_case=use_case,
+                      preferred_language="python")
+
+
+def make_runner(seconds: float = 0.05, calls=None):
+    async def run(request: ApiRequest) -> ApiResponse:
+        if calls is not None:
+            calls.append(request.use_case)
+        await asyncio.sleep(seconds)
+        return ApiResponse(endpoints=[], auth_methods=[], suggested_integration=request.use_case, wrapper_code="")
+    return run
+
+
+class FlakyStore(MemoryJobStore):
+    """MemoryJobStore whose saves fail for the given statuses"""
+
+    def __init__(self, failing_statuses):
+        super().__init__()
+        self.failing_statuses = set(failing_statuses)
+
+    def save(self, job):
+        if job["status"] in self.failing_statuses:
+            raise OSError("database is locked")
+        super().save(job)
+
+
+def test_watchers_get_the_final_state_when_saving_it_fails():
+    async def main():
+        queue = JobQueue(make_runner(), store=FlakyStore({"succeeded"}))
+        job, _ = await queue.submit(make_request())
+        statuses = [event["status"] async for event in queue.events(job["job_id"])]
+        await queue.aclose()
+        return statuses
+
+    statuses = asyncio.run(asyncio.wait_for(main(), 5))
+
+    assert statuses[-1] == "succeeded"
+
+
+def test_job_runs_when_saving_it_as_running_fails():
+    async def main():
+        store = FlakyStore({"running"})
+        queue = JobQueue(make_runner(), store=store)
+        job, _ = await queue.submit(make_request())
+        statuses = [event["status"] async for event in queue.events(job["job_id"])]
+        saved = store.get(job["job_id"])
+        await queue.aclose()
+        return statuses, saved
+
+    statuses, saved = asyncio.run(asyncio.wait_for(main(), 5))
+
+    assert statuses[-1] == "succeeded"
+    assert saved["status"] == "succeeded"
+
+
+def test_events_reads_the_job_when_no_notification_comes():
+    async def main():
+        queue = JobQueue(make_runner(0.3))
+        queue.watch_seconds = 0.05
+        job, _ = await queue.submit(make_request())
+        events = queue.events(job["job_id"])
+        assert (await anext(events))["status"] == "queued"
+        # Lose every notification; the job is still reported once it changes
+        queue._watchers.clear()
+        statuses = [event["status"] async for event in events]
+        await queue.aclose()
+        return statuses
+
+    statuses = asyncio.run(asyncio.wait_for(main(), 5))
+
+    assert statuses[-1] == "succeeded"
+
+
+def test_identical_requests_share_one_execution():
+    calls = []
+
+    async def main():
+        queue = JobQueue(make_runner(0.2, calls))
+        first, coalesced_first = await queue.submit(make_request())
+        # Asking for fresh results does not start a second execution of the same request
+        second, coalesced_second = await queue.submit(make_request().model_copy(update={"use_cache": False}))
+        other, coalesced_other = await queue.submit(make_request("create orders"))
+        assert [job["job_id"] for job in (first, second)] == [first["job_id"]] * 2
+        assert (coalesced_first, coalesced_second, coalesced_other) == (False, True, False)
+        assert other["job_id"] != first["job_id"]
+
+        [event async for event in queue.events(first["job_id"])]
+        # Once the job has finished, the same request runs again
+        again, coalesced_again = await queue.submit(make_request())
+        [event async for event in queue.events(again["job_id"])]
+        await queue.aclose()
+        return again, coalesced_again
+
+    again, coalesced_again = asyncio.run(asyncio.wait_for(main(), 5))
+
+    assert not coalesced_again
+    assert sorted(calls) == ["create orders", "list users", "list users"]
+
+
+def test_full_queue_answers_429_with_retry_after(monkeypatch):
+    from app.main import app
+
+    monkeypatch.setenv("JOB_WORKERS", "1")
+    monkeypatch.setenv("JOB_MAX_QUEUED", "1")
+
+    async def main():
+        async with app.router.lifespan_context(app), httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url="http://test"
+        ) as client:
+            queue = app.state.services.job_queue
+            queue.run = make_runner(1.0)
+
+            async def submit(use_case):
+                return await client.post("/api/jobs", json=make_request(use_case).model_dump(mode="json"))
+
+            running = (await submit("first")).json()
+            while (await client.get(f"/api/jobs/{running['job_id']}")).json()["status"] != "running":
+                await asyncio.sleep(0.01)
+            queued = await submit("second")
+            rejected = await submit("third")
+            # An identical request joins the queued job even though the queue is full
+            coalesced = await submit("second")
+            return queued, rejected, coalesced
+
+    queued, rejected, coalesced = asyncio.run(asyncio.wait_for(main(), 10))
+
+    assert queued.status_code == 202
+    assert rejected.status_code == 429
+    assert int(rejected.headers["Retry-After"]) >= 1
+    assert "full" in rejected.json()["detail"]
+    assert coalesced.status_code == 202
+    assert coalesced.json() == {**queued.json(), "coalesced": True}
+
+
+def test_unfinished_jobs_are_requeued_on_restart(tmp_path):
+    path = str(tmp_path / "jobs.db")
+    # A server process that has exited since
+    dead = subprocess.Popen([sys.executable, "-c", "pass"])
+    dead.wait()
+
+    def stored_job(use_case, status, owner):
+        request = make_request(use_case)
+        job = JobQueue(make_runner())._new_job(coalesce_key(request), request)
+        job.update(status=status, owner=owner, started_at=job["created_at"] if status == "running" else None)
+        return job
+
+    crashed = stored_job("crashed while running", "running", dead.pid)
+    waiting = stored_job("waiting in the queue", "queued", dead.pid)
+    # Still being run by another live worker process
+    elsewhere = stored_job("running elsewhere", "running", os.getppid())
+    store = SQLiteJobStore(path)
+    for job in (crashed, waiting, elsewhere):
+        store.save(job)
+    store.close()
+
+    calls = []
+
+    async def main():
+        queue = JobQueue(make_runner(calls=calls), store=SQLiteJobStore(path))
+        await queue.start()
+        finished = []
+        for job in (crashed, waiting):
+            finished.append([event async for event in queue.events(job["job_id"])][-1])
+        untouched = await queue.get(elsewhere["job_id"])
+        await queue.aclose()
+        return finished, untouched
+
+    finished, untouched = asyncio.run(asyncio.wait_for(main(), 5))
+
+    assert [job["status"] for job in finished] == ["succeeded", "succeeded"]
+    assert finished[0]["owner"] == os.getpid()
+    assert sorted(calls) == ["crashed while running", "waiting in the queue"]
+    assert untouched["status"] == "running" and untouched["owner"] == os.getppid()
@@ -0,0 +1,48 @@
+import threading
+import time
+
+from app.services import metrics
+from app.services.metrics import SlowRequestProfiler
+
+
+def busy(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def test_slow_request_profile_is_written_off_the_request_thread(tmp_path, monkeypatch):
+    writers = []
+
+    def recording_open(*args, **kwargs):
+        writers.append(threading.current_thread().name)
+        return open(*args, **kwargs)
+
+    monkeypatch.setattr(metrics, "open", recording_open, raising=False)
+    output_dir = tmp_path / "profiles"
+    profiler = SlowRequestProfiler(threshold=0.05, interval=0.005, output_dir=str(output_dir))
+    profiler.ensure_started()
+    try:
+        start = time.perf_counter()
+        busy(0.2)
+        folded = profiler.report("GET /api/slow", start, time.perf_counter())
+
+        assert folded and "test_metrics.py:busy" in folded
+        # The request thread only queues the profile
+        assert writers == []
+        deadline = time.time() + 2
+        while not list(output_dir.glob("*.folded")) and time.time() < deadline:
+            time.sleep(0.01)
+    finally:
+        profiler.stop()
+
+    [path] = output_dir.glob("*.folded")
+    assert path.name.endswith("_GET_api_slow.folded")
+    assert path.read_text() == folded + "\n"
+    assert writers == ["slow-request-profiler"]
+
+
+def test_fast_requests_are_not_reported():
+    profiler = SlowRequestProfiler(threshold=1.0)
+    now = time.perf_counter()
+    assert profiler.report("GET /api/health", now - 0.1, now) is None
@@ -0,0 +1,52 @@
+from app.services.ranking import CHARS_PER_TOKEN, estimate_tokens, pack_sections, rank_sections, select_relevant_text
+
+FILLER = " ".join(f"Our company was founded in year {i} and grew steadily." for i in range(60))
+
+
+def doc_sections():
+    return [
+        {"heading": "About", "text": FILLER, "kind": "text"},
+        {"heading": "Users", "text": "GET /v1/users lists users. POST /v1/users creates a user.", "kind": "text"},
+        {"heading": "History", "text": FILLER.replace("company", "team"), "kind": "text"},
+        {"heading": "Authentication", "text": "Send your API key in the X-Api-Key header.", "kind": "text"},
+        {"heading": "Users", "text": "curl https://api.example.test/v1/users", "kind": "code"},
+    ]
+
+
+def test_endpoint_and_auth_sections_rank_above_prose():
+    sections = doc_sections()
+    scores = rank_sections(sections, "list users")
+    ranked = [sections[i]["heading"] for i in sorted(range(len(sections)), key=lambda i: -scores[i])]
+    assert set(ranked[:2]) == {"Users", "Authentication"}
+    assert set(ranked[-2:]) == {"About", "History"}
+
+
+def test_endpoints_deep_in_the_page_are_kept():
+    # The endpoint reference sits after more prose than the budget allows
+    sections = doc_sections()
+    sections.append({"heading": "Orders", "text": "DELETE /v1/orders/{id} cancels an order.", "kind": "text"})
+    extracted = {"raw_text": " ".join(s["text"] for s in sections), "sections": sections}
+
+    text = select_relevant_text(extracted, "cancel an order", token_budget=200)
+
+    assert "DELETE /v1/orders/{id}" in text
+    assert "X-Api-Key" in text
+    assert "founded" not in text
+
+
+def test_packing_keeps_document_order_and_the_budget():
+    sections = doc_sections()
+    scores = [0.0, 5.0, 0.0, 3.0, 4.0]
+
+    text = pack_sections(sections, scores, token_budget=60)
+
+    assert estimate_tokens(text) <= 60 + len(sections)
+    assert text.index("GET /v1/users") < text.index("X-Api-Key") < text.index("curl")
+    # The heading is repeated because the Authentication section sits between the two Users sections
+    assert text.count("## Users") == 2
+    assert "```\ncurl https://api.example.test/v1/users\n```" in text
+
+
+def test_without_sections_the_head_of_raw_text_is_used():
+    extracted = {"raw_text": "x" * 10000}
+    assert select_relevant_text(extracted, "anything", token_budget=100) == "x" * (100 * CHARS_PER_TOKEN)
@@ -0,0 +1,105 @@
+import asyncio
+import time
+
+import pytest
+
+from app.services.rate_limit import RateLimiter, SharedRateLimiter, SQLiteRateState, TokenBucket
+
+
+def test_bucket_refills_with_time_up_to_capacity():
+    bucket = TokenBucket(per_minute=60)
+    bucket.take(60)
+    assert bucket.wait_time(10) == pytest.approx(10, abs=0.1)
+
+    # Half a minute later half the capacity is back
+    bucket.updated -= 30
+    assert bucket.wait_time(30) == 0
+    assert bucket.available == pytest.approx(30, abs=0.1)
+
+    bucket.updated -= 3600
+    bucket.wait_time(1)
+    assert bucket.available == 60
+
+
+def test_bucket_waits_at_most_for_a_full_bucket():
+    bucket = TokenBucket(per_minute=60)
+    bucket.take(60)
+    # More than the capacity can never fit, so it is charged as a full bucket
+    assert bucket.wait_time(1000) == pytest.approx(60, abs=0.1)
+
+
+def test_zero_limits_never_wait():
+    limiter = RateLimiter(requests_per_minute=0, tokens_per_minute=0)
+
+    async def main():
+        start = time.perf_counter()
+        for _ in range(1000):
+            await limiter.acquire(10 ** 6)
+            await limiter.record(10 ** 6)
+        return time.perf_counter() - start
+
+    assert asyncio.run(main()) < 0.5
+    assert limiter.snapshot() == {"requests_available": None, "tokens_available": None}
+
+
+def test_requests_wait_once_the_bucket_is_empty():
+    # Ten requests a second
+    limiter = RateLimiter(requests_per_minute=600)
+
+    async def main():
+        start = time.perf_counter()
+        for _ in range(600):
+            await limiter.acquire()
+        burst = time.perf_counter() - start
+        await limiter.acquire()
+        return burst, time.perf_counter() - start - burst
+
+    burst, wait = asyncio.run(main())
+
+    assert burst < 0.5
+    assert 0.05 < wait < 0.5
+
+
+def test_recorded_response_tokens_delay_later_calls():
+    # A thousand tokens a second
+    limiter = RateLimiter(tokens_per_minute=60000)
+
+    async def main():
+        await limiter.acquire(60000)
+        # The response used more than was reserved; the bucket goes into debt
+        await limiter.record(100)
+        assert limiter.tokens.available < 0
+        start = time.perf_counter()
+        await limiter.acquire(100)
+        return time.perf_counter() - start
+
+    assert 0.1 < asyncio.run(main()) < 0.6
+
+
+def test_from_env_has_no_limits_by_default(monkeypatch):
+    for name in ("GEMINI_RPM", "GEMINI_TPM", "RATE_LIMIT_SQLITE_PATH"):
+        monkeypatch.delenv(name, raising=False)
+    assert RateLimiter.from_env().snapshot() == {"requests_available": None, "tokens_available": None}
+
+    monkeypatch.setenv("GEMINI_RPM", "30")
+    monkeypatch.setenv("GEMINI_TPM", "50000")
+    assert RateLimiter.from_env().snapshot() == {"requests_available": 30, "tokens_available": 50000}
+
+
+def test_shared_limiter_splits_the_quota_between_processes(tmp_path):
+    path = str(tmp_path / "limits.db")
+    first = SharedRateLimiter(SQLiteRateState(path), requests_per_minute=60)
+    second = SharedRateLimiter(SQLiteRateState(path), requests_per_minute=60)
+
+    async def main():
+        for _ in range(60):
+            await first.acquire()
+        return await second._reserve(0)
+
+    try:
+        # The first limiter used the whole minute's allowance, so the second must wait
+        assert asyncio.run(main()) > 0.5
+        assert second.snapshot()["requests_available"] < 1
+    finally:
+        first.close()
+        second.close()
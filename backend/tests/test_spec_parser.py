@@ -0,0 +1,241 @@
+import json
+import time
+
+import pytest
+
+from app.services.spec_parser import SpecParser, select_relevant_endpoints
+
+OPENAPI = {
+    "openapi": "3.0.3",
+    "info": {"title": "Shop", "version": "1"},
+    "servers": [{"url": "https://api.shop.test/v1"}],
+    "paths": {
+        "/orders/{order_id}": {
+            "parameters": [{"$ref": "#/components/parameters/OrderId"}],
+            "get": {
+                "summary": "Get an order",
+                "responses": {"200": {"$ref": "#/components/responses/Order"}}
+            },
+            "put": {
+                "description": "Replace an order",
+                "requestBody": {"$ref": "#/components/requestBodies/OrderBody"},
+                "responses": {"204": {"description": "Replaced"}}
+            }
+        },
+        "/orders": {"$ref": "#/components/pathItems~1orders"}
+    },
+    "components": {
+        "parameters": {
+            "OrderId": {"name": "order_id", "in": "path", "required": True, "schema": {"type": "string"}}
+        },
+        "schemas": {
+            "Order": {
+                "type": "object",
+                "required": ["items"],
+                "properties": {
+                    "items": {"type": "array", "items": {"$ref": "#/components/schemas/Item"}},
+                    "note": {"$ref": "#/components/schemas/Note"}
+                }
+            },
+            "Item": {"type": "object", "properties": {"sku": {"type": "string"}}},
+            "Note": {"type": "string", "description": "Free text"}
+        },
+        "requestBodies": {
+            "OrderBody": {"content": {"application/json": {"schema": {"$ref": "#/components/schemas/Order"}}}}
+        },
+        "responses": {
+            "Order": {"description": "An order", "content": {"application/json": {"example": {"id": "o1"}}}}
+        },
+        "securitySchemes": {
+            "key": {"type": "apiKey", "in": "header", "name": "X-Api-Key"},
+            "token": {"type": "http", "scheme": "bearer", "bearerFormat": "JWT"}
+        },
+        # "~1" in a pointer is an escaped "/"
+        "pathItems/orders": {"get": {"summary": "List orders", "parameters": [
+            {"name": "limit", "in": "query", "schema": {"type": "integer"}}
+        ]}}
+    }
+}
+
+SWAGGER = {
+    "swagger": "2.0",
+    "host": "api.pets.test",
+    "basePath": "/v2",
+    "schemes": ["http"],
+    "paths": {
+        "/pets": {
+            "post": {
+                "summary": "Add a pet",
+                "parameters": [{"name": "body", "in": "body", "schema": {"$ref": "#/definitions/Pet"}}],
+                "responses": {"200": {"description": "ok", "examples": {"application/json": {"id": 1}}}}
+            }
+        }
+    },
+    "definitions": {
+        "Pet": {"type": "object", "required": ["name"],
+                "properties": {"name": {"type": "string"}, "tags": {"type": "array", "items": {"type": "string"}}}}
+    },
+    "securityDefinitions": {
+        "petstore_auth": {"type": "oauth2", "flow": "implicit", "authorizationUrl": "https://pets.test/oauth"}
+    }
+}
+
+POSTMAN = {
+    "info": {"_postman_id": "1", "name": "Notes",
+             "schema": "https://schema.getpostman.com/json/collection/v2.1.0/collection.json"},
+    "auth": {"type": "bearer"},
+    "item": [
+        {"name": "Notes", "item": [
+            {"name": "Get a note", "request": {
+                "method": "GET",
+                "url": {"raw": "{{base}}/notes/:id?expand=1", "path": ["notes", ":id"],
+                        "query": [{"key": "expand", "description": "Embed the author"}]}
+            }},
+            {"name": "Create a note", "request": {
+                "method": "post",
+                "url": "{{base}}/notes",
+                "body": {"mode": "raw", "raw": "{\"title\": \"x\", \"pinned\": true}"}
+            }}
+        ]},
+        {"name": "Health", "request": "https://api.notes.test/health"}
+    ]
+}
+
+
+def endpoint(result, method, path):
+    return next(e for e in result["endpoints"] if (e["method"], e["path"]) == (method, path))
+
+
+def test_openapi_3():
+    result = SpecParser().parse(OPENAPI)
+
+    assert result["format"] == "openapi"
+    assert result["base_url"] == "https://api.shop.test/v1"
+    assert [(e["method"], e["path"]) for e in result["endpoints"]] == [
+        ("GET", "/orders/{order_id}"), ("PUT", "/orders/{order_id}"), ("GET", "/orders")
+    ]
+    get_order = endpoint(result, "GET", "/orders/{order_id}")
+    assert get_order["description"] == "Get an order"
+    assert get_order["parameters"]["order_id"] == {"in": "path", "required": True, "type": "string", "description": ""}
+    assert get_order["response_example"] == {"id": "o1"}
+    assert endpoint(result, "GET", "/orders")["parameters"]["limit"]["type"] == "integer"
+    assert result["auth_methods"] == [
+        {"type": "API Key", "description": "API key sent in the header parameter 'X-Api-Key'"},
+        {"type": "Bearer Token", "description": "Bearer token in the Authorization header (JWT)"}
+    ]
+
+
+def test_refs_are_resolved_through_request_bodies_and_schemas():
+    put = endpoint(SpecParser().parse(OPENAPI), "PUT", "/orders/{order_id}")
+
+    assert put["description"] == "Replace an order"
+    assert put["parameters"]["items"] == {"in": "body", "required": True, "type": "array[Item]", "description": ""}
+    # A referenced property keeps the referenced schema's name and description
+    assert put["parameters"]["note"] == {"in": "body", "required": False, "type": "Note", "description": "Free text"}
+    assert put["response_example"] is None
+
+
+def test_unresolvable_and_circular_refs_do_not_fail():
+    spec = {
+        "openapi": "3.0.0",
+        "paths": {
+            "/a": {"get": {"parameters": [{"$ref": "#/components/parameters/Missing"},
+                                          {"$ref": "other.yaml#/Param"},
+                                          {"$ref": "#/components/parameters/Loop"}]}}
+        },
+        "components": {"parameters": {"Loop": {"$ref": "#/components/parameters/Loop"}}}
+    }
+
+    result = SpecParser().parse(spec)
+
+    assert result["endpoints"][0]["parameters"] == {}
+
+
+def test_swagger_2():
+    result = SpecParser().parse(SWAGGER)
+
+    assert result["format"] == "swagger"
+    assert result["base_url"] == "http://api.pets.test/v2"
+    add_pet = endpoint(result, "POST", "/pets")
+    assert add_pet["parameters"] == {
+        "name": {"in": "body", "required": True, "type": "string", "description": ""},
+        "tags": {"in": "body", "required": False, "type": "array[string]", "description": ""}
+    }
+    assert add_pet["response_example"] == {"id": 1}
+    assert result["auth_methods"] == [{"type": "OAuth 2.0", "description": "OAuth 2.0 flows: implicit"}]
+
+
+def test_postman_collection():
+    result = SpecParser().parse(POSTMAN)
+
+    assert result["format"] == "postman"
+    assert result["base_url"] == "{{base}}"
+    # Folders are flattened and the {{base}} variable or host is stripped from the path
+    assert [(e["method"], e["path"]) for e in result["endpoints"]] == [
+        ("GET", "/notes/{id}"), ("POST", "/notes"), ("GET", "/health")
+    ]
+    assert endpoint(result, "GET", "/notes/{id}")["parameters"]["expand"]["in"] == "query"
+    assert result["endpoints"][1]["parameters"] == {"title": {"in": "body", "type": "str"},
+                                                    "pinned": {"in": "body", "type": "bool"}}
+    assert result["auth_methods"] == [{"type": "Bearer Token", "description": "Bearer token in the Authorization header"}]
+
+
+def test_load_detects_the_format():
+    parser = SpecParser()
+
+    assert parser.load(json.dumps(SWAGGER)) == SWAGGER
+    assert parser.load("<html><body>Docs</body></html>") is None
+    assert parser.load('{"name": "not a spec"}') is None
+    assert parser.load("") is None
+
+
+def test_load_reads_yaml():
+    pytest.importorskip("yaml")
+    text = "openapi: 3.1.0\npaths:\n  /ping:\n    get:\n      summary: Ping\n"
+
+    document = SpecParser().load(text)
+
+    assert SpecParser().parse(document)["endpoints"][0]["description"] == "Ping"
+
+
+def test_select_relevant_endpoints():
+    endpoints = [
+        {"path": "/users", "method": "GET", "description": "List users"},
+        {"path": "/invoices", "method": "GET", "description": "List invoices"},
+        {"path": "/users/{id}/invoices", "method": "GET", "description": "Invoices of one user"},
+        {"path": "/webhooks", "method": "POST", "description": "Register a webhook"},
+    ]
+
+    assert select_relevant_endpoints(endpoints, "anything", 10) == endpoints
+    # The best matches are returned in spec order; ties go to the earlier endpoint
+    assert select_relevant_endpoints(endpoints, "send an invoice to a user", 2) == [endpoints[0], endpoints[2]]
+    assert select_relevant_endpoints(endpoints, "register webhook", 1) == [endpoints[3]]
+
+
+def test_thousands_of_operations_parse_well_under_a_second():
+    spec = {
+        "openapi": "3.0.0",
+        "paths": {
+            f"/resources{n}/{{id}}": {
+                "parameters": [{"$ref": "#/components/parameters/Id"}],
+                **{method: {"summary": f"{method} resource {n}",
+                            "requestBody": {"$ref": "#/components/requestBodies/Body"},
+                            "responses": {"200": {"$ref": "#/components/responses/Ok"}}}
+                   for method in ("get", "put", "delete")}
+            }
+            for n in range(1000)
+        },
+        "components": {
+            "parameters": {"Id": {"name": "id", "in": "path", "required": True, "schema": {"type": "string"}}},
+            "requestBodies": {"Body": {"content": {"application/json": {"schema": {"$ref": "#/components/schemas/R"}}}}},
+            "responses": {"Ok": {"content": {"application/json": {"example": {"ok": True}}}}},
+            "schemas": {"R": {"type": "object", "properties": {f"field{i}": {"type": "string"} for i in range(20)}}}
+        }
+    }
+
+    start = time.perf_counter()
+    result = SpecParser().parse(spec)
+    elapsed = time.perf_counter() - start
+
+    assert len(result["endpoints"]) == 3000
+    assert elapsed < 0.5
@@ -0,0 +1,69 @@
+import asyncio
+
+from app.services import prompts
+from app.services.gemini_service import GeminiService
+from app.services.generator import WrapperGenerator
+from app.services.html_scanner import scan_html
+from benchmarks.fakes import FakeGenerativeModel, install_fake_model
+
+EXTRACTED = {
+    **scan_html("<html><body><h1>API</h1><p>Authenticate with an API key header.</p>"
+                "<h2>Users</h2><p>GET /v1/users lists users. POST /v1/users creates a user.</p></body></html>"),
+    "url": "http://docs.example.test/api"
+}
+
+
+def make_generator():
+    service = GeminiService(cache=None)
+    install_fake_model(service, FakeGenerativeModel(latency=0.01, chunk_delay=0.01))
+    return WrapperGenerator(service), service
+
+
+def test_prompt_report_does_not_leak_into_the_consumer():
+    generator, service = make_generator()
+
+    async def main():
+        seen = []
+        events = generator.stream_api_documentation(EXTRACTED, "list users", "python", codegen_mode="llm")
+        async for event in events:
+            seen.append((event["event"], prompts._current_report.get()))
+        await service.aclose()
+        return seen
+
+    seen = asyncio.run(main())
+
+    assert {report for _, report in seen} == {None}
+    names = [name for name, _ in seen]
+    assert "wrapper_code" in names and names[-1] == "done"
+
+
+def test_every_stage_is_counted():
+    generator, service = make_generator()
+
+    async def main():
+        events = [event async for event in generator.stream_api_documentation(
+            EXTRACTED, "list users", "python", codegen_mode="llm"
+        )]
+        await service.aclose()
+        return events[-1]["prompt_tokens"]
+
+    prompt_tokens = asyncio.run(main())
+
+    assert {"analysis", "suggestion", "wrapper"} <= set(prompt_tokens)
+    assert prompt_tokens["total"]["calls"] == sum(
+        stats["calls"] for stage, stats in prompt_tokens.items() if stage != "total"
+    )
+
+
+def test_closing_from_another_task_after_a_disconnect():
+    generator, service = make_generator()
+
+    async def main():
+        events = generator.stream_api_documentation(EXTRACTED, "list users", "python", codegen_mode="llm")
+        first = await events.__anext__()
+        # A server cancelling the response closes the generator from a different task
+        await asyncio.create_task(events.aclose())
+        await service.aclose()
+        return first
+
+    assert asyncio.run(main())["event"] in ("endpoint", "auth_method", "analysis")
@@ -0,0 +1,154 @@
+import asyncio
+import json
+from types import SimpleNamespace
+from typing import List, Optional
+
+from pydantic import BaseModel
+
+from app.models.schemas import AnalysisResult
+from app.services.gemini_service import GeminiService
+from app.services.structured import IncrementalJsonParser, response_schema
+
+USERS = {"path": "/v1/users", "method": "GET", "description": "List users"}
+ORDERS = {"path": "/v1/orders", "method": "POST", "description": "Create an order"}
+API_KEY = {"type": "API Key", "description": "X-Api-Key header"}
+
+
+def feed_in_pieces(parser, text, size):
+    items = []
+    for start in range(0, len(text), size):
+        items.extend(parser.feed(text[start:start + size]))
+    return items
+
+
+def test_items_split_across_chunks_are_returned_once_complete():
+    text = json.dumps({"endpoints": [USERS, ORDERS], "auth_methods": [API_KEY]})
+    for size in (1, 3, 7, len(text)):
+        parser = IncrementalJsonParser()
+        assert feed_in_pieces(parser, text, size) == [("endpoints", USERS), ("endpoints", ORDERS),
+                                                      ("auth_methods", API_KEY)]
+        assert parser.result() == json.loads(text)
+
+
+def test_item_is_returned_with_its_closing_brace():
+    parser = IncrementalJsonParser()
+    assert parser.feed('{"endpoints": [{"path": "/v1/users", "method": "GET"') == []
+    assert parser.feed(', "description": "List users"}') == [("endpoints", USERS)]
+    assert parser.result() is None
+
+
+def test_quotes_and_braces_inside_strings():
+    tricky = {"path": "/v1/{id}", "method": "GET", "description": 'Returns "}]" or \\"{"\\ literally'}
+    document = {"endpoints": [tricky], "auth_methods": [{"type": "Bearer", "description": "Header \"{token}\""}]}
+    text = json.dumps(document)
+
+    parser = IncrementalJsonParser()
+    items = feed_in_pieces(parser, text, 2)
+
+    assert items == [("endpoints", tricky), ("auth_methods", document["auth_methods"][0])]
+    assert parser.result() == document
+
+
+def test_fenced_response_is_parsed():
+    body = json.dumps({"endpoints": [USERS], "auth_methods": []}, indent=2)
+    parser = IncrementalJsonParser()
+
+    items = parser.feed(f"Here is the analysis:\n```json\n{body}\n```\n")
+
+    assert items == [("endpoints", USERS)]
+    assert parser.result() == {"endpoints": [USERS], "auth_methods": []}
+
+
+class Address(BaseModel):
+    city: str
+
+
+class Person(BaseModel):
+    name: str
+    nickname: Optional[str] = None
+    home: Address
+    previous: List[Address] = []
+    work: Optional[Address] = None
+
+
+def test_response_schema_inlines_refs_and_marks_optional_nullable():
+    schema = response_schema(Person)
+    address = {"type": "object", "properties": {"city": {"type": "string"}}, "required": ["city"]}
+
+    assert schema["required"] == ["name", "home"]
+    properties = schema["properties"]
+    assert properties["name"] == {"type": "string"}
+    assert properties["nickname"] == {"type": "string", "nullable": True}
+    assert properties["home"] == address
+    assert properties["previous"] == {"type": "array", "items": address}
+    assert properties["work"] == {**address, "nullable": True}
+    assert "$ref" not in json.dumps(schema) and "$defs" not in json.dumps(schema)
+
+
+def test_analysis_schema_uses_only_supported_keywords():
+    allowed = {"type", "format", "description", "enum", "properties", "items", "required", "nullable"}
+
+    def check(node):
+        assert set(node) <= allowed
+        for prop in node.get("properties", {}).values():
+            check(prop)
+        if "items" in node:
+            check(node["items"])
+
+    schema = response_schema(AnalysisResult)
+    check(schema)
+    method = schema["properties"]["endpoints"]["items"]["properties"]["method"]
+    assert method["type"] == "string" and "GET" in method["enum"]
+
+
+class ScriptedModel:
+    """Streams the analysis in small chunks and answers the repair prompt"""
+
+    def __init__(self, analysis: str, repair: str):
+        self.analysis = analysis
+        self.repair = repair
+        self.prompts = []
+
+    async def generate_content_async(self, prompt, generation_config=None, safety_settings=None, stream=False):
+        self.prompts.append(prompt)
+        if not stream:
+            return SimpleNamespace(text=self.repair, usage_metadata=None)
+        chunks = [self.analysis[i:i + 5] for i in range(0, len(self.analysis), 5)]
+
+        async def iterate():
+            for chunk in chunks:
+                yield SimpleNamespace(text=chunk, usage_metadata=None)
+        return SimpleNamespace(__aiter__=iterate)
+
+
+def test_only_invalid_items_are_sent_for_repair():
+    broken = {"path": "/v1/orders", "method": "CREATE", "description": "Create an order"}
+    model = ScriptedModel(
+        analysis=json.dumps({"endpoints": [USERS, broken], "auth_methods": [API_KEY]}),
+        repair=json.dumps({"items": [ORDERS]})
+    )
+    service = GeminiService(cache=None)
+    service.model = model
+    service.hedge = False
+    extracted = {
+        "url": "http://docs.example.test/api", "raw_text": "Documentation body that is not resent",
+        "potential_endpoints": [], "potential_auth": []
+    }
+
+    async def main():
+        try:
+            return await service.analyze_api_documentation(extracted, "create orders", use_cache=False)
+        finally:
+            await service.aclose()
+
+    result = asyncio.run(main())
+
+    assert len(model.prompts) == 2
+    repair_prompt = model.prompts[1]
+    assert '"CREATE"' in repair_prompt
+    assert "/v1/users" not in repair_prompt
+    assert "X-Api-Key" not in repair_prompt
+    assert "Documentation body" not in repair_prompt
+    assert [(e["method"], e["path"]) for e in result["parsed_endpoints"]] == [("GET", "/v1/users"),
+                                                                               ("POST", "/v1/orders")]
+    assert result["parsed_auth_methods"] == [API_KEY]
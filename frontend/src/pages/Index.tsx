@@ -51,7 +51,7 @@ const Index = () => {
     setError(null);
     
     try {
-      const response = await fetch('/api/analyze', {
+      const response = await fetch('/api/analyze/stream', {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
@@ -59,13 +59,53 @@ const Index = () => {
         body: JSON.stringify(formData),
       });
       
-      if (!response.ok) {
+      if (!response.ok || !response.body) {
         const errorText = await response.text();
         throw new Error(`Server returned ${response.status}: ${errorText}`);
       }
       
-      const data = await response.json();
-      setApiData(data);
+      // Results arrive as newline-delimited JSON events, one per pipeline stage
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = '';
+      
+      const handleEvent = (event: any) => {
+        switch (event.event) {
+          case 'analysis':
+            setApiData({
+              endpoints: event.endpoints,
+              auth_methods: event.auth_methods,
+              suggested_integration: '',
+              wrapper_code: '',
+              env_template: '',
+            });
+            break;
+          case 'wrapper_code':
+            setApiData(prev => prev && { ...prev, wrapper_code: prev.wrapper_code + event.delta });
+            break;
+          case 'suggestion':
+            setApiData(prev => prev && { ...prev, suggested_integration: event.suggested_integration });
+            break;
+          case 'env_template':
+            setApiData(prev => prev && { ...prev, env_template: event.env_template });
+            break;
+          case 'error':
+            throw new Error(event.detail);
+        }
+      };
+      
+      while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        const lines = buffer.split('\n');
+        buffer = lines.pop() || '';
+        for (const line of lines) {
+          if (line.trim()) handleEvent(JSON.parse(line));
+        }
+      }
+      if (buffer.trim()) handleEvent(JSON.parse(buffer));
+      
       toast({
         title: "Analysis Complete",
         description: `Successfully analyzed API documentation from ${formData.documentation_url}`,